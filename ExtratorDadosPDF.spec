@@ -6,7 +6,8 @@ a = Analysis(
     pathex=['src'],
     binaries=[],
     datas=[('data', 'data'), ('Tesseract-OCR', 'Tesseract-OCR'), ('poppler', 'poppler')],
-    hiddenimports=[],
+    # Os processadores são importados por nome em Processador.PROCESSADORES (import tardio)
+    hiddenimports=['src.services.cnh.cnh', 'src.services.crlv.crlv', 'src.services.tarifas_buonny.tar_buonny'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
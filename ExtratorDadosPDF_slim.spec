@@ -0,0 +1,63 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Perfil enxuto: só o que os processadores usam (OpenCV, Tesseract, Poppler, PyMuPDF, pdfplumber/pypdfium2).
+# Ficam de fora o EasyOCR (torch/torchvision), o spaCy com o pt_core_news_lg e as bibliotecas de
+# visualização/científicas usadas apenas em scripts de apoio (ex.: marcar_campos_matplotlib.py).
+# Gerar: pyinstaller ExtratorDadosPDF_slim.spec   (ambiente criado a partir de requirements-slim.txt)
+block_cipher = None
+
+EXCLUIDOS = [
+    'torch', 'torchvision', 'easyocr', 'spacy', 'thinc', 'blis', 'pt_core_news_lg', 'weasel', 'confection',
+    'matplotlib', 'scipy', 'skimage', 'sympy', 'networkx', 'shapely', 'pyclipper', 'imageio', 'tifffile',
+    'pandas', 'IPython', 'tkinter', 'pydantic', 'pydantic_core', 'typer', 'rich', 'pygments', 'jinja2',
+    'requests', 'yaml',
+]
+
+a = Analysis(
+    ['main.py'],
+    pathex=['src'],
+    binaries=[],
+    datas=[('data', 'data'), ('Tesseract-OCR', 'Tesseract-OCR'), ('poppler', 'poppler')],
+    # Os processadores são importados por nome em Processador.PROCESSADORES (import tardio)
+    hiddenimports=['src.services.cnh.cnh', 'src.services.crlv.crlv', 'src.services.tarifas_buonny.tar_buonny'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUIDOS,
+    win_no_prefer_redirects=False,
+    win_private_assemblies=False,
+    cipher=block_cipher,
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    [],
+    name='ExtratorDadosPDF_slim',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=False, # --noconsole é controlado aqui
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    name='ExtratorDadosPDF_slim',
+)
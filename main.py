@@ -1,52 +1,206 @@
 import sys, os
+import multiprocessing
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 from src.utils.utils import Utils
-from src.services.cnh.cnh import CNH
-from src.services.crlv.crlv import CRLV
-from src.services.tarifas_buonny.tar_buonny import TarifasBuonny
+from src.utils.configuracao import Configuracao
 
 
 
 if __name__ == '__main__':
-    
+
+    # Necessário para o ProcessPoolExecutor no executável congelado (PyInstaller/Windows)
+    multiprocessing.freeze_support()
+
+    # Cada Tesseract com uma única thread do OpenMP: o paralelismo fica com os pools de páginas, campos e
+    # documentos. Definido uma vez aqui (os processos filhos herdam o ambiente); um valor do usuário é respeitado.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    # --- Relatório do tempo de importação (partida a frio) ---
+    # main.py --tempo-importacao [CNH CRLV TARIFAS_BUONNY]
+    # Precisa rodar antes de qualquer outro import: mostra o custo de carregar cada tipo de documento.
+    if len(sys.argv) > 1 and sys.argv[1] == "--tempo-importacao":
+        from src.utils.tempo_importacao import TempoImportacao
+        registros, total = TempoImportacao.medir(lambda: __import__("src.services.processador.processador"))
+        print(f"Processador (despacho, cache, métricas): {total * 1000:.1f} ms")
+        from src.services.processador.processador import Processador
+        for tipo in [t.upper() for t in sys.argv[2:]] or list(Processador.PROCESSADORES):
+            if tipo not in Processador.PROCESSADORES:
+                print(f"Tipo de documento desconhecido: '{tipo}'", file=sys.stderr)
+                sys.exit(1)
+            registros, total = TempoImportacao.medir(lambda: Processador.resolver(tipo))
+            # Os tipos seguintes reaproveitam os módulos já carregados: o tempo é o custo adicional
+            print(f"\n{tipo}: {total * 1000:.1f} ms (adicional)")
+            print(TempoImportacao.formatar(registros))
+        sys.exit(0)
+
+    # --- Modo Lote (vários PDFs em paralelo) ---
+    # main.py --lote PASTA|GLOB|MANIFESTO [--tipo CNH] [--processos N] [--saida resultados.jsonl]
+    if len(sys.argv) > 1 and sys.argv[1] == "--lote":
+        from src.services.lote.lote import Lote
+        try:
+            Lote.main(sys.argv[2:])
+        except (ValueError, FileNotFoundError) as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    # --- Cache de resultados ---
+    # main.py --cache-estatisticas  -> imprime acertos/falhas/tamanho em JSON
+    # main.py --cache-limpar        -> remove todas as entradas
+    if len(sys.argv) > 1 and sys.argv[1] in ("--cache-estatisticas", "--cache-limpar"):
+        import json
+        from src.services.cache.cache import CacheResultados
+        if sys.argv[1] == "--cache-limpar":
+            CacheResultados.limpar()
+        print(json.dumps(CacheResultados.estatisticas(), ensure_ascii=False, indent=4))
+        sys.exit(0)
+
+    # --- Validação dos modelos de coordenadas (data/coord_*.json) ---
+    if len(sys.argv) > 1 and sys.argv[1] == "--validar-modelos":
+        from src.services.modelos.modelos import RegistroModelos
+        BASE_PATH = Utils.get_base_path()
+        for nome in RegistroModelos.nomes(BASE_PATH):
+            print(f"OK     {nome}")
+        erros = RegistroModelos.erros(BASE_PATH)
+        for nome, erro in erros.items():
+            print(f"ERRO   {erro}")
+        sys.exit(1 if erros else 0)
+
+    # --- Validação dos motores de texto do demonstrativo Buonny ---
+    # main.py --validar-texto-buonny amostra1.pdf amostra2.pdf
+    # Compara as linhas de "servicos" de cada motor com as do pdfplumber; sai com 1 se algum divergir.
+    if len(sys.argv) > 1 and sys.argv[1] == "--validar-texto-buonny":
+        import json
+        from src.services.tarifas_buonny.tar_buonny import TarifasBuonny
+        relatorio = TarifasBuonny.validar_motores(sys.argv[2:])
+        print(json.dumps(relatorio, ensure_ascii=False, indent=4))
+        divergentes = [motor for resultados in relatorio.values() for motor, r in resultados.items() if not r["identico"]]
+        sys.exit(1 if divergentes else 0)
+
+    # --- Exportação dos resultados gravados no SQLite ---
+    # main.py --exportar [--banco resultados.sqlite3] [--cpf ...] [--placa ...] [--formato jsonl|json|csv] [--saida arquivo]
+    if len(sys.argv) > 1 and sys.argv[1] == "--exportar":
+        from src.services.armazenamento.armazenamento import ArmazenamentoResultados
+        try:
+            ArmazenamentoResultados.main(sys.argv[2:])
+        except (ValueError, FileNotFoundError) as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    # --- Impressões de layout de referência dos modelos ---
+    # main.py --impressao-modelo coord_cnh_digital amostra1.pdf amostra2.pdf [--pagina 1] [--substituir]
+    if len(sys.argv) > 1 and sys.argv[1] == "--impressao-modelo":
+        from src.services.classificacao.classificacao import ClassificadorLayout
+        try:
+            sys.exit(ClassificadorLayout.main(sys.argv[2:]))
+        except (ValueError, FileNotFoundError) as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    # --- Avaliação de um modelo de coordenadas sobre documentos reais ---
+    # main.py --avaliar-modelo coord_cnh_digital PASTA [--gabarito PASTA] [--sobreposicoes PASTA] [--saida relatorio.json]
+    if len(sys.argv) > 1 and sys.argv[1] == "--avaliar-modelo":
+        from src.services.avaliacao.avaliacao import AvaliacaoModelo
+        try:
+            sys.exit(AvaliacaoModelo.main(sys.argv[2:]))
+        except (ValueError, FileNotFoundError) as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    # --- Benchmark com documentos sintéticos ---
+    # main.py --benchmark [--documentos 8] [--paginas-buonny 50] [--saida atual.json] [--comparar anterior.json]
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        from src.services.benchmark.benchmark import Benchmark
+        sys.exit(Benchmark.main(sys.argv[2:]))
+
+    # --- Modo Worker (processo de longa duração) ---
+    # main.py --worker              -> JSON-lines via stdin/stdout
+    # main.py --worker --porta 47650 -> JSON-lines via socket TCP local
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        from src.services.worker.worker import Worker
+        Worker.main(sys.argv[2:])
+        sys.exit(0)
+
     # Garante que o caminho de saída seja definido mesmo em caso de erro inicial
     output_path = Utils.get_temp_output_path()
-    
+
+    # --- Limites do documento (EXTRATOR_TEMPO_DOCUMENTO, EXTRATOR_MEMORIA_MAXIMA_MB) ---
+    # Se o documento travar dentro do próprio processo, o vigia grava o erro com a etapa e encerra,
+    # para que a aplicação Delphi nunca fique esperando.
+    from src.utils.limites import Limites, LimiteExcedido
+    Limites.aplicar_limite_memoria()
+
+    def tempo_esgotado(etapa):
+        Utils.write_json_output({
+            "status": "erro",
+            "mensagem": f"Tempo limite do documento ({Limites.tempo_documento()} s) esgotado na etapa '{etapa}'.",
+            "etapa": etapa,
+            "limite": "tempo_documento"
+        }, output_path)
+        print(output_path, flush=True)
+        os._exit(1)
+
+    vigia = Limites.vigiar(tempo_esgotado)
+
     try:
         # --- Validação dos Argumentos de Linha de Comando ---
+        # Só o caminho do PDF: o tipo é detectado automaticamente (igual a TIPO_DOCUMENTO "AUTO")
+        if len(sys.argv) == 2:
+            sys.argv.insert(1, "AUTO")
         if len(sys.argv) != 3:
-            raise ValueError("Uso incorreto. É necessário fornecer 2 argumentos: TIPO_DOCUMENTO e CAMINHO_PDF")
+            raise ValueError("Uso incorreto. É necessário fornecer 2 argumentos: TIPO_DOCUMENTO e CAMINHO_PDF (ou só CAMINHO_PDF)")
 
         doc_type = sys.argv[1].upper()
         caminho_pdf_arg = sys.argv[2]
         #Debug
         # doc_type = "CNH"
         # caminho_pdf_arg = r"C:\Users\cpcsc\Downloads\documentos_teste\documentos\CNH_0.pdf"
-        
+
         if not os.path.exists(caminho_pdf_arg):
             raise FileNotFoundError(f"Arquivo PDF não encontrado no caminho: {caminho_pdf_arg}")
 
-        # --- Obtenção dos Caminhos Base ---
-        BASE_PATH = Utils.get_base_path()
-        
-        # --- Dicionário de Processadores ---
-        PROCESSADORES = {
-            "CNH": CNH.processar_cnh,
-            "CRLV": CRLV.processar_crlv,
-            "TARIFAS_BUONNY": TarifasBuonny.ExtrairTarifasPDF 
-        }
-        
+        # --- Repasse para um Worker já aquecido (opcional) ---
+        # Com EXTRATOR_WORKER_PORTA definido, o documento é enviado ao worker;
+        # se ele não estiver no ar, o processamento segue localmente.
+        dados_finais = None
+        porta_worker = Configuracao.obter_int("WORKER_PORTA", 0)
+        if porta_worker:
+            from src.services.worker.cliente import ClienteWorker
+            dados_finais = ClienteWorker.tentar_processar(doc_type, caminho_pdf_arg, porta_worker)
+
+        # --- Saída no banco SQLite (EXTRATOR_SAIDA=sqlite) ---
+        # Em vez do caminho do JSON, é impresso "sqlite:<banco>#<id>"; erros continuam indo para o JSON temporário.
+        from src.services.armazenamento.armazenamento import ArmazenamentoResultados
+        saida_sqlite = ArmazenamentoResultados.modo_saida() == "sqlite"
+
+        # --- Demonstrativo Buonny em fluxo ---
+        # Os serviços são gravados página a página direto no arquivo de saída (memória constante).
+        # EXTRATOR_FORMATO_SAIDA=jsonl grava um serviço por linha; o cache não é usado neste caminho.
+        # Limites do documento e "_metrics" (EXTRATOR_METRICAS=1) valem igual ao Processador.processar.
+        if dados_finais is None and doc_type == "TARIFAS_BUONNY" and Configuracao.obter_bool("BUONNY_FLUXO", True) \
+                and not Configuracao.obter_bool("CACHE", False) and not saida_sqlite:
+            from src.services.processador.processador import Processador
+            Processador.gravar_em_fluxo(caminho_pdf_arg, output_path, Configuracao.obter("FORMATO_SAIDA", "json"))
 
-        # --- Despacho para a Função Correta ---
-        if doc_type in PROCESSADORES:
-            funcao_processadora = PROCESSADORES[doc_type]
-            # Chama a função específica do documento
-            dados_finais = funcao_processadora(caminho_pdf_arg, BASE_PATH)
         else:
-            raise ValueError(f"Tipo de documento desconhecido: '{doc_type}'. Tipos suportados: {list(PROCESSADORES.keys())}")
+            if dados_finais is None:
+                from src.services.processador.processador import Processador
 
-        # --- Escrita do JSON de Sucesso ---
-        Utils.write_json_output(dados_finais, output_path)
+                # --- Obtenção dos Caminhos Base ---
+                BASE_PATH = Utils.get_base_path()
+
+                # --- Despacho para a Função Correta ---
+                dados_finais = Processador.processar(doc_type, caminho_pdf_arg, BASE_PATH)
+
+            if saida_sqlite:
+                with ArmazenamentoResultados() as armazenamento:
+                    armazenamento.adicionar(dados_finais.get("_doc_type_detectado", doc_type), caminho_pdf_arg, dados_finais)
+                    armazenamento.descarregar()
+                    output_path = f"sqlite:{armazenamento.caminho}#{armazenamento.ultimo_id}"
+            else:
+                # --- Escrita do JSON de Sucesso ---
+                Utils.write_json_output(dados_finais, output_path)
 
     except Exception as e:
         # --- Tratamento Centralizado de Erros ---
@@ -55,11 +209,16 @@ if __name__ == '__main__':
             "status": "erro",
             "mensagem": str(e)
         }
+        if isinstance(e, LimiteExcedido):
+            erro_info["etapa"] = e.etapa
+            erro_info["limite"] = e.limite
         # Escreve o arquivo JSON com a mensagem de erro
         Utils.write_json_output(erro_info, output_path)
-    
+
     finally:
+        if vigia is not None:
+            vigia.cancel()
         # --- Retorno para a Aplicação Delphi ---
         # Imprime o caminho completo do arquivo de saída (seja sucesso ou erro).
         # A aplicação Delphi deve capturar este output.
-        print(output_path)
\ No newline at end of file
+        print(output_path)
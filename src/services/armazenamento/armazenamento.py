@@ -0,0 +1,290 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from src.utils.configuracao import Configuracao
+
+
+class ArmazenamentoResultados:
+  """
+  Destino opcional dos resultados: um banco SQLite local no lugar de um dados_<uuid>.json por documento.
+  As inserções são acumuladas e gravadas em transações de `tamanho_lote` documentos (um único commit por lote).
+
+  Tabelas:
+    resultados: uma linha por documento, com colunas indexadas para consulta (doc_type, hash_pdf, cpf,
+                registro, placa, cavalo) e o resultado completo em JSON compacto na coluna "dados".
+    servicos:   uma linha por serviço dos demonstrativos Buonny (busca por cavalo e rg).
+    documentos: uma linha por página reconhecida de um PDF com várias CNHs/CRLVs ("documentos" no resultado).
+
+  Modos de saída (EXTRATOR_SAIDA): "arquivo" (padrão, JSON na pasta temporária, compatível com o Delphi)
+  ou "sqlite" (banco em EXTRATOR_SAIDA_BANCO).
+  """
+
+  MODOS_SAIDA = ("arquivo", "sqlite")
+  TAMANHO_LOTE = 200
+
+  # Campos do resultado que alimentam as colunas indexadas, por ordem de preferência
+  CAMPOS_INDEXADOS = {
+      "cpf": ("cpf", "cpf_cnpj_proprietario"),
+      "registro": ("registro",),
+      "placa": ("placa",),
+      "cavalo": ("cavalo",),
+  }
+
+  COLUNAS_CONSULTA = ("doc_type", "hash_pdf", "cpf", "registro", "placa", "cavalo", "status")
+
+  @staticmethod
+  def modo_saida():
+      modo = Configuracao.obter("SAIDA", "arquivo").lower()
+      if modo not in ArmazenamentoResultados.MODOS_SAIDA:
+          raise ValueError(f"Modo de saída desconhecido: '{modo}'. Modos suportados: {list(ArmazenamentoResultados.MODOS_SAIDA)}")
+      return modo
+
+  @staticmethod
+  def caminho_padrao():
+      return Configuracao.obter("SAIDA_BANCO", os.path.join(tempfile.gettempdir(), "extrator_dados_pdf_resultados.sqlite3"))
+
+  @staticmethod
+  def normalizar_documento(valor):
+      """CPF/CNPJ e registro só com dígitos, para a busca não depender da pontuação lida no OCR."""
+      return re.sub(r"\D", "", str(valor)) or None if valor else None
+
+  @staticmethod
+  def normalizar_placa(valor):
+      return re.sub(r"[^A-Z0-9]", "", str(valor).upper()) or None if valor else None
+
+  def __init__(self, caminho=None, tamanho_lote=TAMANHO_LOTE):
+      self.caminho = caminho or ArmazenamentoResultados.caminho_padrao()
+      self.tamanho_lote = max(1, tamanho_lote)
+      self._pendentes = []
+      self.ultimo_id = None
+      # O worker usa a mesma instância nas threads das conexões, uma de cada vez (Worker._trava_documentos)
+      self.conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+      self.conexao.execute("PRAGMA journal_mode=WAL")
+      self.conexao.execute("PRAGMA synchronous=NORMAL")
+      self._criar_tabelas()
+
+  def _criar_tabelas(self):
+      with self.conexao:
+          self.conexao.execute(
+              "CREATE TABLE IF NOT EXISTS resultados ("
+              " id INTEGER PRIMARY KEY AUTOINCREMENT, criado_em REAL NOT NULL, doc_type TEXT NOT NULL,"
+              " caminho TEXT, hash_pdf TEXT, status TEXT, cpf TEXT, registro TEXT, placa TEXT, cavalo TEXT,"
+              " dados TEXT NOT NULL)"
+          )
+          self.conexao.execute(
+              "CREATE TABLE IF NOT EXISTS servicos ("
+              " resultado_id INTEGER NOT NULL REFERENCES resultados(id) ON DELETE CASCADE,"
+              " data TEXT, nome TEXT, rg TEXT, cavalo TEXT, valor TEXT)"
+          )
+          for coluna in ("doc_type", "hash_pdf", "cpf", "registro", "placa", "cavalo", "criado_em"):
+              self.conexao.execute(f"CREATE INDEX IF NOT EXISTS idx_resultados_{coluna} ON resultados ({coluna})")
+          self.conexao.execute(
+              "CREATE TABLE IF NOT EXISTS documentos ("
+              " resultado_id INTEGER NOT NULL REFERENCES resultados(id) ON DELETE CASCADE,"
+              " pagina INTEGER, cpf TEXT, registro TEXT, placa TEXT, cavalo TEXT)"
+          )
+          for coluna in ("cavalo", "rg", "resultado_id"):
+              self.conexao.execute(f"CREATE INDEX IF NOT EXISTS idx_servicos_{coluna} ON servicos ({coluna})")
+          for coluna in ("cpf", "registro", "placa", "cavalo", "resultado_id"):
+              self.conexao.execute(f"CREATE INDEX IF NOT EXISTS idx_documentos_{coluna} ON documentos ({coluna})")
+
+  @staticmethod
+  def colunas_indexadas(dados):
+      """Extrai do resultado os valores das colunas indexadas (normalizados)."""
+      colunas = {}
+      for coluna, campos in ArmazenamentoResultados.CAMPOS_INDEXADOS.items():
+          valor = next((dados.get(campo) for campo in campos if dados.get(campo)), None)
+          if coluna in ("cpf", "registro"):
+              colunas[coluna] = ArmazenamentoResultados.normalizar_documento(valor)
+          else:
+              colunas[coluna] = ArmazenamentoResultados.normalizar_placa(valor)
+      return colunas
+
+  def adicionar(self, doc_type, caminho_pdf, dados, hash_pdf=None):
+      """Enfileira um resultado; a gravação acontece a cada `tamanho_lote` documentos ou em descarregar()."""
+      if hash_pdf is None and caminho_pdf and os.path.exists(caminho_pdf):
+          from src.services.cache.cache import CacheResultados
+          hash_pdf = CacheResultados.hash_arquivo(caminho_pdf)
+      self._pendentes.append(((doc_type or "").upper(), caminho_pdf, hash_pdf, dados))
+      if len(self._pendentes) >= self.tamanho_lote:
+          self.descarregar()
+
+  def descarregar(self):
+      """Grava os resultados pendentes em uma única transação. Retorna os ids na ordem de inserção."""
+      if not self._pendentes:
+          return []
+      ids = []
+      agora = time.time()
+      with self.conexao:
+          for doc_type, caminho_pdf, hash_pdf, dados in self._pendentes:
+              colunas = ArmazenamentoResultados.colunas_indexadas(dados)
+              cursor = self.conexao.execute(
+                  "INSERT INTO resultados (criado_em, doc_type, caminho, hash_pdf, status, cpf, registro, placa, cavalo, dados) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                  (agora, doc_type, caminho_pdf, hash_pdf, dados.get("status"), colunas["cpf"], colunas["registro"],
+                   colunas["placa"], colunas["cavalo"], json.dumps(dados, ensure_ascii=False, separators=(",", ":")))
+              )
+              ids.append(cursor.lastrowid)
+              servicos = dados.get("servicos") or []
+              if servicos:
+                  self.conexao.executemany(
+                      "INSERT INTO servicos (resultado_id, data, nome, rg, cavalo, valor) VALUES (?, ?, ?, ?, ?, ?)",
+                      [(cursor.lastrowid, s.get("data"), s.get("nome"), s.get("rg"),
+                        ArmazenamentoResultados.normalizar_placa(s.get("cavalo")), s.get("valor")) for s in servicos]
+                  )
+              documentos = dados.get("documentos") or []
+              if documentos:
+                  linhas = []
+                  for documento in documentos:
+                      colunas_documento = ArmazenamentoResultados.colunas_indexadas(documento)
+                      linhas.append((cursor.lastrowid, documento.get("pagina"), colunas_documento["cpf"],
+                                     colunas_documento["registro"], colunas_documento["placa"], colunas_documento["cavalo"]))
+                  self.conexao.executemany(
+                      "INSERT INTO documentos (resultado_id, pagina, cpf, registro, placa, cavalo) VALUES (?, ?, ?, ?, ?, ?)",
+                      linhas
+                  )
+      self._pendentes = []
+      self.ultimo_id = ids[-1]
+      return ids
+
+  def fechar(self):
+      self.descarregar()
+      self.conexao.close()
+
+  def __enter__(self):
+      return self
+
+  def __exit__(self, *excecao):
+      self.fechar()
+
+  # --- Consulta e exportação ---
+
+  def consultar(self, filtros=None, desde=None, limite=None):
+      """
+      Gera os resultados (dicionários com id, criado_em, doc_type, caminho, hash_pdf e dados) que atendem aos filtros.
+      filtros: {coluna: valor} com colunas de COLUNAS_CONSULTA; "cavalo" também procura nos serviços do Buonny.
+      """
+      condicoes, parametros = [], []
+      for coluna, valor in (filtros or {}).items():
+          if coluna not in ArmazenamentoResultados.COLUNAS_CONSULTA:
+              raise ValueError(f"Filtro desconhecido: '{coluna}'. Filtros suportados: {list(ArmazenamentoResultados.COLUNAS_CONSULTA)}")
+          if coluna in ("cpf", "registro"):
+              valor = ArmazenamentoResultados.normalizar_documento(valor)
+          elif coluna in ("placa", "cavalo"):
+              valor = ArmazenamentoResultados.normalizar_placa(valor)
+          elif coluna == "doc_type":
+              valor = valor.upper()
+
+          if coluna == "cavalo":
+              condicoes.append("(cavalo = ? OR id IN (SELECT resultado_id FROM servicos WHERE cavalo = ?)"
+                               " OR id IN (SELECT resultado_id FROM documentos WHERE cavalo = ?))")
+              parametros.extend([valor, valor, valor])
+          elif coluna in ("cpf", "registro", "placa"):
+              # PDFs com várias páginas: as chaves de cada documento ficam na tabela "documentos"
+              condicoes.append(f"({coluna} = ? OR id IN (SELECT resultado_id FROM documentos WHERE {coluna} = ?))")
+              parametros.extend([valor, valor])
+          else:
+              condicoes.append(f"{coluna} = ?")
+              parametros.append(valor)
+      if desde is not None:
+          condicoes.append("criado_em >= ?")
+          parametros.append(desde)
+
+      sql = "SELECT id, criado_em, doc_type, caminho, hash_pdf, dados FROM resultados"
+      if condicoes:
+          sql += " WHERE " + " AND ".join(condicoes)
+      sql += " ORDER BY id"
+      if limite:
+          sql += f" LIMIT {int(limite)}"
+
+      for id_resultado, criado_em, doc_type, caminho, hash_pdf, dados in self.conexao.execute(sql, parametros):
+          yield {
+              "id": id_resultado,
+              "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(criado_em)),
+              "doc_type": doc_type,
+              "path": caminho,
+              "hash_pdf": hash_pdf,
+              "dados": json.loads(dados)
+          }
+
+  def remover_antigos(self, dias):
+      """Remove resultados (e seus serviços) gravados há mais de `dias` dias. Retorna a quantidade removida."""
+      limite = time.time() - dias * 86400
+      with self.conexao:
+          for tabela in ("servicos", "documentos"):
+              self.conexao.execute(f"DELETE FROM {tabela} WHERE resultado_id IN (SELECT id FROM resultados WHERE criado_em < ?)", (limite,))
+          removidos = self.conexao.execute("DELETE FROM resultados WHERE criado_em < ?", (limite,)).rowcount
+      self.conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+      return removidos
+
+  @staticmethod
+  def exportar(registros, saida, formato="jsonl"):
+      """Escreve os registros de consultar() em JSONL, JSON (lista) ou CSV (colunas fixas + dados em JSON)."""
+      total = 0
+      if formato == "csv":
+          escritor = csv.writer(saida)
+          escritor.writerow(["id", "criado_em", "doc_type", "path", "hash_pdf", "dados"])
+          for registro in registros:
+              escritor.writerow([registro["id"], registro["criado_em"], registro["doc_type"], registro["path"],
+                                 registro["hash_pdf"], json.dumps(registro["dados"], ensure_ascii=False)])
+              total += 1
+      elif formato == "json":
+          saida.write("[")
+          for registro in registros:
+              saida.write(("," if total else "") + "\n    " + json.dumps(registro, ensure_ascii=False))
+              total += 1
+          saida.write("\n]\n")
+      else:
+          for registro in registros:
+              saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+              total += 1
+      return total
+
+  @staticmethod
+  def main(argv):
+      """Ponto de entrada da exportação (main.py --exportar ...)."""
+      parser = argparse.ArgumentParser(prog="main.py --exportar", description="Consulta e exporta resultados gravados no SQLite.")
+      parser.add_argument("--banco", help="Banco SQLite (padrão: EXTRATOR_SAIDA_BANCO ou a pasta temporária).")
+      parser.add_argument("--tipo", help="Tipo do documento (CNH, CRLV, TARIFAS_BUONNY).")
+      parser.add_argument("--cpf")
+      parser.add_argument("--registro")
+      parser.add_argument("--placa")
+      parser.add_argument("--cavalo", help="Placa do cavalo (CRLV ou serviços do demonstrativo Buonny).")
+      parser.add_argument("--hash", help="SHA-256 do PDF.")
+      parser.add_argument("--status", choices=["sucesso", "erro"])
+      parser.add_argument("--dias", type=float, help="Somente resultados dos últimos N dias.")
+      parser.add_argument("--limite", type=int, help="Quantidade máxima de resultados.")
+      parser.add_argument("--formato", choices=["jsonl", "json", "csv"], default="jsonl")
+      parser.add_argument("--saida", help="Arquivo de saída (padrão: saída padrão).")
+      parser.add_argument("--remover-antigos", type=float, metavar="DIAS",
+                          help="Remove os resultados com mais de DIAS dias em vez de exportar.")
+      args = parser.parse_args(argv)
+
+      caminho = args.banco or ArmazenamentoResultados.caminho_padrao()
+      if not os.path.exists(caminho):
+          raise FileNotFoundError(f"Banco de resultados não encontrado: {caminho}")
+
+      with ArmazenamentoResultados(caminho) as armazenamento:
+          if args.remover_antigos is not None:
+              removidos = armazenamento.remover_antigos(args.remover_antigos)
+              print(f"{removidos} resultado(s) removido(s).", file=sys.stderr)
+              return
+
+          filtros = {coluna: valor for coluna, valor in (
+              ("doc_type", args.tipo), ("cpf", args.cpf), ("registro", args.registro), ("placa", args.placa),
+              ("cavalo", args.cavalo), ("hash_pdf", args.hash), ("status", args.status)) if valor}
+          desde = time.time() - args.dias * 86400 if args.dias else None
+          registros = armazenamento.consultar(filtros, desde=desde, limite=args.limite)
+
+          if args.saida:
+              with open(args.saida, "w", encoding="utf-8", newline="") as f_saida:
+                  total = ArmazenamentoResultados.exportar(registros, f_saida, args.formato)
+          else:
+              total = ArmazenamentoResultados.exportar(registros, sys.stdout, args.formato)
+      print(f"{total} resultado(s) exportado(s).", file=sys.stderr)
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+from src.utils.utils import Utils
+from src.services.rasterizacao.rasterizacao import Rasterizador
+from src.services.modelos.modelos import RegistroModelos
+from src.services.ocr.ocr import BackendsOCR
+from src.services.preprocessamento.preprocessamento import PaginaPreprocessada
+from src.services.tipos_campo.tipos_campo import TiposCampo
+from src.services.utils.utils_services import UtilsServices
+
+
+class AvaliacaoModelo:
+  """
+  Avaliação de um modelo de coordenadas (data/coord_*.json) sobre documentos reais, sem interface gráfica.
+  Cada PDF da pasta é renderizado a 300 dpi e cada caixa do modelo passa pelo OCR sozinha (com o perfil e o
+  tipo declarados no campo), medindo o tempo de cada uma. Com gabarito (JSON {campo: valor} com o mesmo nome
+  do PDF), mede também a acurácia por campo.
+
+  O relatório traz, por campo: latência do OCR (média, p50, p95, máxima), taxa de resultado vazio, taxa de
+  reprovação no validador do tipo, acurácia e tamanho da caixa; e o ranking das caixas mais lentas e das piores.
+  Com --sobreposicoes, grava para cada PDF a imagem com as caixas desenhadas (mesmo desenho do
+  marcar_campos_matplotlib.py): verde = acerto (ou lido, sem gabarito), vermelho = erro, amarelo = vazio/inválido.
+  """
+
+  COR_ACERTO = (0, 255, 0)
+  COR_ERRO = (0, 0, 255)
+  COR_VAZIO = (0, 215, 255)
+
+  # Exemplos de divergência guardados por campo no relatório
+  EXEMPLOS_ERRO = 3
+
+  @staticmethod
+  def normalizar(texto):
+      return " ".join(str(texto or "").upper().split())
+
+  @staticmethod
+  def carregar_gabarito(caminho_pdf, pasta_gabarito=None):
+      """Gabarito do PDF: <nome>.json na pasta informada ou ao lado do PDF; None se não existir."""
+      nome = os.path.splitext(os.path.basename(caminho_pdf))[0] + ".json"
+      caminho = os.path.join(pasta_gabarito or os.path.dirname(caminho_pdf), nome)
+      if not os.path.exists(caminho):
+          return None
+      with open(caminho, encoding="utf-8") as f:
+          return json.load(f)
+
+  @staticmethod
+  def avaliar_documento(caminho_pdf, modelo, backend, base_path, pagina=0, gabarito=None):
+      """
+      OCR de cada caixa do modelo em uma página do PDF.
+      Retorna (imagem renderizada, {campo: {"texto", "ms", "vazio", "valido", "acertou"}}).
+      """
+      imagem, _ = Rasterizador.renderizar(caminho_pdf, base_path, pagina=pagina)
+      pagina_preprocessada = PaginaPreprocessada(imagem)
+
+      leituras = {}
+      for campo, coords in modelo.regioes.items():
+          tipo = modelo.tipos.get(campo)
+          inicio = time.perf_counter()
+          texto = UtilsServices.ocr_regiao(pagina_preprocessada, coords, backend,
+                                           perfil=modelo.perfis.get(campo), tipo=tipo)
+          ms = (time.perf_counter() - inicio) * 1000
+          texto, valido = TiposCampo.validar(texto, tipo)
+
+          acertou = None
+          if gabarito is not None and campo in gabarito:
+              acertou = AvaliacaoModelo.normalizar(texto) == AvaliacaoModelo.normalizar(gabarito[campo])
+          leituras[campo] = {"texto": texto, "ms": ms, "vazio": not texto.strip(),
+                             "valido": valido if tipo else None, "acertou": acertou}
+      return imagem, leituras
+
+  @staticmethod
+  def desenhar(imagem, modelo, leituras):
+      """Imagem colorida com as caixas do modelo, o nome do campo e o tempo de OCR de cada uma."""
+      marcada = cv2.cvtColor(imagem, cv2.COLOR_GRAY2BGR) if imagem.ndim == 2 else imagem.copy()
+      for campo, (x1, y1, x2, y2) in modelo.regioes.items():
+          leitura = leituras[campo]
+          if leitura["acertou"] is False:
+              cor = AvaliacaoModelo.COR_ERRO
+          elif leitura["vazio"] or leitura["valido"] is False:
+              cor = AvaliacaoModelo.COR_VAZIO
+          else:
+              cor = AvaliacaoModelo.COR_ACERTO
+          cv2.rectangle(marcada, (x1, y1), (x2, y2), cor, 2)
+          cv2.putText(marcada, f"{campo} {leitura['ms']:.0f}ms", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, cor, 2)
+      return marcada
+
+  @staticmethod
+  def percentil(valores, fracao):
+      ordenados = sorted(valores)
+      return ordenados[min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))]
+
+  @staticmethod
+  def resumir(modelo, leituras_por_documento):
+      """Estatísticas por campo a partir de [(caminho_pdf, leituras, gabarito)]."""
+      campos = {}
+      for campo, (x1, y1, x2, y2) in modelo.regioes.items():
+          tempos, vazios, invalidos, tipados, acertos, com_gabarito, exemplos = [], 0, 0, 0, 0, 0, []
+          for caminho_pdf, leituras, gabarito in leituras_por_documento:
+              leitura = leituras[campo]
+              tempos.append(leitura["ms"])
+              vazios += leitura["vazio"]
+              if leitura["valido"] is not None:
+                  tipados += 1
+                  invalidos += not leitura["valido"]
+              if leitura["acertou"] is not None:
+                  com_gabarito += 1
+                  acertos += leitura["acertou"]
+                  if not leitura["acertou"] and len(exemplos) < AvaliacaoModelo.EXEMPLOS_ERRO:
+                      exemplos.append({"pdf": os.path.basename(caminho_pdf), "lido": leitura["texto"], "esperado": gabarito[campo]})
+
+          campos[campo] = {
+              "caixa": [x1, y1, x2, y2],
+              "area_px": (x2 - x1) * (y2 - y1),
+              "ms_media": round(sum(tempos) / len(tempos), 2),
+              "ms_p50": round(AvaliacaoModelo.percentil(tempos, 0.5), 2),
+              "ms_p95": round(AvaliacaoModelo.percentil(tempos, 0.95), 2),
+              "ms_max": round(max(tempos), 2),
+              "taxa_vazio": round(vazios / len(tempos), 4),
+              "taxa_invalido": round(invalidos / tipados, 4) if tipados else None,
+              "acuracia": round(acertos / com_gabarito, 4) if com_gabarito else None,
+              "erros": exemplos
+          }
+      return campos
+
+  @staticmethod
+  def ranking(campos, quantidade):
+      """Caixas mais lentas (latência média) e piores (acurácia; sem gabarito, vazio + inválido)."""
+      def falha(item):
+          estatisticas = item[1]
+          if estatisticas["acuracia"] is not None:
+              return 1 - estatisticas["acuracia"]
+          return estatisticas["taxa_vazio"] + (estatisticas["taxa_invalido"] or 0)
+
+      lentos = sorted(campos.items(), key=lambda item: -item[1]["ms_media"])[:quantidade]
+      piores = [item for item in sorted(campos.items(), key=lambda item: -falha(item)) if falha(item) > 0][:quantidade]
+      return {
+          "mais_lentos": [{"campo": campo, "ms_media": e["ms_media"], "area_px": e["area_px"]} for campo, e in lentos],
+          "piores": [{"campo": campo, "acuracia": e["acuracia"], "taxa_vazio": e["taxa_vazio"],
+                      "taxa_invalido": e["taxa_invalido"]} for campo, e in piores]
+      }
+
+  @staticmethod
+  def avaliar(nome_modelo, documentos, base_path, pagina=0, pasta_gabarito=None, pasta_sobreposicoes=None, quantidade_ranking=5):
+      """Avalia o modelo sobre a lista de PDFs e devolve o relatório."""
+      from src.services.classificacao.classificacao import ClassificadorLayout
+
+      modelo = RegistroModelos.obter(nome_modelo, base_path)
+      doc_type = ClassificadorLayout.tipo_modelo(nome_modelo, base_path)
+      backend = BackendsOCR.para_documento(doc_type, base_path, modelo=nome_modelo)
+      if pasta_sobreposicoes:
+          os.makedirs(pasta_sobreposicoes, exist_ok=True)
+
+      avaliados, erros = [], []
+      inicio = time.perf_counter()
+      for caminho_pdf in documentos:
+          try:
+              gabarito = AvaliacaoModelo.carregar_gabarito(caminho_pdf, pasta_gabarito)
+              imagem, leituras = AvaliacaoModelo.avaliar_documento(caminho_pdf, modelo, backend, base_path, pagina, gabarito)
+          except Exception as e:
+              erros.append({"pdf": caminho_pdf, "mensagem": str(e)})
+              continue
+          avaliados.append((caminho_pdf, leituras, gabarito))
+
+          if pasta_sobreposicoes:
+              nome = f"{os.path.splitext(os.path.basename(caminho_pdf))[0]}_{nome_modelo}.jpg"
+              cv2.imwrite(os.path.join(pasta_sobreposicoes, nome), AvaliacaoModelo.desenhar(imagem, modelo, leituras))
+
+      campos = AvaliacaoModelo.resumir(modelo, avaliados) if avaliados else {}
+      return {
+          "modelo": nome_modelo,
+          "backend": backend.nome,
+          "documentos": len(avaliados),
+          "com_gabarito": sum(1 for _, _, gabarito in avaliados if gabarito is not None),
+          "tempo_total_s": round(time.perf_counter() - inicio, 3),
+          "ms_ocr_por_documento": round(sum(c["ms_media"] for c in campos.values()), 2),
+          "erros": erros,
+          "ranking": AvaliacaoModelo.ranking(campos, quantidade_ranking),
+          "campos": campos
+      }
+
+  @staticmethod
+  def main(argv):
+      """Ponto de entrada de main.py --avaliar-modelo MODELO PASTA|GLOB ... Retorna o código de saída."""
+      from src.services.lote.lote import Lote
+
+      parser = argparse.ArgumentParser(prog="main.py --avaliar-modelo",
+                                       description="Avalia as caixas de um modelo de coordenadas sobre uma pasta de PDFs.")
+      parser.add_argument("modelo", help="Nome do modelo, ex.: coord_cnh_digital.")
+      parser.add_argument("entrada", help="Pasta ou glob de PDFs do modelo.")
+      parser.add_argument("--gabarito", help="Pasta com os gabaritos <nome do PDF>.json (padrão: ao lado de cada PDF).")
+      parser.add_argument("--sobreposicoes", help="Pasta para as imagens com as caixas desenhadas.")
+      parser.add_argument("--pagina", type=int, default=1, help="Página avaliada de cada PDF (padrão: 1).")
+      parser.add_argument("--ranking", type=int, default=5, help="Quantidade de caixas em cada ranking (padrão: 5).")
+      parser.add_argument("--recursivo", action="store_true", help="Inclui subpastas.")
+      parser.add_argument("--saida", help="Arquivo JSON do relatório (padrão: saída padrão).")
+      args = parser.parse_args(argv)
+
+      base_path = Utils.get_base_path()
+      # O tipo informado ao Lote só satisfaz a listagem de pastas/globs; o modelo define o que é avaliado
+      documentos = [caminho for _, caminho in Lote.listar_documentos(args.entrada, doc_type=args.modelo, recursivo=args.recursivo)]
+      relatorio = AvaliacaoModelo.avaliar(args.modelo, documentos, base_path, args.pagina - 1, args.gabarito,
+                                          args.sobreposicoes, args.ranking)
+
+      for item in relatorio["ranking"]["mais_lentos"]:
+          print(f"LENTO  {item['campo']}: {item['ms_media']} ms ({item['area_px']} px²)", file=sys.stderr)
+      for item in relatorio["ranking"]["piores"]:
+          print(f"PIOR   {item['campo']}: acurácia {item['acuracia']}, vazio {item['taxa_vazio']}", file=sys.stderr)
+
+      texto = json.dumps(relatorio, ensure_ascii=False, indent=4)
+      if args.saida:
+          with open(args.saida, "w", encoding="utf-8") as f:
+              f.write(texto)
+      else:
+          print(texto)
+      return 1 if not relatorio["documentos"] else 0
@@ -0,0 +1,218 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from src.utils.utils import Utils
+from src.utils.cronometro import Cronometro
+
+
+class Benchmark:
+  """
+  Mede vazão, tempo por etapa, memória de pico e acurácia dos processadores sobre documentos sintéticos
+  (GeradorSintetico). O resultado é gravado em JSON; com --comparar, uma piora acima do limite em relação
+  a uma execução anterior faz o benchmark terminar com código 1. Documentos com erro ficam fora da vazão
+  e dos tempos por etapa; um tipo com erros (ou sem nenhum sucesso) faz o benchmark terminar com código 2.
+
+  Etapas medidas (segundos por documento, média): rasterizacao, camada_texto, ocr_cabecalho, ocr_campos,
+  leitura_texto e interpretacao (Buonny), saida (gravação do JSON), total.
+  """
+
+  VERSAO = 1
+  TIPOS_PADRAO = ["CNH", "CRLV", "TARIFAS_BUONNY"]
+
+  @staticmethod
+  def normalizar(texto):
+      return " ".join(str(texto or "").upper().split())
+
+  @staticmethod
+  def acuracia(doc_type, dados, gabarito):
+      """Retorna {campo: acertou} comparando o resultado com o gabarito (texto normalizado)."""
+      if dados.get("status") != "sucesso":
+          if doc_type == "TARIFAS_BUONNY":
+              return {"servicos": False}
+          return {campo: False for campo in gabarito}
+
+      if doc_type == "TARIFAS_BUONNY":
+          servicos = dados.get("servicos", [])
+          return {f"servico_{i}": i < len(servicos) and servicos[i] == esperado for i, esperado in enumerate(gabarito)}
+
+      return {campo: Benchmark.normalizar(dados.get(campo)) == Benchmark.normalizar(valor)
+              for campo, valor in gabarito.items()}
+
+  @staticmethod
+  def executar_documento(doc_type, caminho_pdf, base_path, pasta_saida):
+      """Processa um documento medindo as etapas; a gravação do JSON de saída entra como etapa "saida"."""
+      from src.services.processador.processador import Processador
+
+      with Cronometro.coletar() as etapas:
+          inicio = time.perf_counter()
+          dados = Processador.processar_seguro(doc_type, caminho_pdf, base_path)
+          with Cronometro.etapa("saida"):
+              Utils.write_json_output(dados, os.path.join(pasta_saida, os.path.basename(caminho_pdf) + ".json"))
+          etapas["total"] = time.perf_counter() - inicio
+      return dados, etapas
+
+  @staticmethod
+  def memoria_pico_mb(doc_type, caminho_pdf, base_path, pasta_saida):
+      """Memória de pico (alocações Python e numpy, via tracemalloc) de um documento, medida fora das rodadas de tempo."""
+      tracemalloc.start()
+      try:
+          Benchmark.executar_documento(doc_type, caminho_pdf, base_path, pasta_saida)
+          _, pico = tracemalloc.get_traced_memory()
+      finally:
+          tracemalloc.stop()
+      return round(pico / (1024 * 1024), 2)
+
+  @staticmethod
+  def executar(conjunto, base_path, pasta_saida, repeticoes=1):
+      """
+      Executa o benchmark sobre [(doc_type, caminho, gabarito)] e devolve o resumo por tipo de documento.
+      O primeiro documento de cada tipo é processado uma vez antes das medições (aquecimento).
+      """
+      por_tipo = {}
+      for doc_type, caminho_pdf, gabarito in conjunto:
+          por_tipo.setdefault(doc_type, []).append((caminho_pdf, gabarito))
+
+      resultados = {}
+      for doc_type, documentos in por_tipo.items():
+          Benchmark.executar_documento(doc_type, documentos[0][0], base_path, pasta_saida)
+
+          etapas_total, acertos, erros, mensagens_erro = {}, {}, 0, []
+          inicio = time.perf_counter()
+          for _ in range(repeticoes):
+              for caminho_pdf, gabarito in documentos:
+                  dados, etapas = Benchmark.executar_documento(doc_type, caminho_pdf, base_path, pasta_saida)
+                  if dados.get("status") != "sucesso":
+                      # Um erro costuma ser instantâneo: contá-lo na vazão mostraria um ganho que não existe
+                      erros += 1
+                      if dados.get("mensagem") not in mensagens_erro:
+                          mensagens_erro.append(dados.get("mensagem"))
+                  else:
+                      for etapa, segundos in etapas.items():
+                          etapas_total[etapa] = etapas_total.get(etapa, 0.0) + segundos
+                  for campo, acertou in Benchmark.acuracia(doc_type, dados, gabarito).items():
+                      chave = "servicos" if doc_type == "TARIFAS_BUONNY" else campo
+                      total_campo, certos = acertos.get(chave, (0, 0))
+                      acertos[chave] = (total_campo + 1, certos + (1 if acertou else 0))
+          tempo_total = time.perf_counter() - inicio
+
+          quantidade = len(documentos) * repeticoes
+          sucessos = quantidade - erros
+          tempo_sucessos = etapas_total.get("total", 0.0)
+          total_campos = sum(t for t, _ in acertos.values())
+          resultados[doc_type] = {
+              "documentos": quantidade,
+              "sucessos": sucessos,
+              "erros": erros,
+              "mensagens_erro": mensagens_erro,
+              "tempo_total_s": round(tempo_total, 3),
+              # Vazão e etapas só dos documentos processados com sucesso
+              "documentos_por_segundo": round(sucessos / tempo_sucessos, 3) if sucessos and tempo_sucessos > 0 else None,
+              "etapas_s": {etapa: round(segundos / sucessos, 4) for etapa, segundos in sorted(etapas_total.items())} if sucessos else {},
+              "memoria_pico_mb": Benchmark.memoria_pico_mb(doc_type, documentos[0][0], base_path, pasta_saida),
+              "acuracia": round(sum(c for _, c in acertos.values()) / total_campos, 4) if total_campos else None,
+              "acuracia_por_campo": {campo: round(c / t, 4) for campo, (t, c) in acertos.items()}
+          }
+      return resultados
+
+  @staticmethod
+  def comparar(atual, anterior, limite=0.10, limite_acuracia=0.01):
+      """
+      Compara duas execuções. Retorna a lista de regressões:
+      vazão (documentos/s) ou memória de pico piores que `limite` (fração) e acurácia menor que `limite_acuracia` (absoluto).
+      """
+      regressoes = []
+      for doc_type, resultado in atual["tipos"].items():
+          base = anterior.get("tipos", {}).get(doc_type)
+          if not base:
+              continue
+
+          vazao, vazao_base = resultado.get("documentos_por_segundo"), base.get("documentos_por_segundo")
+          if vazao and vazao_base and vazao < vazao_base * (1 - limite):
+              regressoes.append(f"{doc_type}: documentos/s caiu de {vazao_base} para {vazao}")
+
+          memoria, memoria_base = resultado.get("memoria_pico_mb"), base.get("memoria_pico_mb")
+          if memoria and memoria_base and memoria > memoria_base * (1 + limite):
+              regressoes.append(f"{doc_type}: memória de pico subiu de {memoria_base} MB para {memoria} MB")
+
+          acuracia, acuracia_base = resultado.get("acuracia"), base.get("acuracia")
+          if acuracia is not None and acuracia_base is not None and acuracia < acuracia_base - limite_acuracia:
+              regressoes.append(f"{doc_type}: acurácia caiu de {acuracia_base} para {acuracia}")
+      return regressoes
+
+  @staticmethod
+  def main(argv):
+      """Ponto de entrada do benchmark (main.py --benchmark ...). Retorna o código de saída."""
+      from src.services.benchmark.gerador_sintetico import GeradorSintetico
+
+      parser = argparse.ArgumentParser(prog="main.py --benchmark",
+                                       description="Benchmark dos processadores com documentos sintéticos.")
+      parser.add_argument("--tipos", default=",".join(Benchmark.TIPOS_PADRAO),
+                          help="Tipos de documento separados por vírgula (padrão: CNH,CRLV,TARIFAS_BUONNY).")
+      parser.add_argument("--documentos", type=int, default=8, help="Documentos sintéticos por tipo (padrão: 8).")
+      parser.add_argument("--paginas-buonny", type=int, default=50, help="Páginas de cada demonstrativo Buonny (padrão: 50).")
+      parser.add_argument("--repeticoes", type=int, default=1, help="Rodadas de medição sobre o conjunto (padrão: 1).")
+      parser.add_argument("--escaneado", action="store_true",
+                          help="Grava CNH/CRLV só como imagem, sem camada de texto (força o OCR).")
+      parser.add_argument("--semente", type=int, default=0, help="Semente dos valores sintéticos.")
+      parser.add_argument("--pasta", help="Pasta para os PDFs gerados e os JSONs de saída (padrão: pasta temporária).")
+      parser.add_argument("--saida", help="Arquivo JSON com os resultados (padrão: saída padrão).")
+      parser.add_argument("--comparar", help="JSON de uma execução anterior; regressões acima do limite retornam código 1.")
+      parser.add_argument("--limite", type=float, default=0.10,
+                          help="Piora relativa tolerada em documentos/s e memória de pico (padrão: 0.10).")
+      parser.add_argument("--limite-acuracia", type=float, default=0.01,
+                          help="Queda absoluta tolerada na acurácia (padrão: 0.01).")
+      args = parser.parse_args(argv)
+
+      # O benchmark mede o processamento, não o cache
+      os.environ["EXTRATOR_CACHE"] = "0"
+
+      base_path = Utils.get_base_path()
+      tipos = [t.strip().upper() for t in args.tipos.split(",") if t.strip()]
+      pasta = args.pasta or tempfile.mkdtemp(prefix="extrator_benchmark_")
+      pasta_saida = os.path.join(pasta, "saida")
+      os.makedirs(pasta_saida, exist_ok=True)
+
+      gerador = GeradorSintetico(base_path, semente=args.semente)
+      conjunto = gerador.gerar_conjunto(pasta, tipos, args.documentos, args.paginas_buonny, escaneado=args.escaneado)
+
+      resultado = {
+          "versao": Benchmark.VERSAO,
+          "data": datetime.datetime.now().isoformat(timespec="seconds"),
+          "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+          "parametros": {"tipos": tipos, "documentos": args.documentos, "paginas_buonny": args.paginas_buonny,
+                         "repeticoes": args.repeticoes, "escaneado": args.escaneado, "semente": args.semente,
+                         "opcoes": {chave: valor for chave, valor in sorted(os.environ.items()) if chave.startswith("EXTRATOR_")}},
+          "tipos": Benchmark.executar(conjunto, base_path, pasta_saida, repeticoes=args.repeticoes)
+      }
+
+      codigo = 0
+      falhas = [f"{doc_type}: {r['erros']} de {r['documentos']} documentos com erro ({'; '.join(map(str, r['mensagens_erro']))})"
+                for doc_type, r in resultado["tipos"].items() if r["erros"] or not r["sucessos"]]
+      for falha in falhas:
+          print(f"FALHA  {falha}", file=sys.stderr)
+
+      if args.comparar:
+          with open(args.comparar, encoding="utf-8") as f:
+              anterior = json.load(f)
+          regressoes = Benchmark.comparar(resultado, anterior, args.limite, args.limite_acuracia)
+          resultado["regressoes"] = regressoes
+          for regressao in regressoes:
+              print(f"REGRESSÃO  {regressao}", file=sys.stderr)
+          codigo = 1 if regressoes else 0
+      if falhas:
+          resultado["falhas"] = falhas
+          codigo = 2
+
+      texto = json.dumps(resultado, ensure_ascii=False, indent=4)
+      if args.saida:
+          with open(args.saida, "w", encoding="utf-8") as f:
+              f.write(texto)
+      else:
+          print(texto)
+      return codigo
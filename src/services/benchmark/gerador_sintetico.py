@@ -0,0 +1,181 @@
+import os
+import random
+from src.services.modelos.modelos import RegistroModelos
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+class GeradorSintetico:
+  """
+  Gera PDFs sintéticos com conteúdo conhecido (gabarito) para o benchmark, sem depender de documentos reais.
+  CNH e CRLV: o texto de cada campo é escrito dentro da caixa do JSON de data/ correspondente.
+  Buonny: demonstrativo com N páginas de linhas de serviço no formato lido por TarifasBuonny.
+  Com escaneado=True a página é rasterizada e gravada só como imagem, para forçar o caminho do OCR.
+  """
+
+  # Pixels a 300 dpi -> pontos do PDF
+  ESCALA = 72.0 / 300
+  # Página A4 em pontos
+  LARGURA_PAGINA, ALTURA_PAGINA = 595, 842
+  DPI_ESCANEADO = 200
+
+  CABECALHOS = {
+      "coord_cnh_nacional": ["REPÚBLICA FEDERATIVA DO BRASIL", "CARTEIRA NACIONAL DE HABILITAÇÃO",
+                             "DRIVER LICENSE PERMISO DE CONDUCCIÓN"],
+      "coord_cnh_digital": ["REPÚBLICA FEDERATIVA DO BRASIL", "CARTEIRA NACIONAL DE HABILITAÇÃO", "CNH DIGITAL NC"],
+      "coord_cnh_antiga": ["REPÚBLICA FEDERATIVA DO BRASIL", "CARTEIRA NACIONAL DE HABILITAÇÃO", "CNH DIGITAL"],
+      "coord_cnh_estadual": ["REPÚBLICA FEDERATIVA DO BRASIL", "CARTEIRA NACIONAL DE HABILITAÇÃO", "DEPARTAMENTO DE TRÂNSITO"],
+      "coord_crlv": ["CERTIFICADO DE REGISTRO E LICENCIAMENTO DE VEÍCULO"],
+  }
+
+  NOMES = ["JOAO", "MARIA", "JOSE", "ANA", "CARLOS", "PAULA", "PEDRO", "LUCIA", "MARCOS", "JULIANA"]
+  SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "PEREIRA", "LIMA", "COSTA", "FERREIRA", "ALMEIDA"]
+  TIPOS_BUONNY = ["AGREGADO", "CARRETEIRO", "FUNCIONARIO"]
+
+  def __init__(self, base_path, semente=0):
+      if fitz is None:
+          raise ImportError("O gerador de documentos sintéticos requer o pacote PyMuPDF instalado.")
+      self.base_path = base_path
+      self.aleatorio = random.Random(semente)
+
+  # --- Valores dos campos ---
+
+  def _cpf(self):
+      digitos = [self.aleatorio.randint(0, 9) for _ in range(9)]
+      for tamanho in (9, 10):
+          soma = sum(d * (tamanho + 1 - i) for i, d in enumerate(digitos[:tamanho]))
+          digitos.append((soma * 10 % 11) % 10)
+      texto = "".join(map(str, digitos))
+      return f"{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}"
+
+  def _data(self):
+      return f"{self.aleatorio.randint(1, 28):02d}/{self.aleatorio.randint(1, 12):02d}/{self.aleatorio.randint(1960, 2030)}"
+
+  def _placa(self):
+      letras = "".join(self.aleatorio.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+      return f"{letras}{self.aleatorio.randint(0, 9)}{self.aleatorio.choice('ABCDEFGHIJ0123456789')}{self.aleatorio.randint(0, 99):02d}"
+
+  def _numero(self, digitos):
+      return "".join(str(self.aleatorio.randint(0, 9)) for _ in range(digitos))
+
+  def _nome(self, palavras=3):
+      return " ".join([self.aleatorio.choice(GeradorSintetico.NOMES)] +
+                      [self.aleatorio.choice(GeradorSintetico.SOBRENOMES) for _ in range(palavras - 1)])
+
+  def valor_campo(self, campo):
+      """Valor plausível para o campo, escolhido pelo nome (cpf, datas, placa, números, nomes)."""
+      if campo == "cpf":
+          return self._cpf()
+      if campo.startswith("data") or campo in ("validade", "primeira_hab"):
+          return self._data()
+      if campo == "placa":
+          return self._placa()
+      if campo in ("exercicio", "ano_fabricacao", "ano_modelo"):
+          return str(self.aleatorio.randint(1995, 2025))
+      if campo in ("registro", "renavan", "crv", "cod_seguranca", "identidade"):
+          return self._numero(11)
+      if campo == "categoria":
+          return self.aleatorio.choice(["A", "B", "AB", "C", "D", "E"])
+      if campo.startswith("nome"):
+          return self._nome()
+      return self._nome(2)
+
+  # --- Escrita no PDF ---
+
+  @staticmethod
+  def _escrever_na_caixa(pagina, coords, texto):
+      """Escreve o texto em uma linha, com a maior fonte que couber na caixa (coordenadas em pixels a 300 dpi)."""
+      x1, y1, x2, y2 = (c * GeradorSintetico.ESCALA for c in coords)
+      largura, altura = x2 - x1, y2 - y1
+      tamanho = min(altura * 0.7, 14)
+      while tamanho > 4 and fitz.get_text_length(texto, fontname="helv", fontsize=tamanho) > largura - 2:
+          tamanho -= 0.5
+      baseline = y1 + (altura + tamanho * 0.7) / 2
+      pagina.insert_text((x1 + 1, baseline), texto, fontname="helv", fontsize=tamanho)
+
+  @staticmethod
+  def _escrever_linhas(pagina, coords, linhas):
+      x1, y1, x2, y2 = coords
+      altura_linha = (y2 - y1) // max(1, len(linhas))
+      for i, linha in enumerate(linhas):
+          GeradorSintetico._escrever_na_caixa(pagina, (x1, y1 + i * altura_linha, x2, y1 + (i + 1) * altura_linha), linha)
+
+  @staticmethod
+  def _salvar(documento, caminho, escaneado):
+      if escaneado:
+          imagem = fitz.open()
+          for pagina in documento:
+              pix = pagina.get_pixmap(dpi=GeradorSintetico.DPI_ESCANEADO)
+              nova = imagem.new_page(width=pagina.rect.width, height=pagina.rect.height)
+              nova.insert_image(nova.rect, pixmap=pix)
+          imagem.save(caminho)
+          imagem.close()
+      else:
+          documento.save(caminho)
+      documento.close()
+
+  def gerar_documento(self, nome_modelo, nome_cabecalho, caminho, escaneado=False):
+      """Gera um PDF de CNH/CRLV para o modelo informado. Retorna o gabarito {campo: valor}."""
+      modelo = RegistroModelos.obter(nome_modelo, self.base_path)
+      cabecalho = RegistroModelos.obter(nome_cabecalho, self.base_path)
+
+      documento = fitz.open()
+      pagina = documento.new_page(width=GeradorSintetico.LARGURA_PAGINA, height=GeradorSintetico.ALTURA_PAGINA)
+      GeradorSintetico._escrever_linhas(pagina, cabecalho.regioes["cabecalho"], GeradorSintetico.CABECALHOS[nome_modelo])
+
+      gabarito = {}
+      for campo, coords in modelo.regioes.items():
+          gabarito[campo] = self.valor_campo(campo)
+          GeradorSintetico._escrever_na_caixa(pagina, coords, gabarito[campo])
+
+      GeradorSintetico._salvar(documento, caminho, escaneado)
+      return gabarito
+
+  def gerar_buonny(self, caminho, paginas, linhas_por_pagina=40, escaneado=False):
+      """Gera um demonstrativo Buonny com `paginas` páginas. Retorna o gabarito (lista de serviços)."""
+      documento = fitz.open()
+      servicos = []
+      for numero in range(paginas):
+          pagina = documento.new_page(width=GeradorSintetico.LARGURA_PAGINA, height=GeradorSintetico.ALTURA_PAGINA)
+          pagina.insert_text((40, 40), f"DEMONSTRATIVO DE SERVIÇOS - PÁGINA {numero + 1}", fontname="helv", fontsize=10)
+          for linha in range(linhas_por_pagina):
+              servico = {
+                  "data": self._data(),
+                  "nome": self._nome(),
+                  "rg": self._numero(9),
+                  "cavalo": self._placa(),
+                  "valor": f"R$ {self.aleatorio.randint(10, 999)},{self.aleatorio.randint(0, 99):02d}"
+              }
+              carreta = f" {self._placa()}" if self.aleatorio.random() < 0.5 else ""
+              texto = (f"{servico['data']} {servico['nome']} {servico['rg']} {servico['cavalo']}{carreta} "
+                       f"{self.aleatorio.choice(GeradorSintetico.TIPOS_BUONNY)} {servico['valor']}")
+              pagina.insert_text((40, 70 + linha * 18), texto, fontname="helv", fontsize=8)
+              servicos.append(servico)
+
+      GeradorSintetico._salvar(documento, caminho, escaneado)
+      return servicos
+
+  def gerar_conjunto(self, pasta, tipos, documentos, paginas_buonny, escaneado=False):
+      """
+      Gera os PDFs do benchmark na pasta. Os modelos de CNH se alternam entre os documentos.
+      Retorna [(doc_type, caminho, gabarito)].
+      """
+      os.makedirs(pasta, exist_ok=True)
+      conjunto = []
+      for doc_type in tipos:
+          for i in range(documentos):
+              caminho = os.path.join(pasta, f"{doc_type.lower()}_{i:03d}.pdf")
+              if doc_type == "CNH":
+                  nome_modelo = list(GeradorSintetico.CABECALHOS)[i % 4]
+                  gabarito = self.gerar_documento(nome_modelo, "coord_cabecalho_cnh", caminho, escaneado)
+              elif doc_type == "CRLV":
+                  gabarito = self.gerar_documento("coord_crlv", "coord_cabecalho_crlv", caminho, escaneado)
+              elif doc_type == "TARIFAS_BUONNY":
+                  gabarito = self.gerar_buonny(caminho, paginas_buonny, escaneado=False)
+              else:
+                  raise ValueError(f"Tipo de documento sem gerador sintético: '{doc_type}'.")
+              conjunto.append((doc_type, caminho, gabarito))
+      return conjunto
@@ -0,0 +1,219 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from src.services.modelos.modelos import RegistroModelos
+from src.utils.configuracao import Configuracao
+
+
+class CacheResultados:
+  """
+  Cache local de resultados, endereçado pelo conteúdo do PDF.
+  A chave combina o hash SHA-256 do PDF, o tipo do documento e uma impressão digital dos
+  modelos de coordenadas carregados no RegistroModelos (mais os demais arquivos de data/ e as opções
+  que mudam o resultado). Alterar um JSON de data/ muda a impressão e invalida automaticamente as entradas afetadas.
+  Entradas de impressões antigas não são apagadas na gravação (processos com opções diferentes dividem
+  o mesmo arquivo): saem pela idade ou pelo limite de tamanho, como as demais.
+
+  Configuração (variáveis de ambiente):
+    EXTRATOR_CACHE=1                 habilita o cache
+    EXTRATOR_CACHE_CAMINHO           arquivo SQLite (padrão: pasta temporária do sistema)
+    EXTRATOR_CACHE_TAMANHO_MB=256    tamanho máximo; acima disso remove as entradas menos usadas (LRU)
+    EXTRATOR_CACHE_DIAS=30           idade máxima de uma entrada sem acesso
+  """
+
+  # Incrementar quando a lógica de extração mudar de forma que resultados antigos deixem de valer
+  VERSAO = "1"
+
+  # Tipos cujo resultado depende dos modelos de coordenadas. Todos os modelos entram na impressão, não só os
+  # do tipo: o classificador de layout compara a página com as referências de todos eles (ex.: CNH x coord_crlv).
+  TIPOS_COM_MODELOS = ("CNH", "CRLV")
+
+  # Outros arquivos de data/ que influenciam o resultado de cada tipo de documento
+  ARQUIVOS_POR_TIPO = {
+      "CNH": ["ocr_backends.json"],
+      "CRLV": ["ocr_backends.json"],
+      "TARIFAS_BUONNY": []
+  }
+
+  # Opções que mudam o conteúdo do resultado
+  OPCOES_RELEVANTES = ["MODO_OCR", "OCR_BACKEND", "CAMADA_TEXTO", "RASTERIZADOR", "RASTER_RECORTE",
+                       "CORRIGIR_INCLINACAO", "REDUZIR_RUIDO", "BUONNY_TEXTO",
+                       "DPI_INICIAL", "DPI_ESCALONAMENTO", "CLASSIFICACAO_LAYOUT", "QRCODE"]
+
+  _conexoes = {}
+  _trava = threading.Lock()
+
+  @staticmethod
+  def habilitado():
+      return Configuracao.obter_bool("CACHE", False)
+
+  @staticmethod
+  def caminho_banco():
+      return Configuracao.obter("CACHE_CAMINHO", os.path.join(tempfile.gettempdir(), "extrator_dados_pdf_cache.sqlite3"))
+
+  @staticmethod
+  def _conexao():
+      """Uma conexão por processo e por thread (o modo lote usa vários processos sobre o mesmo arquivo)."""
+      chave = (os.getpid(), threading.get_ident(), CacheResultados.caminho_banco())
+      with CacheResultados._trava:
+          conexao = CacheResultados._conexoes.get(chave)
+          if conexao is None:
+              conexao = sqlite3.connect(chave[2], timeout=30)
+              conexao.execute("PRAGMA journal_mode=WAL")
+              conexao.execute("""
+                  CREATE TABLE IF NOT EXISTS resultados (
+                      chave TEXT PRIMARY KEY,
+                      hash_pdf TEXT NOT NULL,
+                      doc_type TEXT NOT NULL,
+                      impressao TEXT NOT NULL,
+                      dados TEXT NOT NULL,
+                      tamanho INTEGER NOT NULL,
+                      criado_em REAL NOT NULL,
+                      acessado_em REAL NOT NULL
+                  )""")
+              conexao.execute("CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON resultados (acessado_em)")
+              conexao.execute("CREATE TABLE IF NOT EXISTS estatisticas (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+              conexao.commit()
+              CacheResultados._conexoes[chave] = conexao
+      return conexao
+
+  @staticmethod
+  def hash_arquivo(caminho):
+      """SHA-256 do conteúdo do arquivo, lido em blocos."""
+      h = hashlib.sha256()
+      with open(caminho, "rb") as f:
+          for bloco in iter(lambda: f.read(1024 * 1024), b""):
+              h.update(bloco)
+      return h.hexdigest()
+
+  @staticmethod
+  def impressao_modelos(doc_type, base_path):
+      """
+      Impressão digital dos modelos de coordenadas, dos arquivos de data/ do tipo e das opções que alteram o resultado.
+      Os modelos entram como o RegistroModelos os carregou (os mesmos que o processamento usa), inclusive os inválidos.
+      """
+      h = hashlib.sha256()
+      h.update(f"versao={CacheResultados.VERSAO};tipo={doc_type}".encode("utf-8"))
+
+      if doc_type in CacheResultados.TIPOS_COM_MODELOS:
+          for nome in sorted(RegistroModelos.nomes(base_path)):
+              modelo = RegistroModelos.obter(nome, base_path)
+              campos = {campo: [list(regiao.coords), regiao.opcoes] for campo, regiao in modelo.campos.items()}
+              h.update(json.dumps([nome, campos, modelo.metadados], sort_keys=True, default=str).encode("utf-8"))
+          h.update(json.dumps(RegistroModelos.erros(base_path), sort_keys=True).encode("utf-8"))
+
+      pasta_data = os.path.join(base_path, 'data')
+      arquivos = set()
+      for padrao in CacheResultados.ARQUIVOS_POR_TIPO.get(doc_type, []):
+          arquivos.update(glob.glob(os.path.join(pasta_data, padrao)))
+
+      for caminho in sorted(arquivos):
+          h.update(os.path.basename(caminho).encode("utf-8"))
+          with open(caminho, "rb") as f:
+              h.update(f.read())
+
+      for opcao in CacheResultados.OPCOES_RELEVANTES:
+          h.update(f";{opcao}={Configuracao.obter(opcao, '')}".encode("utf-8"))
+
+      return h.hexdigest()
+
+  @staticmethod
+  def _incrementar(conexao, nome):
+      conexao.execute(
+          "INSERT INTO estatisticas (nome, valor) VALUES (?, 1) ON CONFLICT(nome) DO UPDATE SET valor = valor + 1",
+          (nome,)
+      )
+
+  @staticmethod
+  def obter(doc_type, caminho_pdf, base_path):
+      """
+      Procura o resultado em cache. Retorna (dados ou None, chave); a chave é usada em gravar().
+      """
+      hash_pdf = CacheResultados.hash_arquivo(caminho_pdf)
+      impressao = CacheResultados.impressao_modelos(doc_type, base_path)
+      chave = f"{hash_pdf}:{doc_type}:{impressao}"
+
+      conexao = CacheResultados._conexao()
+      linha = conexao.execute("SELECT dados FROM resultados WHERE chave = ?", (chave,)).fetchone()
+      if linha is None:
+          CacheResultados._incrementar(conexao, "misses")
+          conexao.commit()
+          return None, (chave, hash_pdf, impressao)
+
+      conexao.execute("UPDATE resultados SET acessado_em = ? WHERE chave = ?", (time.time(), chave))
+      CacheResultados._incrementar(conexao, "hits")
+      conexao.commit()
+      return json.loads(linha[0]), (chave, hash_pdf, impressao)
+
+  @staticmethod
+  def gravar(doc_type, identificacao, dados):
+      """Grava um resultado de sucesso e aplica a política de remoção."""
+      if dados.get("status") != "sucesso":
+          return
+
+      chave, hash_pdf, impressao = identificacao
+      conteudo = json.dumps(dados, ensure_ascii=False, separators=(",", ":"))
+      agora = time.time()
+
+      conexao = CacheResultados._conexao()
+      conexao.execute(
+          "INSERT OR REPLACE INTO resultados (chave, hash_pdf, doc_type, impressao, dados, tamanho, criado_em, acessado_em) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+          (chave, hash_pdf, doc_type, impressao, conteudo, len(conteudo.encode("utf-8")), agora, agora)
+      )
+      CacheResultados._remover_excedentes(conexao, agora)
+      conexao.commit()
+
+  @staticmethod
+  def _remover_excedentes(conexao, agora):
+      """Remove entradas antigas (por idade) e, se o cache passou do limite de tamanho, as menos acessadas."""
+      idade_maxima = Configuracao.obter_int("CACHE_DIAS", 30) * 86400
+      removidas = conexao.execute("DELETE FROM resultados WHERE acessado_em < ?", (agora - idade_maxima,)).rowcount
+
+      tamanho_maximo = Configuracao.obter_int("CACHE_TAMANHO_MB", 256) * 1024 * 1024
+      tamanho_atual = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM resultados").fetchone()[0]
+      if tamanho_atual > tamanho_maximo:
+          # Libera até 90% do limite para não remover a cada nova gravação
+          excesso = tamanho_atual - int(tamanho_maximo * 0.9)
+          for chave, tamanho in conexao.execute("SELECT chave, tamanho FROM resultados ORDER BY acessado_em").fetchall():
+              if excesso <= 0:
+                  break
+              conexao.execute("DELETE FROM resultados WHERE chave = ?", (chave,))
+              excesso -= tamanho
+              removidas += 1
+
+      if removidas:
+          conexao.execute(
+              "INSERT INTO estatisticas (nome, valor) VALUES ('removidas', ?) ON CONFLICT(nome) DO UPDATE SET valor = valor + ?",
+              (removidas, removidas)
+          )
+
+  @staticmethod
+  def estatisticas():
+      """Contadores de acertos/falhas, entradas e tamanho atual do cache."""
+      conexao = CacheResultados._conexao()
+      contadores = dict(conexao.execute("SELECT nome, valor FROM estatisticas").fetchall())
+      entradas, tamanho = conexao.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM resultados").fetchone()
+      hits, misses = contadores.get("hits", 0), contadores.get("misses", 0)
+      return {
+          "caminho": CacheResultados.caminho_banco(),
+          "hits": hits,
+          "misses": misses,
+          "taxa_acerto": round(hits / (hits + misses), 4) if hits + misses else None,
+          "removidas": contadores.get("removidas", 0),
+          "entradas": entradas,
+          "tamanho_bytes": tamanho
+      }
+
+  @staticmethod
+  def limpar():
+      """Remove todas as entradas e zera os contadores."""
+      conexao = CacheResultados._conexao()
+      conexao.execute("DELETE FROM resultados")
+      conexao.execute("DELETE FROM estatisticas")
+      conexao.commit()
@@ -0,0 +1,99 @@
+import threading
+from src.utils.configuracao import Configuracao
+from src.utils.cronometro import Cronometro
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+class CamadaTexto:
+  """
+  Leitura da camada de texto de PDFs gerados digitalmente (CNH Digital, CRLV-e).
+  Quando a camada existe, o texto de cada campo é lido direto do PDF, sem rasterizar nem rodar OCR.
+  As caixas dos JSONs de data/ estão em pixels a 300 dpi e são convertidas para pontos do PDF (1/72 pol.).
+  """
+
+  # Mínimo de palavras na página para considerar que a camada de texto é utilizável
+  MINIMO_PALAVRAS = 5
+  # Tolerância vertical (em pontos) para considerar duas palavras na mesma linha
+  TOLERANCIA_LINHA = 3
+  # O PyMuPDF não pode ser usado por várias threads ao mesmo tempo (páginas processadas em paralelo).
+  # A mesma trava é usada pelo Rasterizador.
+  TRAVA_PYMUPDF = threading.Lock()
+
+  @staticmethod
+  def habilitada():
+      return Configuracao.obter_bool("CAMADA_TEXTO", True)
+
+  @staticmethod
+  def palavras_pagina(caminho_pdf, pagina=0):
+      """
+      Retorna as palavras da página como tuplas (x0, y0, x1, y1, texto) em pontos,
+      ou None se a página não tiver uma camada de texto utilizável (ex.: PDF escaneado).
+      """
+      with Cronometro.etapa("camada_texto"):
+          if fitz is not None:
+              # Mesmo isolamento das chamadas do Rasterizador (EXTRATOR_RASTERIZACAO_ISOLADA)
+              from src.services.rasterizacao.rasterizacao import Rasterizador
+              palavras = Rasterizador.chamar_pymupdf(CamadaTexto._palavras_pymupdf, caminho_pdf, pagina)
+              if palavras is None:
+                  return None
+          else:
+              import pdfplumber
+              with pdfplumber.open(caminho_pdf) as pdf:
+                  if pagina >= len(pdf.pages):
+                      return None
+                  palavras = [(p["x0"], p["top"], p["x1"], p["bottom"], p["text"]) for p in pdf.pages[pagina].extract_words()]
+
+      palavras = [p for p in palavras if p[4].strip()]
+      if len(palavras) < CamadaTexto.MINIMO_PALAVRAS:
+          return None
+      return palavras
+
+  @staticmethod
+  def _palavras_pymupdf(caminho_pdf, pagina):
+      with CamadaTexto.TRAVA_PYMUPDF, fitz.open(caminho_pdf) as documento:
+          if pagina >= documento.page_count:
+              return None
+          return [(p[0], p[1], p[2], p[3], p[4]) for p in documento[pagina].get_text("words")]
+
+  @staticmethod
+  def texto_regiao(palavras, coords, dpi=300):
+      """
+      Junta, na ordem de leitura, as palavras cujo centro está dentro da caixa (coordenadas em pixels no dpi informado).
+      Retorna o texto no mesmo formato do OCR: uma única linha, sem espaços nas pontas.
+      """
+      escala = 72.0 / dpi
+      x1, y1 = min(coords[0], coords[2]) * escala, min(coords[1], coords[3]) * escala
+      x2, y2 = max(coords[0], coords[2]) * escala, max(coords[1], coords[3]) * escala
+
+      dentro = []
+      for palavra in palavras:
+          centro_x, centro_y = (palavra[0] + palavra[2]) / 2, (palavra[1] + palavra[3]) / 2
+          if x1 <= centro_x <= x2 and y1 <= centro_y <= y2:
+              dentro.append(palavra)
+
+      return " ".join(CamadaTexto.linhas(dentro)).strip()
+
+  @staticmethod
+  def linhas(palavras):
+      """
+      Agrupa as palavras (x0, y0, x1, y1, texto) em linhas (centros verticais próximos)
+      e devolve o texto de cada linha, de cima para baixo e da esquerda para a direita.
+      """
+      ordenadas = sorted(((p[1] + p[3]) / 2, p[0], p[4]) for p in palavras)
+      linhas = []
+      for centro_y, px0, texto in ordenadas:
+          if linhas and centro_y - linhas[-1][0] <= CamadaTexto.TOLERANCIA_LINHA:
+              linhas[-1][1].append((px0, texto))
+          else:
+              linhas.append((centro_y, [(px0, texto)]))
+
+      return [" ".join(texto for _, texto in sorted(linha)) for _, linha in linhas]
+
+  @staticmethod
+  def texto_valido(texto):
+      """Um campo lido da camada de texto só é aceito se tiver ao menos uma letra ou dígito."""
+      return any(caractere.isalnum() for caractere in texto or "")
@@ -0,0 +1,324 @@
+import argparse
+import difflib
+import re
+import unicodedata
+import cv2
+import numpy as np
+from src.utils.configuracao import Configuracao
+from src.utils.cronometro import Cronometro
+from src.utils.utils import Utils
+from src.services.rasterizacao.rasterizacao import Rasterizador
+from src.services.camada_texto.camada_texto import CamadaTexto
+from src.services.modelos.modelos import RegistroModelos
+
+
+class ClassificadorLayout:
+  """
+  Classificação do modelo pela aparência da página, antes de qualquer OCR.
+  A página inteira é renderizada em baixíssima resolução e reduzida a uma impressão perceptual
+  (dHash 16x16 = 256 bits), comparada com as impressões de referência gravadas nos próprios modelos:
+      "_impressoes": ["<hex>", ...]      (geradas com main.py --impressao-modelo MODELO amostra.pdf ...)
+
+  O modelo só é aceito quando a referência mais próxima está a no máximo LIMIAR (fração de bits diferentes)
+  e a melhor referência de outro modelo está pelo menos MARGEM mais longe. Nos demais casos (ambíguo ou
+  sem referências) o processador segue para o OCR do cabeçalho, como antes.
+  """
+
+  # Resolução da renderização usada só para a impressão (uma A4 fica com ~200x280 px)
+  DPI = 24
+  # Lado da grade do dHash (TAMANHO x TAMANHO bits)
+  TAMANHO = 16
+  LIMIAR = 0.18
+  MARGEM = 0.06
+
+  # Tipo de documento de cada modelo, pelo prefixo do nome (ou pelo metadado "_doc_type" do modelo)
+  TIPOS_POR_PREFIXO = {"coord_cnh_": "CNH", "coord_crlv": "CRLV"}
+
+  @staticmethod
+  def habilitado():
+      return Configuracao.obter_bool("CLASSIFICACAO_LAYOUT", True)
+
+  @staticmethod
+  def impressao(imagem):
+      """dHash da imagem em hexadecimal: cada bit diz se o pixel é mais claro que o vizinho da direita."""
+      cinza = imagem if imagem.ndim == 2 else cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+      reduzida = cv2.resize(cinza, (ClassificadorLayout.TAMANHO + 1, ClassificadorLayout.TAMANHO), interpolation=cv2.INTER_AREA)
+      bits = (reduzida[:, 1:] > reduzida[:, :-1]).flatten()
+      valor = int("".join("1" if bit else "0" for bit in bits), 2)
+      return f"{valor:0{ClassificadorLayout.TAMANHO * ClassificadorLayout.TAMANHO // 4}x}"
+
+  @staticmethod
+  def distancia(impressao_a, impressao_b):
+      """Fração de bits diferentes entre duas impressões (0 = idênticas)."""
+      if len(impressao_a) != len(impressao_b):
+          return 1.0
+      return bin(int(impressao_a, 16) ^ int(impressao_b, 16)).count("1") / (len(impressao_a) * 4)
+
+  @staticmethod
+  def impressao_pdf(caminho_pdf, base_path, pagina=0):
+      with Cronometro.etapa("impressao_layout"):
+          imagem, _ = Rasterizador.renderizar(caminho_pdf, base_path, pagina=pagina, dpi=ClassificadorLayout.DPI)
+          return ClassificadorLayout.impressao(imagem)
+
+  @staticmethod
+  def tipo_modelo(nome, base_path):
+      tipo = RegistroModelos.obter(nome, base_path).metadados.get("_doc_type")
+      if tipo:
+          return tipo.upper()
+      return next((t for prefixo, t in ClassificadorLayout.TIPOS_POR_PREFIXO.items() if nome.startswith(prefixo)), None)
+
+  @staticmethod
+  def referencias(base_path, candidatos=None):
+      """Pares (modelo, impressão) de todos os modelos (ou só dos candidatos) que têm "_impressoes"."""
+      nomes = candidatos if candidatos is not None else RegistroModelos.nomes(base_path)
+      pares = []
+      for nome in nomes:
+          try:
+              modelo = RegistroModelos.obter(nome, base_path)
+          except (FileNotFoundError, ValueError):
+              continue
+          pares.extend((nome, impressao) for impressao in modelo.metadados.get("_impressoes", []))
+      return pares
+
+  @staticmethod
+  def classificar(impressao, base_path, candidatos=None):
+      """
+      Compara a impressão da página com as referências.
+      Retorna {"modelo", "doc_type", "distancia", "confiavel"} ou None se nenhum candidato tiver referências.
+      """
+      melhores = {}
+      for nome, referencia in ClassificadorLayout.referencias(base_path, candidatos):
+          distancia = ClassificadorLayout.distancia(impressao, referencia)
+          if distancia < melhores.get(nome, 1.1):
+              melhores[nome] = distancia
+      if not melhores:
+          return None
+
+      ordenados = sorted(melhores.items(), key=lambda item: item[1])
+      nome, distancia = ordenados[0]
+      segunda = ordenados[1][1] if len(ordenados) > 1 else 1.0
+      return {
+          "modelo": nome,
+          "doc_type": ClassificadorLayout.tipo_modelo(nome, base_path),
+          "distancia": round(distancia, 4),
+          "confiavel": distancia <= ClassificadorLayout.LIMIAR and segunda - distancia >= ClassificadorLayout.MARGEM
+      }
+
+  @staticmethod
+  def classificar_pdf(caminho_pdf, base_path, pagina=0, candidatos=None):
+      """Classifica a página do PDF; None se desabilitado (EXTRATOR_CLASSIFICACAO_LAYOUT=0) ou sem referências."""
+      if not ClassificadorLayout.habilitado() or not ClassificadorLayout.referencias(base_path, candidatos):
+          return None
+      return ClassificadorLayout.classificar(ClassificadorLayout.impressao_pdf(caminho_pdf, base_path, pagina),
+                                             base_path, candidatos)
+
+  # --- Tipo de documento automático ---
+
+  @staticmethod
+  def detectar_tipo(caminho_pdf, base_path):
+      """
+      Descobre o tipo do documento (CNH, CRLV, TARIFAS_BUONNY) pela primeira página:
+      impressão do layout, depois a camada de texto e, por fim, o OCR dos cabeçalhos de CNH e CRLV.
+      Lança ValueError se nenhum tipo for reconhecido.
+      """
+      # Imports tardios: os processadores também usam este módulo
+      from src.services.cnh.cnh import CNH
+      from src.services.crlv.crlv import CRLV
+      from src.services.tarifas_buonny.tar_buonny import TarifasBuonny
+      from src.services.utils.utils_services import UtilsServices
+      from src.services.ocr.ocr import BackendsOCR
+
+      classificacao = ClassificadorLayout.classificar_pdf(caminho_pdf, base_path)
+      if classificacao and classificacao["confiavel"] and classificacao["doc_type"]:
+          return classificacao["doc_type"]
+
+      palavras = CamadaTexto.palavras_pagina(caminho_pdf) if CamadaTexto.habilitada() else None
+      if palavras and any(TarifasBuonny.LINHA_SERVICO_PATTERN.match(linha.strip()) for linha in CamadaTexto.linhas(palavras)):
+          return "TARIFAS_BUONNY"
+
+      verificacoes = (
+          ("CNH", "coord_cabecalho_cnh", lambda texto: bool(CNH.identificar_modelo(texto, base_path))),
+          ("CRLV", "coord_cabecalho_crlv", lambda texto: CRLV.cabecalho_valido(texto, base_path)),
+      )
+      for doc_type, nome_cabecalho, valido in verificacoes:
+          coords = RegistroModelos.obter(nome_cabecalho, base_path).regioes["cabecalho"]
+          if palavras:
+              texto = CamadaTexto.texto_regiao(palavras, coords)
+          else:
+              imagem, deslocamento = Rasterizador.renderizar(caminho_pdf, base_path, recorte=coords)
+              coords_imagem = UtilsServices.transladar_regioes({"cabecalho": coords}, deslocamento)["cabecalho"]
+              backend = BackendsOCR.para_documento(doc_type, base_path, modelo=nome_cabecalho)
+              with Cronometro.etapa("ocr_cabecalho"):
+                  texto = UtilsServices.ocr_regiao(imagem, coords_imagem, backend)
+          try:
+              if valido(texto):
+                  return doc_type
+          except ValueError:
+              continue
+
+      raise ValueError("Não foi possível identificar o tipo do documento (CNH, CRLV ou TARIFAS_BUONNY).")
+
+  # --- Geração das referências ---
+
+  @staticmethod
+  def main(argv):
+      """Ponto de entrada de main.py --impressao-modelo MODELO amostra.pdf [...]: grava as impressões no modelo."""
+      parser = argparse.ArgumentParser(prog="main.py --impressao-modelo",
+                                       description="Grava impressões de layout de referência em um modelo de data/.")
+      parser.add_argument("modelo", help="Nome do modelo, ex.: coord_cnh_digital.")
+      parser.add_argument("amostras", nargs="+", help="PDFs de exemplo do modelo (usa a página informada em --pagina).")
+      parser.add_argument("--pagina", type=int, default=1, help="Página das amostras (padrão: 1).")
+      parser.add_argument("--substituir", action="store_true", help="Descarta as impressões que o modelo já tinha.")
+      args = parser.parse_args(argv)
+
+      base_path = Utils.get_base_path()
+      modelo = RegistroModelos.obter(args.modelo, base_path)
+      impressoes = [] if args.substituir else list(modelo.metadados.get("_impressoes", []))
+
+      for amostra in args.amostras:
+          impressao = ClassificadorLayout.impressao_pdf(amostra, base_path, args.pagina - 1)
+          # Distância para as referências dos outros modelos: margens pequenas indicam que o layout
+          # não separa bem os modelos e a classificação vai cair no OCR do cabeçalho
+          outros = [(nome, ClassificadorLayout.distancia(impressao, referencia))
+                    for nome, referencia in ClassificadorLayout.referencias(base_path) if nome != args.modelo]
+          mais_proximo = min(outros, key=lambda item: item[1]) if outros else None
+          print(f"{amostra}: {impressao}" + (f" (mais próximo de outro modelo: {mais_proximo[0]}, {mais_proximo[1]:.3f})"
+                                              if mais_proximo else ""))
+          if impressao not in impressoes:
+              impressoes.append(impressao)
+
+      RegistroModelos.gravar_metadado(args.modelo, base_path, "_impressoes", impressoes)
+      print(f"{len(impressoes)} impressão(ões) gravada(s) em {modelo.caminho}.")
+      return 0
+
+
+class ClassificadorPalavrasChave:
+  """
+  Classificação do modelo pelo texto do cabeçalho (OCR ou camada de texto), a partir das palavras-chave
+  declaradas nos próprios modelos:
+      "_palavras_chave": [["HABILITAÇÃO", "CNH DIGITAL"], ["DRIVER LICENSE", "PERMISO DE CONDUCCIÓN"]]
+      "_palavras_excluidas": ["NC"]
+  Cada item de "_palavras_chave" é um grupo de alternativas (ou um termo só) e todos os grupos precisam aparecer;
+  qualquer termo de "_palavras_excluidas" descarta o modelo. Entre os modelos aceitos vence o que tem mais grupos
+  (o mais específico) e, no empate, a maior confiança (média da semelhança dos grupos).
+
+  Os termos de todos os modelos ficam em um índice de bigramas: o texto é percorrido uma única vez e cada trecho
+  só é comparado (difflib, semelhança >= LIMIAR) com os termos de mesmo número de palavras que compartilham
+  bigramas e têm tamanho compatível. Termos de até TAMANHO_EXATO letras (ex.: "NC") são curtos demais para a
+  comparação aproximada e precisam aparecer como palavra inteira ("NC" não vale dentro de "LICENÇA", que sem
+  acentos vira "LICENCA"). Uma nova variante de documento só precisa de um modelo com suas palavras-chave.
+  """
+
+  LIMIAR = 0.8
+  TAMANHO_EXATO = 3
+
+  _indice = None
+  _indice_chave = None
+
+  @staticmethod
+  def normalizar(texto):
+      """Maiúsculas, sem acentos e sem pontuação (o OCR costuma perder acentos e trocar pontuação)."""
+      texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii").upper()
+      return " ".join(re.sub(r"[^A-Z0-9]+", " ", texto).split())
+
+  @staticmethod
+  def bigramas(termo):
+      return {termo[i:i + 2] for i in range(len(termo) - 1)}
+
+  @staticmethod
+  def _montar_indice(base_path):
+      termos, posicao = [], {}
+
+      def id_termo(termo):
+          termo = ClassificadorPalavrasChave.normalizar(termo)
+          if termo not in posicao:
+              posicao[termo] = len(termos)
+              termos.append(termo)
+          return posicao[termo]
+
+      modelos = []
+      for nome in RegistroModelos.nomes(base_path):
+          metadados = RegistroModelos.obter(nome, base_path).metadados
+          if not metadados.get("_palavras_chave"):
+              continue
+          grupos = [[id_termo(t) for t in ([grupo] if isinstance(grupo, str) else grupo)] for grupo in metadados["_palavras_chave"]]
+          excluidas = [id_termo(t) for t in metadados.get("_palavras_excluidas", [])]
+          modelos.append((nome, grupos, excluidas))
+
+      # Bigrama -> termos, separado pelo número de palavras do termo (tamanho da janela de texto comparada)
+      curtos, por_palavras = [], {}
+      for indice, termo in enumerate(termos):
+          if len(termo) <= ClassificadorPalavrasChave.TAMANHO_EXATO:
+              curtos.append(indice)
+              continue
+          bigramas = por_palavras.setdefault(len(termo.split()), {})
+          for bigrama in ClassificadorPalavrasChave.bigramas(termo):
+              bigramas.setdefault(bigrama, set()).add(indice)
+
+      return {"termos": termos, "modelos": modelos, "curtos": curtos, "por_palavras": por_palavras}
+
+  @staticmethod
+  def indice(base_path):
+      """Índice dos termos de todos os modelos; refeito só quando algum modelo é recarregado."""
+      chave = (base_path, tuple((nome, RegistroModelos.obter(nome, base_path).mtime) for nome in RegistroModelos.nomes(base_path)))
+      if ClassificadorPalavrasChave._indice_chave != chave:
+          ClassificadorPalavrasChave._indice = ClassificadorPalavrasChave._montar_indice(base_path)
+          ClassificadorPalavrasChave._indice_chave = chave
+      return ClassificadorPalavrasChave._indice
+
+  @staticmethod
+  def semelhancas(texto, indice):
+      """Maior semelhança (0 a 1) de cada termo do índice com algum trecho do texto, em uma passada."""
+      normalizado = ClassificadorPalavrasChave.normalizar(texto)
+      palavras = normalizado.split()
+      semelhanca = [0.0] * len(indice["termos"])
+
+      delimitado = f" {normalizado} "
+      for termo_id in indice["curtos"]:
+          if f" {indice['termos'][termo_id]} " in delimitado:
+              semelhanca[termo_id] = 1.0
+
+      for quantidade, bigramas in indice["por_palavras"].items():
+          for inicio in range(len(palavras) - quantidade + 1):
+              trecho = " ".join(palavras[inicio:inicio + quantidade])
+              candidatos = set()
+              for bigrama in ClassificadorPalavrasChave.bigramas(trecho):
+                  candidatos.update(bigramas.get(bigrama, ()))
+              for termo_id in candidatos:
+                  termo = indice["termos"][termo_id]
+                  # Tamanhos muito diferentes não chegam ao limiar: 2 * iguais / (len_a + len_b)
+                  if semelhanca[termo_id] == 1.0 or 2 * min(len(termo), len(trecho)) < ClassificadorPalavrasChave.LIMIAR * (len(termo) + len(trecho)):
+                      continue
+                  razao = 1.0 if termo == trecho else difflib.SequenceMatcher(None, trecho, termo).ratio()
+                  semelhanca[termo_id] = max(semelhanca[termo_id], razao)
+
+      return semelhanca
+
+  @staticmethod
+  def pontuar(texto, base_path, candidatos=None):
+      """
+      Pontua todos os modelos com palavras-chave (ou só os candidatos) contra o texto.
+      Retorna os modelos aceitos, do melhor para o pior: [{"modelo", "doc_type", "grupos", "confianca"}, ...].
+      """
+      indice = ClassificadorPalavrasChave.indice(base_path)
+      semelhanca = ClassificadorPalavrasChave.semelhancas(texto, indice)
+      limiar = ClassificadorPalavrasChave.LIMIAR
+
+      aceitos = []
+      for nome, grupos, excluidas in indice["modelos"]:
+          if candidatos is not None and nome not in candidatos:
+              continue
+          if any(semelhanca[termo_id] >= limiar for termo_id in excluidas):
+              continue
+          melhores = [max(semelhanca[termo_id] for termo_id in grupo) for grupo in grupos]
+          if all(valor >= limiar for valor in melhores):
+              aceitos.append({"modelo": nome, "doc_type": ClassificadorLayout.tipo_modelo(nome, base_path),
+                              "grupos": len(grupos), "confianca": round(sum(melhores) / len(melhores), 4)})
+
+      return sorted(aceitos, key=lambda item: (-item["grupos"], -item["confianca"]))
+
+  @staticmethod
+  def classificar(texto, base_path, candidatos=None):
+      """Melhor modelo para o texto ({"modelo", "doc_type", "grupos", "confianca"}) ou None se nenhum for aceito."""
+      aceitos = ClassificadorPalavrasChave.pontuar(texto, base_path, candidatos)
+      return aceitos[0] if aceitos else None
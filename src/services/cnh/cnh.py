@@ -1,75 +1,126 @@
-import cv2
-import pytesseract
 import os, sys
-import json
-import numpy as np
-from pdf2image import convert_from_path
 from src.services.utils.utils_services import UtilsServices
+from src.utils.cronometro import Cronometro
+from src.services.rasterizacao.rasterizacao import Rasterizador
+from src.services.camada_texto.camada_texto import CamadaTexto
+from src.services.modelos.modelos import RegistroModelos
+from src.services.ocr.ocr import BackendsOCR
+from src.services.preprocessamento.preprocessamento import PaginaPreprocessada
+from src.services.classificacao.classificacao import ClassificadorLayout, ClassificadorPalavrasChave
+from src.services.codigo_qr.codigo_qr import CodigoQR
 
 
 
 class CNH:
 
+  # Modelos de CNH (data/coord_cnh_*.json) que podem ser escolhidos a partir do cabeçalho
+  PREFIXO_MODELOS = "coord_cnh_"
+
   @staticmethod
-  def processar_cnh(caminho_pdf, base_path):
+  def identificar_modelo(texto_cabecalho, base_path):
+      """
+      Escolhe o modelo de coordenadas a partir do texto do cabeçalho, pelas palavras-chave declaradas
+      nos modelos de CNH ("_palavras_chave"/"_palavras_excluidas").
+      Retorna {"modelo", "confianca", ...}; lança ValueError se o cabeçalho não for de uma CNH.
+      """
+      classificacao = ClassificadorPalavrasChave.classificar(texto_cabecalho, base_path,
+                                                            RegistroModelos.nomes(base_path, CNH.PREFIXO_MODELOS))
+      if classificacao is None:
+          raise ValueError("Documento não parece ser uma CNH válida (cabeçalho não corresponde).")
+      return classificacao
+
+  @staticmethod
+  def processar_cnh(caminho_pdf, base_path, modo_ocr=None):
       """
       Encapsula toda a lógica de extração de dados da CNH.
       Retorna um dicionário com os dados extraídos ou com informações de erro.
+      PDF com várias páginas (várias CNHs escaneadas juntas): cada página é identificada e extraída
+      separadamente, em paralelo, e o retorno traz a lista "documentos" e as "paginas_ignoradas".
       """
-      # --- Configuração de caminhos específicos da CNH ---
-      tesseract_path = os.path.join(base_path, 'Tesseract-OCR', 'tesseract.exe')
-      poppler_path = os.path.join(base_path, 'poppler', 'Library', 'bin')     
-            
-      if not os.path.exists(tesseract_path) or not os.path.exists(poppler_path):
-          raise FileNotFoundError("Dependências (Tesseract ou Poppler) não encontradas.")
-          
-      pytesseract.pytesseract.tesseract_cmd = tesseract_path
-
-      # --- Conversão de PDF para Imagem ---
-      paginas = convert_from_path(caminho_pdf, dpi=300, poppler_path=poppler_path)
-      imagem_pil = paginas[0]
-      imagem = cv2.cvtColor(np.array(imagem_pil), cv2.COLOR_RGB2BGR)
+      total_paginas = Rasterizador.contar_paginas(caminho_pdf, base_path)
+      concorrente = getattr(BackendsOCR.para_documento("CNH", base_path), "concorrente", True)
+      return UtilsServices.processar_paginas(
+          total_paginas, lambda pagina: CNH.processar_pagina(caminho_pdf, base_path, pagina, modo_ocr), "CNH",
+          concorrente=concorrente
+      )
 
-      # --- Identificação do Modelo da CNH (Nacional, Digital, etc.) ---
-      coord_cabecalho_path = os.path.join(base_path, 'data', 'coord_cabecalho_cnh.json')
-      if not os.path.exists(coord_cabecalho_path):
-          raise FileNotFoundError(f"Arquivo de coordenadas do cabeçalho não encontrado: {coord_cabecalho_path}")
+  @staticmethod
+  def processar_pagina(caminho_pdf, base_path, pagina=0, modo_ocr=None):
+      """
+      Identifica o modelo e extrai os campos de uma página (índice a partir de 0).
+      Lança ValueError se a página não for de uma CNH.
+      """
+      # --- Coordenadas do cabeçalho ---
+      coords_cabecalho = RegistroModelos.obter("coord_cabecalho_cnh", base_path).regioes
 
-      with open(coord_cabecalho_path, encoding="utf-8") as f:
-          coords_cabecalho = json.load(f)
+      # --- Conversão de PDF para Imagem (sob demanda) ---
+      # Só a página pedida, em tons de cinza e limitada à área que contém o cabeçalho e os campos de todos os modelos.
+      # PDFs com camada de texto válida nem chegam a ser rasterizados.
+      pagina_renderizada = []
 
-      texto_cabecalho = UtilsServices.ocr_regiao(imagem, coords_cabecalho["cabecalho"])
-      
-      texto_upper = texto_cabecalho.upper()
+      def obter_imagem():
+          if not pagina_renderizada:
+              # EXTRATOR_DPI_INICIAL abaixo de 300: primeira passada em baixa resolução (modo em camadas)
+              dpi = Rasterizador.dpi_inicial()
+              recorte = Rasterizador.escalar(RegistroModelos.uniao(["coord_cabecalho_cnh"] + RegistroModelos.nomes(base_path, CNH.PREFIXO_MODELOS), base_path), dpi)
+              imagem, deslocamento = Rasterizador.renderizar(caminho_pdf, base_path, pagina=pagina, dpi=dpi, recorte=recorte)
+              # Pré-processamento da página feito uma única vez; cabeçalho e campos recortam deste buffer
+              pagina_renderizada.append((PaginaPreprocessada(imagem, dpi=dpi), deslocamento))
+          return pagina_renderizada[0]
 
-      if not UtilsServices.contem_semelhante(texto_upper, "HABILITAÇÃO") and "CNH DIGITAL" not in texto_upper:
-          raise ValueError("Documento não parece ser uma CNH válida (cabeçalho não corresponde).")
+      def renderizar_regiao(coords, dpi):
+          # Segunda passada do modo em camadas: só a caixa do campo, em alta resolução
+          recorte = Rasterizador.escalar(coords, dpi, margem=Rasterizador.MARGEM_REGIAO)
+          return Rasterizador.renderizar(caminho_pdf, base_path, pagina=pagina, dpi=dpi, recorte=recorte)
+
+      # --- Camada de texto (CNH Digital exportada) ---
+      palavras = CamadaTexto.palavras_pagina(caminho_pdf, pagina) if CamadaTexto.habilitada() else None
+
+      # --- Identificação do Modelo da CNH (Nacional, Digital, etc.) ---
+      nome_modelo = None
+      classificacao = {"metodo": "texto"}
+      if palavras:
+          try:
+              identificacao = CNH.identificar_modelo(CamadaTexto.texto_regiao(palavras, coords_cabecalho["cabecalho"]), base_path)
+              nome_modelo = identificacao["modelo"]
+              classificacao = {"metodo": "texto", "confianca": identificacao["confianca"]}
+          except ValueError:
+              # Camada de texto sem o cabeçalho esperado: a identificação segue pelo layout/OCR
+              nome_modelo = None
+
+      if nome_modelo is None:
+          # Impressão do layout em baixa resolução; o OCR do cabeçalho fica só para os casos ambíguos
+          layout = ClassificadorLayout.classificar_pdf(caminho_pdf, base_path, pagina)
+          if layout and layout["confiavel"]:
+              if not layout["modelo"].startswith(CNH.PREFIXO_MODELOS):
+                  raise ValueError(f"Documento não parece ser uma CNH válida (layout de {layout['modelo']}).")
+              nome_modelo = layout["modelo"]
+              classificacao = {"metodo": "layout", "distancia": layout["distancia"]}
 
-      
-      # --- Seleção do JSON de coordenadas apropriado ---
-      if "DRIVER LICENSE" in texto_upper or "PERMISO DE CONDUCCIÓN" in texto_upper:
-          arquivo_json_modelo = r"data\coord_cnh_nacional.json"
-      elif "CNH DIGITAL" in texto_upper:
-          if "NC" not in texto_upper:
-              arquivo_json_modelo = r"data\coord_cnh_antiga.json"
-          else:
-              arquivo_json_modelo = r"data\coord_cnh_digital.json"    
-      else:
-          arquivo_json_modelo = r"data\coord_cnh_estadual.json"
+      if nome_modelo is None:
+          classificacao = {"metodo": "cabecalho"}
+          imagem, deslocamento = obter_imagem()
+          coords_cabecalho_imagem = UtilsServices.transladar_regioes(coords_cabecalho, deslocamento, imagem.dpi)
+
+          backend_cabecalho = BackendsOCR.para_documento("CNH", base_path, modelo="coord_cabecalho_cnh")
+          with Cronometro.etapa("ocr_cabecalho"):
+              texto_cabecalho = UtilsServices.ocr_regiao(imagem, coords_cabecalho_imagem["cabecalho"], backend_cabecalho)
+          identificacao = CNH.identificar_modelo(texto_cabecalho, base_path)
+          nome_modelo = identificacao["modelo"]
+          classificacao["confianca"] = identificacao["confianca"]
 
       # --- Extração dos Dados ---
-      caminho_json_coords = os.path.join(base_path, arquivo_json_modelo)
-      if not os.path.exists(caminho_json_coords):
-          raise FileNotFoundError(f"Arquivo de coordenadas do modelo não encontrado: {caminho_json_coords}")
+      modelo = RegistroModelos.obter(nome_modelo, base_path)
 
-      with open(caminho_json_coords, encoding="utf-8") as f:
-          regioes = json.load(f)
+      backend = BackendsOCR.para_documento("CNH", base_path, modelo=nome_modelo)
+      dados_extraidos = UtilsServices.extrair_campos_documento(modelo.regioes, obter_imagem, palavras=palavras,
+                                                               modo_ocr=modo_ocr, backend=backend,
+                                                               perfis=modelo.perfis, tipos=modelo.tipos,
+                                                               renderizar_regiao=renderizar_regiao,
+                                                               obter_campos_qrcode=CodigoQR.leitor(modelo, obter_imagem))
 
-      dados_extraidos = {}
-      for campo, coords in regioes.items():
-          dados_extraidos[campo] = UtilsServices.ocr_regiao(imagem, coords)
-      
+      dados_extraidos["_classificacao"] = dict(classificacao, modelo=nome_modelo)
       dados_extraidos["status"] = "sucesso"
       dados_extraidos["mensagem"] = "Dados da CNH extraídos com sucesso."
-      
-      return dados_extraidos
\ No newline at end of file
+
+      return dados_extraidos
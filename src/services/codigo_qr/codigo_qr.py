@@ -0,0 +1,119 @@
+import json
+import re
+import unicodedata
+from urllib.parse import urlsplit, parse_qsl
+import cv2
+from src.utils.configuracao import Configuracao
+from src.utils.cronometro import Cronometro
+from src.services.preprocessamento.preprocessamento import PaginaPreprocessada
+from src.services.utils.utils_services import UtilsServices
+
+
+class CodigoQR:
+  """
+  Leitura do QR code de CRLV-e e CNH Digital: uma decodificação (cv2.QRCodeDetector) preenche os campos
+  que o conteúdo do código traz, e só os demais seguem para o OCR. O modelo declara onde está o código
+  e como as chaves do conteúdo correspondem aos campos:
+      "_qrcode": {"regiao": [x1, y1, x2, y2], "campos": {"placa": "placa", "renavan": ["renavam", "renavan"]}}
+  A região (pixels a 300 dpi) é recortada da mesma página renderizada e pré-processada que o OCR usa;
+  nada é renderizado a mais. A leitura só acontece se algum campo ainda pendente estiver no mapeamento.
+
+  Conteúdos aceitos: JSON (objeto), URL com parâmetros (?placa=...&renavam=...) e pares chave=valor ou
+  chave:valor separados por linha, ";" ou "|". As chaves são comparadas sem acentos e sem pontuação.
+  O endereço de validação contido no código não é consultado: a extração continua offline.
+  """
+
+  @staticmethod
+  def habilitado():
+      return Configuracao.obter_bool("QRCODE", True)
+
+  @staticmethod
+  def normalizar_chave(chave):
+      chave = unicodedata.normalize("NFKD", str(chave)).encode("ascii", "ignore").decode("ascii").lower()
+      return re.sub(r"[^a-z0-9]", "", chave)
+
+  @staticmethod
+  def decodificar(imagem):
+      """Textos de todos os QR codes encontrados na imagem (lista vazia se nenhum for decodificado)."""
+      detector = cv2.QRCodeDetector()
+      if hasattr(detector, "detectAndDecodeMulti"):
+          encontrou, textos, _, _ = detector.detectAndDecodeMulti(imagem)
+          return [texto for texto in (textos if encontrou else []) if texto]
+      texto, _, _ = detector.detectAndDecode(imagem)
+      return [texto] if texto else []
+
+  @staticmethod
+  def interpretar(conteudo):
+      """Converte o conteúdo de um QR code em {chave normalizada: valor}."""
+      conteudo = (conteudo or "").strip()
+      pares = []
+      try:
+          objeto = json.loads(conteudo)
+          if isinstance(objeto, dict):
+              for chave, valor in objeto.items():
+                  if isinstance(valor, dict):
+                      pares.extend(valor.items())
+                  elif not isinstance(valor, list):
+                      pares.append((chave, valor))
+      except ValueError:
+          url = urlsplit(conteudo)
+          if url.scheme and url.query:
+              pares.extend(parse_qsl(url.query))
+          if url.scheme and url.fragment and "=" in url.fragment:
+              pares.extend(parse_qsl(url.fragment.split("?", 1)[-1]))
+          if not pares:
+              for item in re.split(r"[\r\n;|]+", conteudo):
+                  par = re.match(r"\s*([^=:]+?)\s*[=:]\s*(.*)$", item)
+                  if par:
+                      pares.append(par.groups())
+
+      return {CodigoQR.normalizar_chave(chave): str(valor).strip() for chave, valor in pares
+              if valor is not None and str(valor).strip()}
+
+  @staticmethod
+  def campos(conteudos, mapeamento):
+      """{campo do modelo: valor} a partir dos conteúdos decodificados e do mapeamento "campos" do modelo."""
+      valores = {}
+      for conteudo in conteudos:
+          valores.update(CodigoQR.interpretar(conteudo))
+
+      campos = {}
+      for campo, chaves in mapeamento.items():
+          for chave in [chaves] if isinstance(chaves, str) else chaves:
+              valor = valores.get(CodigoQR.normalizar_chave(chave))
+              if valor:
+                  campos[campo] = valor
+                  break
+      return campos
+
+  @staticmethod
+  def leitor(modelo, obter_imagem):
+      """
+      Função ler(pendentes) -> {campo: valor} para extrair_campos_documento(obter_campos_qrcode=...), ou None se
+      o modelo não declara "_qrcode" ou EXTRATOR_QRCODE=0. obter_imagem() -> (pagina, deslocamento) é a mesma
+      página (renderizada uma única vez) dos campos que vão para o OCR.
+      """
+      configuracao = modelo.metadados.get("_qrcode")
+      if not configuracao or not CodigoQR.habilitado():
+          return None
+
+      def ler(pendentes):
+          # Nenhum campo pendente coberto pelo código: nem decodifica
+          if not any(campo in configuracao["campos"] for campo in pendentes):
+              return {}
+          return CodigoQR.extrair_campos(obter_imagem, configuracao)
+      return ler
+
+  @staticmethod
+  def extrair_campos(obter_imagem, configuracao):
+      """
+      Recorta a região do QR code da página (configuracao = metadado "_qrcode" do modelo), decodifica e
+      devolve {campo: valor} dos campos cobertos pelo código.
+      """
+      pagina, deslocamento = obter_imagem()
+      pagina = PaginaPreprocessada.garantir(pagina)
+      with Cronometro.etapa("qrcode"):
+          regiao = UtilsServices.transladar_regioes({"qrcode": configuracao["regiao"]}, deslocamento, pagina.dpi)["qrcode"]
+          recorte = pagina.recorte(regiao, "cinza")
+          conteudos = CodigoQR.decodificar(recorte) if recorte is not None else []
+          return CodigoQR.campos(conteudos, configuracao["campos"]) if conteudos else {}
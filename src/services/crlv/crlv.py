@@ -1,63 +1,105 @@
-import cv2
-import pytesseract
 import sys, os
-import json
-import numpy as np
-from pdf2image import convert_from_path
 from src.services.utils.utils_services import UtilsServices
+from src.utils.cronometro import Cronometro
+from src.services.rasterizacao.rasterizacao import Rasterizador
+from src.services.camada_texto.camada_texto import CamadaTexto
+from src.services.modelos.modelos import RegistroModelos
+from src.services.ocr.ocr import BackendsOCR
+from src.services.preprocessamento.preprocessamento import PaginaPreprocessada
+from src.services.classificacao.classificacao import ClassificadorLayout, ClassificadorPalavrasChave
+from src.services.codigo_qr.codigo_qr import CodigoQR
 from ..utils.utils_services import UtilsServices
 
 class CRLV:
-  
+
+  MODELO = "coord_crlv"
+
+  @staticmethod
+  def cabecalho_valido(texto_cabecalho, base_path):
+    """Confere o cabeçalho pelas palavras-chave do modelo ("_palavras_chave" em data/coord_crlv.json)."""
+    return ClassificadorPalavrasChave.classificar(texto_cabecalho, base_path, [CRLV.MODELO]) is not None
+
   @staticmethod
-  def processar_crlv(caminho_pdf, base_path):
+  def processar_crlv(caminho_pdf, base_path, modo_ocr=None):
     """
     Encapsula toda a lógica de extração de dados da CRLV.
     Retorna um dicionário com os dados extraídos ou com informações de erro.
+    PDF com várias páginas (vários CRLVs escaneados juntos): cada página é validada e extraída
+    separadamente, em paralelo, e o retorno traz a lista "documentos" e as "paginas_ignoradas".
+    """
+    total_paginas = Rasterizador.contar_paginas(caminho_pdf, base_path)
+    concorrente = getattr(BackendsOCR.para_documento("CRLV", base_path), "concorrente", True)
+    return UtilsServices.processar_paginas(
+        total_paginas, lambda pagina: CRLV.processar_pagina(caminho_pdf, base_path, pagina, modo_ocr), "CRLV",
+        concorrente=concorrente
+    )
+
+  @staticmethod
+  def processar_pagina(caminho_pdf, base_path, pagina=0, modo_ocr=None):
+    """
+    Valida o cabeçalho e extrai os campos de uma página (índice a partir de 0).
+    Lança ValueError se a página não for de um CRLV.
     """
-    # --- Configuração de caminhos específicos
- 
-    tesseract_path = os.path.join(base_path, 'Tesseract-OCR', 'tesseract.exe')
-    poppler_path = os.path.join(base_path, 'poppler', 'Library', 'bin')
-        
-    if not os.path.exists(tesseract_path) or not os.path.exists(poppler_path):
-        raise FileNotFoundError("Dependências (Tesseract ou Poppler) não encontradas.")
-        
-    pytesseract.pytesseract.tesseract_cmd = tesseract_path
-    
-    # --- Conversão de PDF para Imagem ---
-    paginas = convert_from_path(caminho_pdf, dpi=300, poppler_path=poppler_path)
-    imagem_pil = paginas[0]
-    imagem = cv2.cvtColor(np.array(imagem_pil), cv2.COLOR_RGB2BGR)
+    # --- Coordenadas do cabeçalho e do modelo ---
+    coords_cabecalho = RegistroModelos.obter("coord_cabecalho_crlv", base_path).regioes
+    modelo = RegistroModelos.obter(CRLV.MODELO, base_path)
+
+    # --- Conversão de PDF para Imagem (sob demanda) ---
+    # Só a página pedida, em tons de cinza e limitada à área que contém o cabeçalho e os campos.
+    # PDFs com camada de texto válida nem chegam a ser rasterizados.
+    pagina_renderizada = []
+
+    def obter_imagem():
+        if not pagina_renderizada:
+            # EXTRATOR_DPI_INICIAL abaixo de 300: primeira passada em baixa resolução (modo em camadas)
+            dpi = Rasterizador.dpi_inicial()
+            recorte = Rasterizador.escalar(RegistroModelos.uniao(["coord_cabecalho_crlv", CRLV.MODELO], base_path), dpi)
+            imagem, deslocamento = Rasterizador.renderizar(caminho_pdf, base_path, pagina=pagina, dpi=dpi, recorte=recorte)
+            # Pré-processamento da página feito uma única vez; cabeçalho e campos recortam deste buffer
+            pagina_renderizada.append((PaginaPreprocessada(imagem, dpi=dpi), deslocamento))
+        return pagina_renderizada[0]
+
+    def renderizar_regiao(coords, dpi):
+        # Segunda passada do modo em camadas: só a caixa do campo, em alta resolução
+        recorte = Rasterizador.escalar(coords, dpi, margem=Rasterizador.MARGEM_REGIAO)
+        return Rasterizador.renderizar(caminho_pdf, base_path, pagina=pagina, dpi=dpi, recorte=recorte)
+
+    # --- Camada de texto (CRLV-e) ---
+    palavras = CamadaTexto.palavras_pagina(caminho_pdf, pagina) if CamadaTexto.habilitada() else None
 
     # --- Identificação do Modelo dO CRLV ---
-    coord_cabecalho_path = os.path.join(base_path, 'data', 'coord_cabecalho_crlv.json')
-    if not os.path.exists(coord_cabecalho_path):
-        raise FileNotFoundError(f"Arquivo de coordenadas do cabeçalho não encontrado: {coord_cabecalho_path}")
+    classificacao = {"metodo": "texto"}
+    if not (palavras and CRLV.cabecalho_valido(CamadaTexto.texto_regiao(palavras, coords_cabecalho["cabecalho"]), base_path)):
+        # Impressão do layout em baixa resolução; o OCR do cabeçalho fica só para os casos ambíguos
+        layout = ClassificadorLayout.classificar_pdf(caminho_pdf, base_path, pagina)
+        if layout and layout["confiavel"]:
+            if layout["modelo"] != CRLV.MODELO:
+                raise ValueError(f"Documento não parece ser uma CRLV válido (layout de {layout['modelo']}).")
+            classificacao = {"metodo": "layout", "distancia": layout["distancia"]}
+        else:
+            classificacao = {"metodo": "cabecalho"}
 
-    with open(coord_cabecalho_path, encoding="utf-8") as f:
-        coords_cabecalho = json.load(f)
+    if classificacao["metodo"] == "cabecalho":
+        imagem, deslocamento = obter_imagem()
+        coords_cabecalho_imagem = UtilsServices.transladar_regioes(coords_cabecalho, deslocamento, imagem.dpi)
 
-    texto_cabecalho = UtilsServices.ocr_regiao(imagem, coords_cabecalho["cabecalho"])
-    
-    if "LICENCIAMENTO DE VEÍCULO" not in texto_cabecalho.upper():
-        raise ValueError("Documento não parece ser uma CRLV válido (cabeçalho não corresponde).")
-    
-    arquivo_json_modelo = r"data\coord_crlv.json"
+        backend_cabecalho = BackendsOCR.para_documento("CRLV", base_path, modelo="coord_cabecalho_crlv")
+        with Cronometro.etapa("ocr_cabecalho"):
+            texto_cabecalho = UtilsServices.ocr_regiao(imagem, coords_cabecalho_imagem["cabecalho"], backend_cabecalho)
 
-    # --- Extração dos Dados ---
-    caminho_json_coords = os.path.join(base_path, arquivo_json_modelo)
-    if not os.path.exists(caminho_json_coords):
-        raise FileNotFoundError(f"Arquivo de coordenadas do modelo não encontrado: {caminho_json_coords}")
+        if not CRLV.cabecalho_valido(texto_cabecalho, base_path):
+            raise ValueError("Documento não parece ser uma CRLV válido (cabeçalho não corresponde).")
 
-    with open(caminho_json_coords, encoding="utf-8") as f:
-        regioes = json.load(f)
+    # --- Extração dos Dados ---
+    backend = BackendsOCR.para_documento("CRLV", base_path, modelo=CRLV.MODELO)
+    dados_extraidos = UtilsServices.extrair_campos_documento(modelo.regioes, obter_imagem, palavras=palavras,
+                                                             modo_ocr=modo_ocr, backend=backend,
+                                                             perfis=modelo.perfis, tipos=modelo.tipos,
+                                                             renderizar_regiao=renderizar_regiao,
+                                                             obter_campos_qrcode=CodigoQR.leitor(modelo, obter_imagem))
 
-    dados_extraidos = {}
-    for campo, coords in regioes.items():
-        dados_extraidos[campo] = UtilsServices.ocr_regiao(imagem, coords)
-    
+    dados_extraidos["_classificacao"] = dict(classificacao, modelo=CRLV.MODELO)
     dados_extraidos["status"] = "sucesso"
     dados_extraidos["mensagem"] = "Dados do CRLV extraídos com sucesso."
-    
-    return dados_extraidos
\ No newline at end of file
+
+    return dados_extraidos
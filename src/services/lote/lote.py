@@ -0,0 +1,274 @@
+import argparse
+import csv
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src.utils.utils import Utils
+from src.utils.metricas import Metricas
+
+
+class Lote:
+  """
+  Modo lote: processa uma pasta, um glob ou um manifesto (CSV/JSONL com doc_type,path)
+  distribuindo os documentos entre processos, já que o trabalho é limitado por CPU (OCR e rasterização).
+  Cada documento gera uma linha JSONL assim que termina; erros ficam isolados por documento.
+  Com --saida-sqlite os resultados vão para o banco SQLite, em transações de vários documentos.
+  """
+
+  # Quantas linhas inválidas aparecem na mensagem de erro do manifesto
+  ERROS_MANIFESTO_EXIBIDOS = 10
+
+  @staticmethod
+  def ler_manifesto_csv(caminho_manifesto):
+      """Lê um manifesto CSV com as colunas doc_type,path (cabeçalho opcional). O arquivo é validado antes do primeiro item."""
+      yield from Lote._ler_manifesto(caminho_manifesto, Lote._itens_csv)
+
+  @staticmethod
+  def ler_manifesto_jsonl(caminho_manifesto):
+      """Lê um manifesto JSONL com objetos {"doc_type": ..., "path": ...}. O arquivo é validado antes do primeiro item."""
+      yield from Lote._ler_manifesto(caminho_manifesto, Lote._itens_jsonl)
+
+  @staticmethod
+  def _itens_csv(caminho_manifesto):
+      """Gera (linha, doc_type, path, erro) de cada linha do manifesto CSV."""
+      with open(caminho_manifesto, newline="", encoding="utf-8-sig") as f:
+          leitor = csv.reader(f)
+          for linha in leitor:
+              if len(linha) < 2 or not linha[0].strip():
+                  continue
+              doc_type, caminho = linha[0].strip(), linha[1].strip()
+              if doc_type.lower() == "doc_type" and caminho.lower() == "path":
+                  continue
+              yield leitor.line_num, doc_type, caminho, None if caminho else "path vazio"
+
+  @staticmethod
+  def _itens_jsonl(caminho_manifesto):
+      """Gera (linha, doc_type, path, erro) de cada linha do manifesto JSONL."""
+      with open(caminho_manifesto, encoding="utf-8-sig") as f:
+          for numero, linha in enumerate(f, start=1):
+              if not linha.strip():
+                  continue
+              try:
+                  item = json.loads(linha)
+              except json.JSONDecodeError as e:
+                  yield numero, None, None, f"JSON inválido ({e})"
+                  continue
+              if not isinstance(item, dict):
+                  yield numero, None, None, "esperado um objeto {\"doc_type\": ..., \"path\": ...}"
+                  continue
+              caminho = item.get("path")
+              if not isinstance(caminho, str) or not caminho.strip():
+                  yield numero, None, None, "\"path\" ausente ou vazio"
+                  continue
+              yield numero, str(item.get("doc_type", "")), caminho.strip(), None
+
+  @staticmethod
+  def _ler_manifesto(caminho_manifesto, itens):
+      """
+      Valida o manifesto inteiro e só então gera os pares (doc_type, caminho_pdf), com os caminhos relativos à pasta
+      do manifesto. Uma linha inválida vira ValueError antes de qualquer documento ser enviado ao pool, em vez de
+      interromper o lote no meio (ou de um item sem path virar a própria pasta do manifesto).
+      """
+      erros = [f"linha {numero}: {erro}" for numero, _, _, erro in itens(caminho_manifesto) if erro]
+      if erros:
+          exibidos = "; ".join(erros[:Lote.ERROS_MANIFESTO_EXIBIDOS])
+          restantes = len(erros) - Lote.ERROS_MANIFESTO_EXIBIDOS
+          raise ValueError(f"Manifesto inválido {caminho_manifesto}: {exibidos}"
+                           + (f" (e mais {restantes} linha(s))" if restantes > 0 else ""))
+
+      pasta_manifesto = os.path.dirname(os.path.abspath(caminho_manifesto))
+      for _, doc_type, caminho, _ in itens(caminho_manifesto):
+          yield doc_type.upper(), os.path.join(pasta_manifesto, caminho)
+
+  @staticmethod
+  def listar_documentos(entrada, doc_type=None, recursivo=False):
+      """
+      Gera pares (doc_type, caminho_pdf) a partir de uma pasta, glob ou manifesto.
+      Para pastas e globs o tipo do documento precisa ser informado.
+      """
+      extensao = os.path.splitext(entrada)[1].lower()
+
+      if os.path.isfile(entrada) and extensao == ".csv":
+          yield from Lote.ler_manifesto_csv(entrada)
+          return
+      if os.path.isfile(entrada) and extensao in (".jsonl", ".ndjson"):
+          yield from Lote.ler_manifesto_jsonl(entrada)
+          return
+
+      if not doc_type:
+          raise ValueError("Informe --tipo ao processar uma pasta ou um glob de PDFs.")
+
+      if os.path.isdir(entrada):
+          padrao = os.path.join(entrada, "**", "*.pdf") if recursivo else os.path.join(entrada, "*.pdf")
+      else:
+          padrao = entrada
+
+      encontrou = False
+      for caminho in sorted(glob.iglob(padrao, recursive=recursivo)):
+          if os.path.isfile(caminho) and caminho.lower().endswith(".pdf"):
+              encontrou = True
+              yield doc_type.upper(), caminho
+
+      if not encontrou:
+          raise FileNotFoundError(f"Nenhum PDF encontrado em: {entrada}")
+
+  @staticmethod
+  def _inicializar_processo():
+      """
+      Prepara cada processo do pool. Os processadores são importados no primeiro documento
+      de cada tipo (Processador.resolver) e reaproveitados pelos seguintes.
+      """
+      # Os documentos já são distribuídos entre os processos; as páginas (Buonny e PDFs com várias CNHs/CRLVs)
+      # não abrem um segundo pool
+      os.environ.setdefault("EXTRATOR_BUONNY_PROCESSOS", "1")
+      os.environ.setdefault("EXTRATOR_THREADS_PAGINAS", "1")
+      # Um Tesseract por processo do pool, com uma thread do OpenMP
+      os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+      # PyMuPDF em processo auxiliar com timeout: um PDF que trava o MuPDF não prende o processo do pool
+      os.environ.setdefault("EXTRATOR_RASTERIZACAO_ISOLADA", "1")
+      # EXTRATOR_MEMORIA_MAXIMA_MB vale por processo do pool
+      from src.utils.limites import Limites
+      Limites.aplicar_limite_memoria()
+      # Despacho, cache e métricas carregados antes do primeiro documento do processo
+      importlib.import_module("src.services.processador.processador")
+
+  @staticmethod
+  def _processar_documento(doc_type, caminho_pdf, base_path):
+      """Executado dentro do pool. Nunca lança exceção: erros voltam como dicionário de erro."""
+      from src.services.processador.processador import Processador
+
+      inicio = time.perf_counter()
+      dados = Processador.processar_seguro(doc_type, caminho_pdf, base_path)
+      return {
+          # Com --tipo AUTO vale o tipo detectado
+          "doc_type": dados.get("_doc_type_detectado", doc_type),
+          "path": caminho_pdf,
+          "tempo_s": round(time.perf_counter() - inicio, 3),
+          "dados": dados
+      }
+
+  @staticmethod
+  def processar(documentos, base_path, processos=None, saida=None, armazenamento=None):
+      """
+      Distribui os documentos no pool e grava uma linha JSONL por documento, na ordem de término
+      (ou, com armazenamento, enfileira o resultado no ArmazenamentoResultados).
+      Retorna o resumo do lote (total, sucessos, erros, tempo e documentos/segundo).
+      """
+      saida = saida or sys.stdout
+      processos = processos or os.cpu_count() or 1
+      # Limita quantos documentos ficam enfileirados para não carregar um manifesto gigante de uma vez
+      limite_pendentes = processos * 4
+
+      resumo = {"total": 0, "sucesso": 0, "erro": 0}
+      inicio = time.perf_counter()
+
+      def registrar(futuro):
+          try:
+              resultado = futuro.result()
+          except Exception as e:
+              # Falha do próprio processo do pool (ex.: processo encerrado abruptamente)
+              doc_type, caminho_pdf = pendentes_info.pop(futuro)
+              resultado = {"doc_type": doc_type, "path": caminho_pdf, "tempo_s": None,
+                           "dados": {"status": "erro", "mensagem": str(e)}}
+          else:
+              pendentes_info.pop(futuro, None)
+
+          if Metricas.arquivo():
+              Metricas.registrar(resultado["doc_type"], resultado["dados"])
+
+          resumo["total"] += 1
+          if resultado["dados"].get("status") == "erro":
+              resumo["erro"] += 1
+          else:
+              resumo["sucesso"] += 1
+          if armazenamento is not None:
+              armazenamento.adicionar(resultado["doc_type"], resultado["path"], resultado["dados"])
+              return
+          saida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+          saida.flush()
+
+      pendentes_info = {}
+      with ProcessPoolExecutor(max_workers=processos, initializer=Lote._inicializar_processo) as executor:
+          for doc_type, caminho_pdf in documentos:
+              if len(pendentes_info) >= limite_pendentes:
+                  concluidos, _ = wait(list(pendentes_info), return_when=FIRST_COMPLETED)
+                  for futuro in concluidos:
+                      registrar(futuro)
+
+              futuro = executor.submit(Lote._processar_documento, doc_type, caminho_pdf, base_path)
+              pendentes_info[futuro] = (doc_type, caminho_pdf)
+
+          while pendentes_info:
+              concluidos, _ = wait(list(pendentes_info), return_when=FIRST_COMPLETED)
+              for futuro in concluidos:
+                  registrar(futuro)
+
+      tempo_total = time.perf_counter() - inicio
+      resumo["tempo_s"] = round(tempo_total, 3)
+      resumo["documentos_por_segundo"] = round(resumo["total"] / tempo_total, 3) if tempo_total > 0 else None
+      resumo["processos"] = processos
+      return resumo
+
+  @staticmethod
+  def main(argv):
+      """Ponto de entrada do modo lote (main.py --lote ...)."""
+      parser = argparse.ArgumentParser(prog="main.py --lote", description="Processa vários PDFs em paralelo.")
+      parser.add_argument("entrada", help="Pasta, glob (ex.: \"scans/*.pdf\") ou manifesto .csv/.jsonl com doc_type,path.")
+      parser.add_argument("--tipo", help="Tipo do documento (CNH, CRLV, TARIFAS_BUONNY ou AUTO para detectar) para pastas e globs.")
+      parser.add_argument("--processos", type=int, default=None, help="Quantidade de processos do pool (padrão: número de CPUs).")
+      parser.add_argument("--saida", help="Arquivo JSONL de resultados (padrão: saída padrão).")
+      parser.add_argument("--saida-sqlite", metavar="BANCO",
+                          help="Grava os resultados no banco SQLite em vez do JSONL (consulta com main.py --exportar).")
+      parser.add_argument("--recursivo", action="store_true", help="Inclui subpastas ao processar uma pasta.")
+      parser.add_argument("--modo-ocr", choices=["campo", "lote", "pagina", "comparar"],
+                          help="Modo de OCR dos campos (equivale a EXTRATOR_MODO_OCR).")
+      parser.add_argument("--ocr-backend", choices=["tesseract", "easyocr"],
+                          help="Backend de OCR padrão (equivale a EXTRATOR_OCR_BACKEND).")
+      parser.add_argument("--threads-ocr", type=int,
+                          help="Threads para o OCR dos campos de cada documento (equivale a EXTRATOR_THREADS_OCR).")
+      parser.add_argument("--metricas",
+                          help="Arquivo de métricas acumuladas (.prom para Prometheus, senão JSON); inclui \"_metrics\" nos resultados.")
+      parser.add_argument("--cache", action="store_true", help="Usa o cache de resultados (equivale a EXTRATOR_CACHE=1).")
+      args = parser.parse_args(argv)
+
+      # Os processos do pool herdam o ambiente, então a opção vale para todos eles
+      if args.modo_ocr:
+          os.environ["EXTRATOR_MODO_OCR"] = args.modo_ocr
+      if args.ocr_backend:
+          os.environ["EXTRATOR_OCR_BACKEND"] = args.ocr_backend
+      if args.threads_ocr is not None:
+          os.environ["EXTRATOR_THREADS_OCR"] = str(args.threads_ocr)
+      if args.cache:
+          os.environ["EXTRATOR_CACHE"] = "1"
+      if args.metricas:
+          os.environ["EXTRATOR_METRICAS_ARQUIVO"] = args.metricas
+
+      base_path = Utils.get_base_path()
+      documentos = Lote.listar_documentos(args.entrada, doc_type=args.tipo, recursivo=args.recursivo)
+
+      if args.saida_sqlite:
+          from src.services.armazenamento.armazenamento import ArmazenamentoResultados
+          with ArmazenamentoResultados(args.saida_sqlite) as armazenamento:
+              resumo = Lote.processar(documentos, base_path, processos=args.processos, armazenamento=armazenamento)
+      elif args.saida:
+          with open(args.saida, "w", encoding="utf-8") as f_saida:
+              resumo = Lote.processar(documentos, base_path, processos=args.processos, saida=f_saida)
+      else:
+          resumo = Lote.processar(documentos, base_path, processos=args.processos)
+
+      # O resumo vai para o stderr para não misturar com as linhas JSONL de resultado
+      print(
+          f"Lote concluído: {resumo['total']} documento(s), {resumo['sucesso']} sucesso(s), {resumo['erro']} erro(s) "
+          f"em {resumo['tempo_s']} s ({resumo['documentos_por_segundo']} doc/s, {resumo['processos']} processo(s)).",
+          file=sys.stderr
+      )
+      if args.cache:
+          from src.services.cache.cache import CacheResultados
+          estatisticas = CacheResultados.estatisticas()
+          print(f"Cache: {estatisticas['hits']} acerto(s), {estatisticas['misses']} falha(s), "
+                f"{estatisticas['entradas']} entrada(s), {estatisticas['tamanho_bytes']} bytes.", file=sys.stderr)
+      return resumo
@@ -0,0 +1,252 @@
+import glob
+import json
+import os
+import threading
+from src.services.tipos_campo.tipos_campo import TiposCampo
+
+
+class Regiao:
+  """Campo compilado de um modelo: coordenadas já normalizadas e as fatias prontas para recortar a imagem."""
+
+  __slots__ = ("nome", "x1", "y1", "x2", "y2", "fatia", "opcoes")
+
+  def __init__(self, nome, coords, opcoes=None):
+      self.nome = nome
+      self.x1, self.y1 = min(coords[0], coords[2]), min(coords[1], coords[3])
+      self.x2, self.y2 = max(coords[0], coords[2]), max(coords[1], coords[3])
+      self.fatia = (slice(self.y1, self.y2), slice(self.x1, self.x2))
+      self.opcoes = opcoes or {}
+
+  @property
+  def coords(self):
+      return (self.x1, self.y1, self.x2, self.y2)
+
+  def sobrepoe(self, outra):
+      return min(self.x2, outra.x2) > max(self.x1, outra.x1) and min(self.y2, outra.y2) > max(self.y1, outra.y1)
+
+
+class Modelo:
+  """
+  Modelo de coordenadas compilado a partir de um JSON de data/.
+  Formato do JSON: {"campo": [x1, y1, x2, y2], ...}; o campo também pode ser um objeto
+  {"coords": [x1, y1, x2, y2], ...} com opções extras, ex.: "perfil" (pré-processamento do recorte, ver
+  PaginaPreprocessada.PERFIS) e "tipo", "psm", "whitelist", "validador", "padrao" (ver TiposCampo).
+  Chaves iniciadas por "_" são metadados do modelo:
+    "_pagina": [largura, altura]                       tamanho da página em pixels a 300 dpi (padrão: A4)
+    "_sobreposicoes_permitidas": [["campo_a", "campo_b"]]  pares de campos que podem se sobrepor
+    "_impressoes": ["<hex>", ...]                      impressões de layout de referência (ClassificadorLayout)
+    "_doc_type": "CNH"                                 tipo de documento do modelo, quando não vem do nome
+    "_palavras_chave": [["termo", "alternativa"], ...]   palavras do cabeçalho (ClassificadorPalavrasChave)
+    "_palavras_excluidas": ["termo", ...]              palavras que descartam o modelo
+    "_qrcode": {"regiao": [x1, y1, x2, y2], "campos": {"campo": "chave" | ["chave", ...]}}
+                                                       campos lidos do QR code (CodigoQR) e onde ele fica
+  """
+
+  def __init__(self, nome, caminho, campos, metadados, mtime):
+      self.nome = nome
+      self.caminho = caminho
+      self.campos = campos
+      self.metadados = metadados
+      self.mtime = mtime
+      self.regioes = {campo: regiao.coords for campo, regiao in campos.items()}
+      self.perfis = {campo: regiao.opcoes["perfil"] for campo, regiao in campos.items() if "perfil" in regiao.opcoes}
+      # {campo: configuração de OCR e validação} só dos campos que declaram tipo (TiposCampo.configuracao)
+      self.tipos = {}
+      for campo, regiao in campos.items():
+          configuracao = TiposCampo.configuracao(regiao.opcoes)
+          if configuracao:
+              self.tipos[campo] = configuracao
+      # O QR code é recortado da mesma imagem dos campos, então a região dele entra na área renderizada
+      caixas = [(r.x1, r.y1, r.x2, r.y2) for r in campos.values()]
+      if metadados.get("_qrcode"):
+          caixas.append(tuple(metadados["_qrcode"]["regiao"]))
+      self.uniao = (min(c[0] for c in caixas), min(c[1] for c in caixas),
+                    max(c[2] for c in caixas), max(c[3] for c in caixas))
+
+
+class RegistroModelos:
+  """
+  Registro dos modelos de coordenadas (data/coord_*.json), carregados e validados uma única vez por processo.
+  Os processadores (CNH, CRLV e futuros tipos) pedem os modelos pelo nome do arquivo sem extensão,
+  ex.: RegistroModelos.obter("coord_cnh_digital", base_path). Use recarregar() quando os arquivos mudarem.
+  """
+
+  PADRAO_ARQUIVOS = "coord_*.json"
+  # Página A4 a 300 dpi, em pixels
+  PAGINA_PADRAO = (2480, 3508)
+
+  _modelos = {}
+  _erros = {}
+  _carregado_de = None
+  _trava = threading.Lock()
+
+  @staticmethod
+  def compilar(nome, caminho, conteudo, mtime=None):
+      """Valida e compila o conteúdo de um JSON de modelo. Lança ValueError com todos os problemas encontrados."""
+      if not isinstance(conteudo, dict):
+          raise ValueError(f"Modelo '{nome}': o JSON deve ser um objeto {{campo: coordenadas}}.")
+
+      metadados = {chave: valor for chave, valor in conteudo.items() if chave.startswith("_")}
+      largura, altura = metadados.get("_pagina", RegistroModelos.PAGINA_PADRAO)
+      problemas = []
+      campos = {}
+
+      for campo, valor in conteudo.items():
+          if campo.startswith("_"):
+              continue
+          opcoes = {}
+          if isinstance(valor, dict):
+              opcoes = {chave: v for chave, v in valor.items() if chave != "coords"}
+              valor = valor.get("coords")
+
+          if not isinstance(valor, (list, tuple)) or len(valor) != 4 or not all(isinstance(c, int) for c in valor):
+              problemas.append(f"campo '{campo}': esperadas 4 coordenadas inteiras [x1, y1, x2, y2], recebido {valor!r}")
+              continue
+
+          x1, y1, x2, y2 = valor
+          if x1 >= x2 or y1 >= y2:
+              problemas.append(f"campo '{campo}': caixa invertida ou vazia {valor} (use [esquerda, topo, direita, base])")
+              continue
+          if x1 < 0 or y1 < 0 or x2 > largura or y2 > altura:
+              problemas.append(f"campo '{campo}': caixa {valor} fora da página ({largura}x{altura})")
+              continue
+          if "perfil" in opcoes:
+              # Import tardio: o OpenCV só é carregado se algum campo declarar perfil (--validar-modelos, worker)
+              from src.services.preprocessamento.preprocessamento import PaginaPreprocessada
+              if opcoes["perfil"] not in PaginaPreprocessada.PERFIS:
+                  problemas.append(f"campo '{campo}': perfil desconhecido {opcoes['perfil']!r} (use um de {list(PaginaPreprocessada.PERFIS)})")
+                  continue
+          problemas_tipo = TiposCampo.problemas(opcoes)
+          if problemas_tipo:
+              problemas.extend(f"campo '{campo}': {problema}" for problema in problemas_tipo)
+              continue
+
+          campos[campo] = Regiao(campo, valor, opcoes)
+
+      impressoes = metadados.get("_impressoes", [])
+      if not isinstance(impressoes, list) or not all(isinstance(i, str) for i in impressoes) or len({len(i) for i in impressoes}) > 1:
+          problemas.append("_impressoes: esperada uma lista de impressões hexadecimais do mesmo tamanho")
+      else:
+          for impressao in impressoes:
+              try:
+                  int(impressao, 16)
+              except ValueError:
+                  problemas.append(f"_impressoes: impressão não hexadecimal {impressao!r}")
+
+      palavras_chave = metadados.get("_palavras_chave", [])
+      grupos = [[grupo] if isinstance(grupo, str) else grupo for grupo in palavras_chave] if isinstance(palavras_chave, list) else None
+      if grupos is None or not all(isinstance(g, list) and g and all(isinstance(t, str) and t.strip() for t in g) for g in grupos):
+          problemas.append("_palavras_chave: esperada uma lista de termos ou de listas de termos alternativos")
+      excluidas = metadados.get("_palavras_excluidas", [])
+      if not isinstance(excluidas, list) or not all(isinstance(t, str) and t.strip() for t in excluidas):
+          problemas.append("_palavras_excluidas: esperada uma lista de termos")
+
+      qrcode = metadados.get("_qrcode")
+      if qrcode is not None:
+          mapeamento = qrcode.get("campos") if isinstance(qrcode, dict) else None
+          regiao = qrcode.get("regiao") if isinstance(qrcode, dict) else None
+          listas = [[chaves] if isinstance(chaves, str) else chaves for chaves in mapeamento.values()] if isinstance(mapeamento, dict) else None
+          if not listas or not all(isinstance(l, list) and l and all(isinstance(c, str) and c.strip() for c in l) for l in listas):
+              problemas.append("_qrcode: \"campos\" deve mapear cada campo para uma chave ou lista de chaves do conteúdo do QR code")
+          elif any(campo not in campos for campo in mapeamento):
+              problemas.append(f"_qrcode: campos inexistentes no modelo {sorted(c for c in mapeamento if c not in campos)}")
+          if not (isinstance(regiao, list) and len(regiao) == 4 and all(isinstance(v, int) for v in regiao)
+                  and regiao[0] < regiao[2] and regiao[1] < regiao[3]):
+              problemas.append("_qrcode: \"regiao\" deve ser [x1, y1, x2, y2] com x1 < x2 e y1 < y2")
+
+      permitidas = {frozenset(par) for par in metadados.get("_sobreposicoes_permitidas", [])}
+      lista_campos = list(campos.values())
+      for i, regiao in enumerate(lista_campos):
+          for outra in lista_campos[i + 1:]:
+              if regiao.sobrepoe(outra) and frozenset((regiao.nome, outra.nome)) not in permitidas:
+                  problemas.append(f"campos '{regiao.nome}' e '{outra.nome}' se sobrepõem (declare em _sobreposicoes_permitidas se for intencional)")
+
+      if not campos and not problemas:
+          problemas.append("nenhum campo definido")
+
+      if problemas:
+          raise ValueError(f"Modelo '{nome}' ({caminho}) inválido: " + "; ".join(problemas))
+
+      return Modelo(nome, caminho, campos, metadados, mtime)
+
+  @staticmethod
+  def carregar(base_path):
+      """Descobre, valida e compila todos os modelos de data/. Modelos inválidos ficam registrados em erros()."""
+      pasta_data = os.path.join(base_path, 'data')
+      modelos, erros = {}, {}
+
+      for caminho in sorted(glob.glob(os.path.join(pasta_data, RegistroModelos.PADRAO_ARQUIVOS))):
+          nome = os.path.splitext(os.path.basename(caminho))[0]
+          try:
+              with open(caminho, encoding="utf-8") as f:
+                  conteudo = json.load(f)
+              modelos[nome] = RegistroModelos.compilar(nome, caminho, conteudo, os.path.getmtime(caminho))
+          except (ValueError, OSError) as e:
+              erros[nome] = str(e)
+
+      with RegistroModelos._trava:
+          RegistroModelos._modelos = modelos
+          RegistroModelos._erros = erros
+          RegistroModelos._carregado_de = base_path
+
+  @staticmethod
+  def _garantir_carregado(base_path):
+      if RegistroModelos._carregado_de != base_path:
+          RegistroModelos.carregar(base_path)
+
+  @staticmethod
+  def recarregar(base_path):
+      """Relê todos os modelos de data/ (após editar ou incluir um JSON de coordenadas)."""
+      RegistroModelos.carregar(base_path)
+
+  @staticmethod
+  def obter(nome, base_path):
+      """Retorna o modelo compilado. Lança FileNotFoundError/ValueError se não existir ou for inválido."""
+      RegistroModelos._garantir_carregado(base_path)
+      modelo = RegistroModelos._modelos.get(nome)
+      if modelo is not None:
+          return modelo
+      if nome in RegistroModelos._erros:
+          raise ValueError(RegistroModelos._erros[nome])
+      raise FileNotFoundError(f"Arquivo de coordenadas do modelo não encontrado: {os.path.join(base_path, 'data', nome + '.json')}")
+
+  @staticmethod
+  def nomes(base_path, prefixo=""):
+      """Nomes dos modelos válidos, opcionalmente filtrados pelo prefixo (ex.: "coord_cnh_")."""
+      RegistroModelos._garantir_carregado(base_path)
+      return [nome for nome in RegistroModelos._modelos if nome.startswith(prefixo)]
+
+  @staticmethod
+  def erros(base_path):
+      RegistroModelos._garantir_carregado(base_path)
+      return dict(RegistroModelos._erros)
+
+  @staticmethod
+  def uniao(nomes, base_path):
+      """Caixa que contém todas as regiões dos modelos informados (ignora os que não existirem)."""
+      caixas = []
+      for nome in nomes:
+          try:
+              caixas.append(RegistroModelos.obter(nome, base_path).uniao)
+          except (FileNotFoundError, ValueError):
+              continue
+      if not caixas:
+          return None
+      return (min(c[0] for c in caixas), min(c[1] for c in caixas),
+              max(c[2] for c in caixas), max(c[3] for c in caixas))
+
+  @staticmethod
+  def gravar_metadado(nome, base_path, chave, valor):
+      """
+      Grava (ou substitui) um metadado "_chave" no JSON do modelo e recarrega o registro.
+      O arquivo é reescrito com um campo por linha, no formato dos modelos de data/.
+      """
+      caminho = RegistroModelos.obter(nome, base_path).caminho
+      with open(caminho, encoding="utf-8") as f:
+          conteudo = json.load(f)
+      conteudo[chave] = valor
+
+      linhas = [f"  {json.dumps(campo, ensure_ascii=False)}: {json.dumps(v, ensure_ascii=False)}" for campo, v in conteudo.items()]
+      with open(caminho, "w", encoding="utf-8") as f:
+          f.write("{\n" + ",\n".join(linhas) + "\n}\n")
+      RegistroModelos.recarregar(base_path)
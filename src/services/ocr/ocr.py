@@ -0,0 +1,268 @@
+import os
+import shutil
+import threading
+import numpy as np
+import pytesseract
+from src.utils.configuracao import Configuracao
+from src.utils.limites import Limites
+from src.services.utils.utils_services import UtilsServices
+from src.services.tipos_campo.tipos_campo import TiposCampo
+
+
+class BackendOCR:
+  """
+  Contrato de um motor de OCR. Recebe recortes já pré-processados (tons de cinza ou binarizados)
+  e devolve o texto no mesmo formato do UtilsServices.ocr_regiao: sem quebras de linha e sem espaços nas pontas.
+  tipo: configuração do campo no modelo (TiposCampo.configuracao) com psm e whitelist, ou None.
+  """
+
+  nome = None
+  # Indica se reconhecer() pode ser chamado por várias threads ao mesmo tempo (OCR paralelo dos campos)
+  concorrente = True
+
+  def reconhecer(self, imagem, tipo=None):
+      """Reconhece o texto de um único recorte."""
+      raise NotImplementedError
+
+  def reconhecer_lote(self, imagens, tipos=None):
+      """Reconhece uma lista de recortes; retorna os textos na mesma ordem. tipos: lista paralela a imagens."""
+      tipos = tipos or [None] * len(imagens)
+      return [self.reconhecer(imagem, tipo) for imagem, tipo in zip(imagens, tipos)]
+
+  def reconhecer_com_caixas(self, imagem):
+      """
+      Reconhece as palavras de uma imagem com suas posições, no formato do
+      pytesseract.image_to_data (chaves text, left, top, width, height).
+      """
+      raise NotImplementedError
+
+  @staticmethod
+  def limpar_texto(texto):
+      return (texto or "").strip().replace('\n', ' ')
+
+
+class BackendTesseract(BackendOCR):
+  """
+  Tesseract via pytesseract. O reconhecimento em lote monta um mosaico vertical com os recortes
+  e executa um único processo do Tesseract por lote, em vez de um processo por recorte.
+  """
+
+  nome = "tesseract"
+
+  # Espaço em branco entre os recortes do mosaico, para o Tesseract não juntar linhas de campos diferentes
+  ESPACO_MOSAICO = 24
+
+  def __init__(self, tesseract_cmd=None, lang="por", tamanho_lote=16, base_path=None):
+      if tesseract_cmd:
+          pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+      self.lang = lang
+      self.tamanho_lote = tamanho_lote
+      # Sem tesseract_cmd, o executável só é procurado no primeiro OCR (PDFs lidos pela camada de texto não precisam dele)
+      self.base_path = base_path
+      self._resolvido = bool(tesseract_cmd) or base_path is None
+      self._trava = threading.Lock()
+
+  def _garantir_executavel(self):
+      """Resolve o Tesseract (embarcado ou do PATH) antes do primeiro OCR; FileNotFoundError se não houver nenhum."""
+      if self._resolvido:
+          return
+      with self._trava:
+          if not self._resolvido:
+              caminho = BackendsOCR.caminho_tesseract(self.base_path)
+              if caminho:
+                  pytesseract.pytesseract.tesseract_cmd = caminho
+              self._resolvido = True
+
+  def reconhecer(self, imagem, tipo=None):
+      self._garantir_executavel()
+      # Campos tipados: segmentação de uma linha (--psm 7) e caracteres restritos são bem mais rápidos
+      return BackendOCR.limpar_texto(Limites.chamar("ocr", pytesseract.image_to_string, imagem, lang=self.lang,
+                                                    config=TiposCampo.config_tesseract(tipo)))
+
+  def reconhecer_com_caixas(self, imagem):
+      self._garantir_executavel()
+      return Limites.chamar("ocr", pytesseract.image_to_data, imagem, lang=self.lang, output_type=pytesseract.Output.DICT)
+
+  def reconhecer_lote(self, imagens, tipos=None):
+      # Um mosaico por whitelist: o psm dos campos não se aplica ao mosaico, que tem várias linhas
+      tipos = tipos or [None] * len(imagens)
+      grupos = {}
+      for indice, tipo in enumerate(tipos):
+          grupos.setdefault((tipo or {}).get("whitelist"), []).append(indice)
+
+      textos = [""] * len(imagens)
+      for whitelist, indices in grupos.items():
+          for inicio in range(0, len(indices), self.tamanho_lote):
+              parte = indices[inicio:inicio + self.tamanho_lote]
+              for indice, texto in zip(parte, self._reconhecer_mosaico([imagens[i] for i in parte], whitelist)):
+                  textos[indice] = texto
+      return textos
+
+  def _reconhecer_mosaico(self, imagens, whitelist=None):
+      """Empilha os recortes em uma imagem única, reconhece e devolve o texto de cada faixa."""
+      validas = [img for img in imagens if img is not None and img.size > 0]
+      if not validas:
+          return ["" for _ in imagens]
+
+      largura = max(img.shape[1] for img in validas) + 2 * self.ESPACO_MOSAICO
+      altura = sum(img.shape[0] + self.ESPACO_MOSAICO for img in validas) + self.ESPACO_MOSAICO
+      mosaico = np.full((altura, largura), 255, dtype=np.uint8)
+
+      faixas = []
+      y = self.ESPACO_MOSAICO
+      for img in imagens:
+          if img is None or img.size == 0:
+              faixas.append(None)
+              continue
+          cinza = img if img.ndim == 2 else img[:, :, 0]
+          mosaico[y:y + cinza.shape[0], self.ESPACO_MOSAICO:self.ESPACO_MOSAICO + cinza.shape[1]] = cinza
+          faixas.append((y, y + cinza.shape[0]))
+          y += cinza.shape[0] + self.ESPACO_MOSAICO
+
+      self._garantir_executavel()
+      if whitelist:
+          ocr = Limites.chamar("ocr", pytesseract.image_to_data, mosaico, lang=self.lang,
+                               config=f"-c tessedit_char_whitelist={whitelist}", output_type=pytesseract.Output.DICT)
+      else:
+          ocr = self.reconhecer_com_caixas(mosaico)
+
+      palavras = [[] for _ in imagens]
+      for i, texto in enumerate(ocr["text"]):
+          texto = (texto or "").strip()
+          if not texto:
+              continue
+          centro_y = ocr["top"][i] + ocr["height"][i] / 2
+          for indice, faixa in enumerate(faixas):
+              if faixa is not None and faixa[0] <= centro_y < faixa[1]:
+                  palavras[indice].append(texto)
+                  break
+
+      return [" ".join(p) for p in palavras]
+
+
+class BackendEasyOCR(BackendOCR):
+  """
+  EasyOCR em CPU. O modelo é carregado uma única vez por processo e reutilizado por todas as instâncias.
+  """
+
+  nome = "easyocr"
+  # O EasyOCR (PyTorch) já usa todos os núcleos em cada chamada
+  concorrente = False
+
+  _leitores = {}
+  _trava = threading.Lock()
+
+  def __init__(self, idiomas=("pt",)):
+      self.idiomas = tuple(idiomas)
+
+  def _leitor(self):
+      with BackendEasyOCR._trava:
+          leitor = BackendEasyOCR._leitores.get(self.idiomas)
+          if leitor is None:
+              try:
+                  import easyocr
+              except ImportError:
+                  raise ImportError("O backend de OCR 'easyocr' requer o pacote easyocr instalado.")
+              leitor = easyocr.Reader(list(self.idiomas), gpu=False, verbose=False)
+              BackendEasyOCR._leitores[self.idiomas] = leitor
+          return leitor
+
+  def reconhecer(self, imagem, tipo=None):
+      if imagem is None or imagem.size == 0:
+          return ""
+      # O EasyOCR não tem psm; a whitelist vira o allowlist do readtext
+      textos = self._leitor().readtext(imagem, detail=0, paragraph=True, allowlist=(tipo or {}).get("whitelist"))
+      return BackendOCR.limpar_texto(" ".join(textos))
+
+  def reconhecer_lote(self, imagens, tipos=None):
+      if tipos and any(tipos):
+          return super().reconhecer_lote(imagens, tipos)
+      validas = [img for img in imagens if img is not None and img.size > 0]
+      # readtext_batched só aceita recortes do mesmo tamanho; caso contrário reconhece um a um
+      if validas and len(validas) == len(imagens) and len({img.shape for img in imagens}) == 1:
+          resultados = self._leitor().readtext_batched(imagens, detail=0, paragraph=True)
+          return [BackendOCR.limpar_texto(" ".join(textos)) for textos in resultados]
+      return super().reconhecer_lote(imagens)
+
+  def reconhecer_com_caixas(self, imagem):
+      ocr = {"text": [], "left": [], "top": [], "width": [], "height": []}
+      for caixa, texto, _confianca in self._leitor().readtext(imagem, detail=1, paragraph=False):
+          xs = [int(p[0]) for p in caixa]
+          ys = [int(p[1]) for p in caixa]
+          ocr["text"].append(texto)
+          ocr["left"].append(min(xs))
+          ocr["top"].append(min(ys))
+          ocr["width"].append(max(xs) - min(xs))
+          ocr["height"].append(max(ys) - min(ys))
+      return ocr
+
+
+class BackendsOCR:
+  """
+  Registro dos motores de OCR. As instâncias são criadas uma vez e reutilizadas.
+  A escolha por tipo de documento ou por modelo fica em data/ocr_backends.json:
+    {"padrao": "tesseract", "tipos": {"CRLV": "tesseract"}, "modelos": {"coord_cnh_digital": "easyocr"}}
+  EXTRATOR_OCR_BACKEND substitui o padrão do arquivo.
+  """
+
+  BACKENDS = {
+      BackendTesseract.nome: BackendTesseract,
+      BackendEasyOCR.nome: BackendEasyOCR
+  }
+
+  _instancias = {}
+  _trava = threading.Lock()
+
+  @staticmethod
+  def caminho_tesseract(base_path):
+      """
+      Tesseract embarcado junto ao executável; se não existir, None para usar o que estiver no PATH.
+      Lança FileNotFoundError se não houver nenhum dos dois.
+      """
+      caminho = os.path.join(base_path, 'Tesseract-OCR', 'tesseract.exe')
+      if os.path.exists(caminho):
+          return caminho
+      if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+          raise FileNotFoundError("Dependência (Tesseract) não encontrada.")
+      return None
+
+  @staticmethod
+  def obter(nome, base_path):
+      """Retorna a instância (reutilizada) do backend pelo nome."""
+      nome = (nome or "").lower()
+      if nome not in BackendsOCR.BACKENDS:
+          raise ValueError(f"Backend de OCR desconhecido: '{nome}'. Backends suportados: {list(BackendsOCR.BACKENDS.keys())}")
+
+      chave = (nome, base_path)
+      with BackendsOCR._trava:
+          backend = BackendsOCR._instancias.get(chave)
+          if backend is None:
+              if nome == BackendTesseract.nome:
+                  backend = BackendTesseract(base_path=base_path)
+              else:
+                  backend = BackendsOCR.BACKENDS[nome]()
+              BackendsOCR._instancias[chave] = backend
+      return backend
+
+  @staticmethod
+  def carregar_configuracao(base_path):
+      caminho = os.path.join(base_path, 'data', 'ocr_backends.json')
+      if not os.path.exists(caminho):
+          return {}
+      return UtilsServices.carregar_json(caminho)
+
+  @staticmethod
+  def para_documento(doc_type, base_path, modelo=None):
+      """
+      Escolhe o backend de um documento: primeiro pelo modelo (nome do JSON de coordenadas,
+      ex.: "coord_cnh_digital"), depois pelo tipo de documento e por fim o padrão.
+      """
+      configuracao = BackendsOCR.carregar_configuracao(base_path)
+      nome = None
+      if modelo:
+          nome = configuracao.get("modelos", {}).get(modelo)
+      if nome is None:
+          nome = configuracao.get("tipos", {}).get(doc_type)
+      if nome is None:
+          nome = Configuracao.obter("OCR_BACKEND", configuracao.get("padrao", BackendTesseract.nome))
+      return BackendsOCR.obter(nome, base_path)
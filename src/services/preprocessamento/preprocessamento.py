@@ -0,0 +1,112 @@
+import cv2
+from src.utils.configuracao import Configuracao
+
+
+class PaginaPreprocessada:
+  """
+  Pré-processamento feito uma única vez por documento: tons de cinza, correção de inclinação
+  e redução de ruído opcionais, e a página binarizada em cache (calculada só se algum campo usar).
+  Os recortes dos campos são views (sem cópia) sobre esses buffers; cada campo pode declarar no
+  JSON do modelo o perfil de pré-processamento que melhor funciona para ele ({"coords": [...], "perfil": "ampliar"}).
+
+  Perfis:
+    "otsu"       Otsu no próprio recorte (padrão, comportamento original)
+    "pagina"     view da página binarizada uma única vez (Otsu global), sem nenhum processamento por campo
+    "adaptativo" limiar adaptativo gaussiano, para fundos com iluminação/estampa irregular
+    "ampliar"    amplia 2x antes do Otsu, para textos pequenos (campos de 30-40 px de altura)
+    "cinza"      apenas tons de cinza (motores que preferem a imagem sem binarizar, ex.: EasyOCR)
+  """
+
+  PERFIS = ("otsu", "pagina", "adaptativo", "ampliar", "cinza")
+  PERFIL_PADRAO = "otsu"
+
+  # Ângulos de inclinação fora desta faixa (em graus) não são corrigidos
+  INCLINACAO_MINIMA = 0.3
+  INCLINACAO_MAXIMA = 10.0
+
+  # Resolução dos modelos de coordenadas (data/coord_*.json)
+  DPI_MODELOS = 300
+
+  def __init__(self, imagem, corrigir_inclinacao=None, reduzir_ruido=None, dpi=DPI_MODELOS):
+      if corrigir_inclinacao is None:
+          corrigir_inclinacao = Configuracao.obter_bool("CORRIGIR_INCLINACAO", False)
+      if reduzir_ruido is None:
+          reduzir_ruido = Configuracao.obter_bool("REDUZIR_RUIDO", False)
+
+      cinza = imagem if imagem.ndim == 2 else cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+      if reduzir_ruido:
+          cinza = cv2.medianBlur(cinza, 3)
+      if corrigir_inclinacao:
+          cinza = PaginaPreprocessada._corrigir_inclinacao(cinza)
+
+      self.cinza = cinza
+      self._binarizada = None
+      self.shape = cinza.shape
+      # Resolução em que a página foi renderizada (modo em camadas: primeira passada abaixo de 300 dpi)
+      self.dpi = dpi
+
+  @staticmethod
+  def garantir(imagem_ou_pagina):
+      """Aceita uma imagem numpy ou uma PaginaPreprocessada e devolve sempre uma PaginaPreprocessada."""
+      if isinstance(imagem_ou_pagina, PaginaPreprocessada):
+          return imagem_ou_pagina
+      return PaginaPreprocessada(imagem_ou_pagina)
+
+  @property
+  def binarizada(self):
+      """Página inteira binarizada (Otsu global), calculada na primeira vez que for pedida."""
+      if self._binarizada is None:
+          _, self._binarizada = cv2.threshold(self.cinza, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+      return self._binarizada
+
+  @staticmethod
+  def _corrigir_inclinacao(cinza):
+      """Estima a inclinação do texto pelos pixels escuros e gira a página se estiver torta."""
+      _, invertida = cv2.threshold(cinza, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+      pontos = cv2.findNonZero(invertida)
+      if pontos is None:
+          return cinza
+
+      angulo = cv2.minAreaRect(pontos)[-1]
+      # minAreaRect devolve ângulos em [0, 90); traz para (-45, 45]
+      if angulo > 45:
+          angulo -= 90
+      if not (PaginaPreprocessada.INCLINACAO_MINIMA <= abs(angulo) <= PaginaPreprocessada.INCLINACAO_MAXIMA):
+          return cinza
+
+      altura, largura = cinza.shape
+      matriz = cv2.getRotationMatrix2D((largura / 2, altura / 2), angulo, 1.0)
+      return cv2.warpAffine(cinza, matriz, (largura, altura), flags=cv2.INTER_CUBIC,
+                            borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+  def recorte(self, coords, perfil=None):
+      """
+      Devolve o recorte da região (x1, y1, x2, y2) pronto para o OCR, conforme o perfil.
+      Retorna None se a região estiver vazia ou fora da imagem.
+      """
+      perfil = perfil or PaginaPreprocessada.PERFIL_PADRAO
+      if perfil not in PaginaPreprocessada.PERFIS:
+          raise ValueError(f"Perfil de pré-processamento desconhecido: '{perfil}'. Perfis suportados: {list(PaginaPreprocessada.PERFIS)}")
+
+      x1, y1, x2, y2 = coords
+      x1, y1 = max(0, x1), max(0, y1)
+      if x1 >= x2 or y1 >= y2:
+          return None
+
+      if perfil == "pagina":
+          recorte = self.binarizada[y1:y2, x1:x2]
+          return recorte if recorte.size else None
+
+      cinza = self.cinza[y1:y2, x1:x2]
+      if cinza.size == 0:
+          return None
+
+      if perfil == "cinza":
+          return cinza
+      if perfil == "adaptativo":
+          return cv2.adaptiveThreshold(cinza, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+      if perfil == "ampliar":
+          cinza = cv2.resize(cinza, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+
+      _, binarizada = cv2.threshold(cinza, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+      return binarizada
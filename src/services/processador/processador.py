@@ -0,0 +1,142 @@
+import importlib
+import os
+import time
+from src.services.cache.cache import CacheResultados
+from src.utils.cronometro import Cronometro
+from src.utils.limites import Limites, LimiteExcedido
+from src.utils.metricas import Metricas
+
+
+class Processador:
+  """
+  Despacha um documento para o processador correspondente ao seu tipo.
+  Usado pela execução única (main.py), pelo modo worker e pelo modo lote.
+  """
+
+  # --- Dicionário de Processadores ---
+  # "módulo:Classe.método", importado só quando o tipo é pedido: um demonstrativo Buonny
+  # não carrega OpenCV/Tesseract e uma CNH não carrega o pdfplumber.
+  # Novos tipos também precisam entrar em hiddenimports nos .spec do PyInstaller.
+  PROCESSADORES = {
+      "CNH": "src.services.cnh.cnh:CNH.processar_cnh",
+      "CRLV": "src.services.crlv.crlv:CRLV.processar_crlv",
+      "TARIFAS_BUONNY": "src.services.tarifas_buonny.tar_buonny:TarifasBuonny.ExtrairTarifasPDF"
+  }
+
+  # Tipo informado quando o chamador não sabe o tipo do documento
+  TIPO_AUTOMATICO = "AUTO"
+
+  _resolvidos = {}
+
+  @staticmethod
+  def resolver(doc_type):
+      """Importa (uma única vez) e retorna a função processadora do tipo."""
+      funcao = Processador._resolvidos.get(doc_type)
+      if funcao is None:
+          modulo, atributo = Processador.PROCESSADORES[doc_type].split(":")
+          funcao = importlib.import_module(modulo)
+          for parte in atributo.split("."):
+              funcao = getattr(funcao, parte)
+          Processador._resolvidos[doc_type] = funcao
+      return funcao
+
+  @staticmethod
+  def processar(doc_type, caminho_pdf, base_path):
+      """
+      Executa o processador do tipo informado.
+      doc_type vazio ou "AUTO": o tipo é detectado pela primeira página e devolvido em "_doc_type_detectado".
+      Retorna o dicionário de dados extraídos; exceções são propagadas ao chamador.
+      """
+      doc_type = (doc_type or Processador.TIPO_AUTOMATICO).upper()
+      if doc_type != Processador.TIPO_AUTOMATICO and doc_type not in Processador.PROCESSADORES:
+          raise ValueError(f"Tipo de documento desconhecido: '{doc_type}'. Tipos suportados: {list(Processador.PROCESSADORES.keys()) + [Processador.TIPO_AUTOMATICO]}")
+
+      if not caminho_pdf or not os.path.exists(caminho_pdf):
+          raise FileNotFoundError(f"Arquivo PDF não encontrado no caminho: {caminho_pdf}")
+
+      # --- Métricas por etapa (EXTRATOR_METRICAS=1) ---
+      # Limites.documento(): prazo do documento (EXTRATOR_TEMPO_DOCUMENTO) e MemoryError como LimiteExcedido
+      if not Metricas.habilitadas():
+          with Limites.documento():
+              return Processador._processar_tipo(doc_type, caminho_pdf, base_path)[0]
+
+      inicio, inicio_cpu = time.perf_counter(), time.process_time()
+      with Cronometro.coletar() as etapas, Limites.documento():
+          dados, do_cache = Processador._processar_tipo(doc_type, caminho_pdf, base_path)
+      dados["_metrics"] = Metricas.montar(etapas, time.perf_counter() - inicio, time.process_time() - inicio_cpu, do_cache)
+      return dados
+
+  @staticmethod
+  def gravar_em_fluxo(caminho_pdf, output_path, formato="json"):
+      """
+      Demonstrativo Buonny gravado em fluxo direto no arquivo de saída (TarifasBuonny.gravar_em_fluxo),
+      com o mesmo orçamento do documento (Limites.documento) e o mesmo "_metrics" de processar().
+      O cache não é usado neste caminho. Retorna a quantidade de serviços gravados.
+      """
+      if not caminho_pdf or not os.path.exists(caminho_pdf):
+          raise FileNotFoundError(f"Arquivo PDF não encontrado no caminho: {caminho_pdf}")
+
+      # Import tardio, como em resolver(): só o Buonny carrega o pdfplumber
+      from src.services.tarifas_buonny.tar_buonny import TarifasBuonny
+      if not Metricas.habilitadas():
+          with Limites.documento():
+              return TarifasBuonny.gravar_em_fluxo(caminho_pdf, output_path, formato)
+
+      inicio, inicio_cpu = time.perf_counter(), time.process_time()
+      with Cronometro.coletar() as etapas, Limites.documento():
+          return TarifasBuonny.gravar_em_fluxo(caminho_pdf, output_path, formato, metricas=lambda: Metricas.montar(
+              etapas, time.perf_counter() - inicio, time.process_time() - inicio_cpu, False))
+
+  @staticmethod
+  def _processar_tipo(doc_type, caminho_pdf, base_path):
+      """Detecta o tipo quando pedido "AUTO" e processa. Retorna (dados, veio_do_cache)."""
+      detectado = doc_type == Processador.TIPO_AUTOMATICO
+      if detectado:
+          # Import tardio: a detecção usa o OpenCV e os processadores de CNH/CRLV
+          from src.services.classificacao.classificacao import ClassificadorLayout
+          doc_type = ClassificadorLayout.detectar_tipo(caminho_pdf, base_path)
+
+      dados, do_cache = Processador._processar_com_cache(doc_type, Processador.resolver(doc_type), caminho_pdf, base_path)
+      if detectado:
+          dados["_doc_type_detectado"] = doc_type
+      return dados, do_cache
+
+  @staticmethod
+  def _processar_com_cache(doc_type, funcao_processadora, caminho_pdf, base_path):
+      """Retorna (dados, veio_do_cache). O cache só é consultado com EXTRATOR_CACHE=1."""
+      if not CacheResultados.habilitado():
+          return funcao_processadora(caminho_pdf, base_path), False
+
+      dados_cache, identificacao = CacheResultados.obter(doc_type, caminho_pdf, base_path)
+      if dados_cache is not None:
+          return dados_cache, True
+
+      dados = funcao_processadora(caminho_pdf, base_path)
+      CacheResultados.gravar(doc_type, identificacao, dados)
+      return dados, False
+
+  @staticmethod
+  def processar_seguro(doc_type, caminho_pdf, base_path):
+      """
+      Igual a processar(), mas nunca lança exceção: erros viram o mesmo
+      dicionário de erro que o main.py grava no JSON de saída.
+      """
+      try:
+          return Processador.processar(doc_type, caminho_pdf, base_path)
+      except Exception as e:
+          return Processador.dados_erro(e)
+
+  @staticmethod
+  def dados_erro(e):
+      """
+      Monta o dicionário de erro padrão a partir de uma exceção.
+      Documentos interrompidos por um limite (LimiteExcedido) trazem também a etapa e o limite estourado.
+      """
+      dados = {
+          "status": "erro",
+          "mensagem": str(e)
+      }
+      if isinstance(e, LimiteExcedido):
+          dados["etapa"] = e.etapa
+          dados["limite"] = e.limite
+      return dados
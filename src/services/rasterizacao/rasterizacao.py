@@ -0,0 +1,197 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from src.utils.configuracao import Configuracao
+from src.utils.cronometro import Cronometro
+from src.utils.limites import Limites
+from src.services.camada_texto.camada_texto import CamadaTexto
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+class Rasterizador:
+  """
+  Converte páginas do PDF em imagem (numpy) em memória, já em tons de cinza.
+  Renderiza apenas a página pedida e, opcionalmente, apenas o retângulo que contém as regiões do modelo.
+  As coordenadas dos JSONs de data/ (pixels a 300 dpi) continuam valendo: quando há recorte,
+  o deslocamento (x0, y0) da imagem em relação à página inteira é devolvido junto.
+
+  Motores (EXTRATOR_RASTERIZADOR):
+    "pymupdf" -> PyMuPDF em processo, sem arquivos temporários (padrão quando instalado)
+    "poppler" -> pdf2image/Poppler, comportamento original
+
+  Antes de renderizar, a quantidade de páginas e a área da imagem são conferidas contra os limites
+  (EXTRATOR_MAX_PAGINAS, EXTRATOR_MAX_MEGAPIXELS) e as chamadas ao Poppler têm timeout (ver Limites).
+  Com EXTRATOR_RASTERIZACAO_ISOLADA (ligado pelo worker e pelo lote), as chamadas ao PyMuPDF rodam em
+  ProcessosAuxiliares com o mesmo timeout: um PDF que trava o MuPDF não trava o processo.
+  O PyMuPDF não é thread-safe (CamadaTexto.TRAVA_PYMUPDF serializa as chamadas do processo); nas threads
+  de páginas (paralela()), cada thread usa o próprio processo auxiliar e as páginas renderizam ao mesmo tempo.
+  """
+
+  DPI_PADRAO = 300
+  MOTORES = ("pymupdf", "poppler")
+  # Margem (pixels a 300 dpi) em volta do campo quando só ele é renderizado de novo em alta resolução
+  MARGEM_REGIAO = 6
+
+  _local = threading.local()
+
+  @staticmethod
+  def dpi_inicial():
+      """
+      Resolução da primeira passada (EXTRATOR_DPI_INICIAL). Abaixo de DPI_PADRAO ativa o modo em camadas:
+      a página é lida em baixa resolução e só os campos vazios ou inválidos são renderizados de novo
+      em EXTRATOR_DPI_ESCALONAMENTO. Padrão: DPI_PADRAO (modo desligado).
+      """
+      dpi = Configuracao.obter_int("DPI_INICIAL", Rasterizador.DPI_PADRAO)
+      if dpi <= 0:
+          raise ValueError(f"EXTRATOR_DPI_INICIAL inválido: {dpi}.")
+      return dpi
+
+  @staticmethod
+  def dpi_escalonamento():
+      """Resolução da segunda passada dos campos que falharam (EXTRATOR_DPI_ESCALONAMENTO, mínimo e padrão: 300)."""
+      return max(Rasterizador.DPI_PADRAO, Configuracao.obter_int("DPI_ESCALONAMENTO", Rasterizador.DPI_PADRAO))
+
+  @staticmethod
+  def escalar(coords, dpi, margem=0):
+      """Converte uma caixa dos modelos (pixels a 300 dpi) para pixels no dpi informado, com margem opcional."""
+      if coords is None:
+          return None
+      fator = dpi / Rasterizador.DPI_PADRAO
+      x1, y1, x2, y2 = coords
+      return (max(0, round((x1 - margem) * fator)), max(0, round((y1 - margem) * fator)),
+              round((x2 + margem) * fator), round((y2 + margem) * fator))
+
+  @staticmethod
+  def motor_padrao():
+      motor = Configuracao.obter("RASTERIZADOR", "pymupdf" if fitz is not None else "poppler").lower()
+      if motor not in Rasterizador.MOTORES:
+          raise ValueError(f"Rasterizador desconhecido: '{motor}'. Rasterizadores suportados: {list(Rasterizador.MOTORES)}")
+      if motor == "pymupdf" and fitz is None:
+          raise ImportError("O rasterizador 'pymupdf' requer o pacote PyMuPDF instalado.")
+      return motor
+
+  @staticmethod
+  def isolada():
+      return Configuracao.obter_bool("RASTERIZACAO_ISOLADA", False)
+
+  @staticmethod
+  @contextmanager
+  def paralela():
+      """Thread de página (UtilsServices.processar_paginas): as chamadas ao PyMuPDF dela vão para um processo auxiliar."""
+      anterior = getattr(Rasterizador._local, "paralela", False)
+      Rasterizador._local.paralela = True
+      try:
+          yield
+      finally:
+          Rasterizador._local.paralela = anterior
+
+  @staticmethod
+  def chamar_pymupdf(funcao, *args):
+      """
+      Executa uma chamada ao PyMuPDF no próprio processo ou, se isolada ou em uma thread de página (paralela()),
+      em um processo auxiliar com timeout.
+      """
+      if Rasterizador.isolada() or getattr(Rasterizador._local, "paralela", False):
+          from src.utils.auxiliares import ProcessosAuxiliares
+          return ProcessosAuxiliares.chamar("rasterizacao", funcao, *args)
+      return funcao(*args)
+
+  @staticmethod
+  def contar_paginas(caminho_pdf, base_path, motor=None):
+      """
+      Quantidade de páginas do PDF, lida pelo mesmo motor que vai rasterizá-lo.
+      Lança LimiteExcedido acima de EXTRATOR_MAX_PAGINAS.
+      """
+      motor = motor or Rasterizador.motor_padrao()
+      with Cronometro.etapa("contagem_paginas"):
+          if motor == "pymupdf":
+              total = Rasterizador.chamar_pymupdf(Rasterizador._contar_paginas_pymupdf, caminho_pdf)
+          else:
+              total = int(Rasterizador._info_poppler(caminho_pdf, base_path)["Pages"])
+      Limites.verificar_paginas(total)
+      return total
+
+  @staticmethod
+  def _contar_paginas_pymupdf(caminho_pdf):
+      with CamadaTexto.TRAVA_PYMUPDF, fitz.open(caminho_pdf) as documento:
+          return documento.page_count
+
+  @staticmethod
+  def _info_poppler(caminho_pdf, base_path):
+      from pdf2image import pdfinfo_from_path
+      poppler_path = os.path.join(base_path, 'poppler', 'Library', 'bin')
+      if not os.path.exists(poppler_path):
+          raise FileNotFoundError("Dependências (Tesseract ou Poppler) não encontradas.")
+      return Limites.chamar("rasterizacao", pdfinfo_from_path, caminho_pdf, poppler_path=poppler_path)
+
+  @staticmethod
+  def renderizar(caminho_pdf, base_path, pagina=0, dpi=DPI_PADRAO, recorte=None, motor=None):
+      """
+      Renderiza uma página (índice a partir de 0) em tons de cinza.
+      recorte: (x1, y1, x2, y2) em pixels na resolução pedida, ou None para a página inteira.
+      Retorna (imagem, (x0, y0)), onde (x0, y0) é a posição da imagem dentro da página.
+      """
+      if recorte is not None and not Configuracao.obter_bool("RASTER_RECORTE", True):
+          recorte = None
+
+      motor = motor or Rasterizador.motor_padrao()
+      with Cronometro.etapa("rasterizacao"):
+          if motor == "pymupdf":
+              return Rasterizador.chamar_pymupdf(Rasterizador._renderizar_pymupdf, caminho_pdf, pagina, dpi, recorte)
+          return Rasterizador._renderizar_poppler(caminho_pdf, base_path, pagina, dpi, recorte)
+
+  @staticmethod
+  def _renderizar_pymupdf(caminho_pdf, pagina, dpi, recorte):
+      escala = dpi / 72.0
+      with CamadaTexto.TRAVA_PYMUPDF, fitz.open(caminho_pdf) as documento:
+          if pagina >= documento.page_count:
+              raise ValueError(f"O PDF possui {documento.page_count} página(s); página {pagina + 1} solicitada.")
+          pagina_pdf = documento[pagina]
+
+          clip = None
+          if recorte is not None:
+              x1, y1, x2, y2 = recorte
+              clip = fitz.Rect(x1 / escala, y1 / escala, x2 / escala, y2 / escala) & pagina_pdf.rect
+              if clip.is_empty:
+                  raise ValueError("As regiões do modelo estão fora da página do PDF.")
+          area = clip if clip is not None else pagina_pdf.rect
+          Limites.verificar_pixels(area.width * escala, area.height * escala)
+
+          pix = pagina_pdf.get_pixmap(matrix=fitz.Matrix(escala, escala), colorspace=fitz.csGRAY, clip=clip, alpha=False)
+          imagem = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+          deslocamento = (pix.x, pix.y) if clip is not None else (0, 0)
+      return imagem, deslocamento
+
+  @staticmethod
+  def _renderizar_poppler(caminho_pdf, base_path, pagina, dpi, recorte):
+      from pdf2image import convert_from_path
+
+      poppler_path = os.path.join(base_path, 'poppler', 'Library', 'bin')
+      if not os.path.exists(poppler_path):
+          raise FileNotFoundError("Dependências (Tesseract ou Poppler) não encontradas.")
+
+      # O Poppler sempre renderiza a página inteira (o recorte é feito depois): a área vem do tamanho da página
+      if Limites.max_megapixels() > 0:
+          tamanho = str(Rasterizador._info_poppler(caminho_pdf, base_path).get("Page size", ""))
+          medidas = tamanho.split()
+          if len(medidas) >= 3 and medidas[1] == "x":
+              Limites.verificar_pixels(float(medidas[0]) * dpi / 72.0, float(medidas[2]) * dpi / 72.0)
+
+      paginas = Limites.chamar("rasterizacao", convert_from_path, caminho_pdf, dpi=dpi, poppler_path=poppler_path,
+                               first_page=pagina + 1, last_page=pagina + 1, grayscale=True)
+      if not paginas:
+          raise ValueError(f"Não foi possível rasterizar a página {pagina + 1} do PDF.")
+      imagem = np.asarray(paginas[0])
+
+      if recorte is None:
+          return imagem, (0, 0)
+
+      altura, largura = imagem.shape[:2]
+      x1, y1 = max(0, int(recorte[0])), max(0, int(recorte[1]))
+      x2, y2 = min(largura, int(recorte[2])), min(altura, int(recorte[3]))
+      return imagem[y1:y2, x1:x2], (x1, y1)
@@ -1,97 +1,410 @@
+import importlib
+import json
 import os
 import re
-import pdfplumber
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoEsgotado
+from src.utils.configuracao import Configuracao
+from src.utils.cronometro import Cronometro
+from src.utils.limites import LimiteExcedido, Limites
 
 class TarifasBuonny:
     """
     Classe para processar arquivos PDF de demonstrativo de serviços da Buonny.
+    O PDF é lido uma página por vez (iterar_servicos), então a memória não cresce com o tamanho do demonstrativo.
+    Demonstrativos longos têm as páginas divididas em intervalos processados em paralelo; os serviços
+    voltam sempre na ordem das páginas. O motor de texto é escolhido por EXTRATOR_BUONNY_TEXTO.
     """
 
+    LINHA_SERVICO_PATTERN = re.compile(r'^(\d{2}\/\d{2}\/\d{4})\s+(.+?)\s+(R\$\s*[\d,.]+)$')
+    # Placa de veículo (padrão Mercosul e anterior)
+    PLACA_PATTERN = re.compile(r'^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$')
+
+    FORMATOS_SAIDA = ("json", "jsonl")
+
+    # "pdfplumber" é a referência (comportamento original); os demais devem ser validados com
+    # main.py --validar-texto-buonny antes de serem adotados.
+    MOTORES_TEXTO = ("pdfplumber", "pymupdf", "pypdfium2")
+    MOTOR_TEXTO_PADRAO = "pdfplumber"
+    # Pacote de cada motor; só o motor escolhido é importado
+    MODULOS_MOTOR = {"pdfplumber": "pdfplumber", "pymupdf": "fitz", "pypdfium2": "pypdfium2"}
+    # Páginas lidas por tarefa do pool de processos
+    PAGINAS_POR_TAREFA = 16
+
     @staticmethod
-    def ExtrairTarifasPDF(caminho_pdf, base_path):
+    def motor_texto(motor=None):
+        """Resolve e valida o motor de texto (argumento, EXTRATOR_BUONNY_TEXTO ou pdfplumber)."""
+        motor = (motor or Configuracao.obter("BUONNY_TEXTO", TarifasBuonny.MOTOR_TEXTO_PADRAO)).lower()
+        if motor not in TarifasBuonny.MOTORES_TEXTO:
+            raise ValueError(f"Motor de texto desconhecido: '{motor}'. Motores suportados: {list(TarifasBuonny.MOTORES_TEXTO)}")
+        try:
+            TarifasBuonny._modulo(motor)
+        except ImportError:
+            raise ValueError(f"Motor de texto '{motor}' não está instalado.")
+        return motor
+
+    @staticmethod
+    def motores_disponiveis():
+        disponiveis = []
+        for motor in TarifasBuonny.MOTORES_TEXTO:
+            try:
+                TarifasBuonny._modulo(motor)
+            except ImportError:
+                continue
+            disponiveis.append(motor)
+        return disponiveis
+
+    @staticmethod
+    def _modulo(motor):
+        return importlib.import_module(TarifasBuonny.MODULOS_MOTOR[motor])
+
+    @staticmethod
+    def contar_paginas(caminho_pdf, motor):
+        modulo = TarifasBuonny._modulo(motor)
+        if motor == "pymupdf":
+            with modulo.open(caminho_pdf) as documento:
+                return documento.page_count
+        if motor == "pypdfium2":
+            documento = modulo.PdfDocument(caminho_pdf)
+            try:
+                return len(documento)
+            finally:
+                documento.close()
+        with modulo.open(caminho_pdf) as pdf:
+            return len(pdf.pages)
+
+    @staticmethod
+    def processos_paginas(total_paginas, processos=None):
         """
-        Lê um arquivo PDF de demonstrativo de serviços, extrai os dados relevantes
-        e retorna um dicionário com os dados. (Versão com lógica de parsing aprimorada)
+        Processos para ler as páginas (argumento ou EXTRATOR_BUONNY_PROCESSOS; 0 = automático).
+        No automático, um processo por intervalo de PAGINAS_POR_TAREFA páginas, limitado ao número de CPUs.
+        """
+        if processos is None:
+            processos = Configuracao.obter_int("BUONNY_PROCESSOS", 0)
+        tarefas = -(-total_paginas // TarifasBuonny.PAGINAS_POR_TAREFA)
+        if processos <= 0:
+            processos = os.cpu_count() or 1
+        return max(1, min(processos, tarefas))
+
+    @staticmethod
+    def iterar_textos_paginas(caminho_pdf, motor=None, inicio=0, fim=None):
+        """Gera o texto de cada página do intervalo [inicio, fim), liberando a página antes de ler a próxima."""
+        motor = TarifasBuonny.motor_texto(motor)
+        try:
+            if motor == "pymupdf":
+                textos = TarifasBuonny._textos_pymupdf(caminho_pdf, inicio, fim)
+            elif motor == "pypdfium2":
+                textos = TarifasBuonny._textos_pypdfium2(caminho_pdf, inicio, fim)
+            else:
+                textos = TarifasBuonny._textos_pdfplumber(caminho_pdf, inicio, fim)
+            for texto_pagina in textos:
+                if texto_pagina:
+                    yield texto_pagina
+        except Exception as e:
+            TarifasBuonny._erro_leitura(e)
+
+    @staticmethod
+    def _erro_leitura(erro):
+        """Relança a falha de leitura do PDF; limites (prazo, memória) seguem sem mudança para o Limites tratar."""
+        if isinstance(erro, LimiteExcedido) or Limites.falta_memoria(erro):
+            raise erro
+        raise Exception(f"Erro ao ler o arquivo PDF: {erro}") from erro
+
+    @staticmethod
+    def _textos_pdfplumber(caminho_pdf, inicio, fim):
+        pdfplumber = TarifasBuonny._modulo("pdfplumber")
+        with pdfplumber.open(caminho_pdf) as pdf:
+            for page in pdf.pages[inicio:fim]:
+                texto_pagina = page.extract_text(x_tolerance=2, y_tolerance=2) # Tolera pequenos desvios de alinhamento
+                # Descarta os caracteres/objetos já interpretados desta página
+                if hasattr(page, "close"):
+                    page.close()
+                else:
+                    page.flush_cache()
+                yield texto_pagina
+
+    @staticmethod
+    def _textos_pymupdf(caminho_pdf, inicio, fim):
+        # As palavras são reagrupadas em linhas como no pdfplumber (uma linha por linha visual da tabela)
+        from src.services.camada_texto.camada_texto import CamadaTexto
+        fitz = TarifasBuonny._modulo("pymupdf")
+        with fitz.open(caminho_pdf) as documento:
+            for numero in range(inicio, documento.page_count if fim is None else min(fim, documento.page_count)):
+                palavras = [(p[0], p[1], p[2], p[3], p[4]) for p in documento[numero].get_text("words")]
+                yield "\n".join(CamadaTexto.linhas(palavras))
+
+    @staticmethod
+    def _textos_pypdfium2(caminho_pdf, inicio, fim):
+        pdfium = TarifasBuonny._modulo("pypdfium2")
+        documento = pdfium.PdfDocument(caminho_pdf)
+        try:
+            for numero in range(inicio, len(documento) if fim is None else min(fim, len(documento))):
+                pagina = documento[numero]
+                pagina_texto = pagina.get_textpage()
+                texto_pagina = pagina_texto.get_text_range()
+                pagina_texto.close()
+                pagina.close()
+                yield texto_pagina.replace("\r\n", "\n").replace("\r", "\n")
+        finally:
+            documento.close()
+
+    @staticmethod
+    def interpretar_linha(linha):
+        """Converte uma linha do demonstrativo em um serviço; retorna None se a linha não for de serviço."""
+        match = TarifasBuonny.LINHA_SERVICO_PATTERN.match(linha.strip())
+        if not match:
+            return None
+
+        data = match.group(1)
+        conteudo_meio = match.group(2).strip()
+        valor = match.group(3)
+
+        partes = conteudo_meio.split()
+
+        # --- NOVA LÓGICA DE PARSING (DA DIREITA PARA A ESQUERDA) ---
+
+        # Inicializa as variáveis
+        nome, rg, cavalo, carreta, tipo = "N/A", "N/A", None, None, None
+
+        # O último item é quase sempre o "Tipo" (AGREGADO, CARRETEIRO, etc.)
+        if partes:
+            tipo = partes.pop() # Remove e armazena o tipo
+
+        # O novo último item pode ser a 'Carreta'. Se for uma placa, assume e remove.
+        if partes and TarifasBuonny.PLACA_PATTERN.match(partes[-1]):
+            carreta = partes.pop()
+
+        # O novo último item pode ser o 'Cavalo'. Se for uma placa, assume e remove.
+        if partes and TarifasBuonny.PLACA_PATTERN.match(partes[-1]):
+            cavalo = partes.pop()
+
+        # O novo último item deve ser o 'RG'. Assume e remove.
+        if partes:
+            rg = partes.pop()
+
+        # Tudo o que sobrou na lista de 'partes' pertence ao nome.
+        nome = ' '.join(partes)
+
+        # Lógica de fallback: se não encontrou um cavalo, mas a carreta sim,
+        # significa que a única placa era do cavalo.
+        if not cavalo and carreta:
+            cavalo = carreta
+            carreta = None
+
+        return {
+            "data": data,
+            "nome": nome.strip(),
+            "rg": rg.strip(),
+            "cavalo": cavalo,
+            "valor": valor
+        }
+
+    @staticmethod
+    def _servicos_paginas(caminho_pdf, motor=None, inicio=0, fim=None):
+        textos = TarifasBuonny.iterar_textos_paginas(caminho_pdf, motor, inicio, fim)
+        while True:
+            inicio_etapa = time.perf_counter()
+            # Prazo e memória do documento (Limites) conferidos a cada página
+            with Limites.etapa("leitura_texto"):
+                texto_pagina = next(textos, None)
+            Cronometro.adicionar("leitura_texto", time.perf_counter() - inicio_etapa)
+            if texto_pagina is None:
+                return
+
+            inicio_etapa = time.perf_counter()
+            servicos = [TarifasBuonny.interpretar_linha(linha) for linha in texto_pagina.splitlines()]
+            Cronometro.adicionar("interpretacao", time.perf_counter() - inicio_etapa)
+            for servico in servicos:
+                if servico is not None:
+                    yield servico
+
+    @staticmethod
+    def _servicos_intervalo(caminho_pdf, motor, inicio, fim):
+        """Executado dentro do pool: serviços de um intervalo de páginas e o tempo de cada etapa no processo filho."""
+        with Cronometro.coletar() as etapas:
+            servicos = list(TarifasBuonny._servicos_paginas(caminho_pdf, motor, inicio, fim))
+        return servicos, etapas
+
+    @staticmethod
+    def _aguardar_intervalo(futuro):
+        """
+        Resultado de um intervalo do pool, esperando no máximo o que resta do prazo do documento (Limites).
+        As etapas medidas no processo filho são somadas às do documento.
+        """
+        prazo = Limites.prazo()
+        try:
+            servicos, etapas = futuro.result(timeout=None if prazo is None else max(0.0, prazo - time.monotonic()))
+        except TempoEsgotado:
+            raise LimiteExcedido("leitura_texto", "tempo_documento",
+                                 f"Tempo limite do documento ({Limites.tempo_documento()} s) esgotado na etapa 'leitura_texto'.")
+        for nome, segundos in etapas.items():
+            Cronometro.adicionar(nome, segundos)
+        return servicos
+
+    @staticmethod
+    def _encerrar_pool(executor):
+        """Encerra o pool sem esperar os intervalos em andamento (prazo esgotado ou leitura interrompida)."""
+        for processo in list((getattr(executor, "_processes", None) or {}).values()):
+            processo.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def iterar_servicos(caminho_pdf, motor=None, processos=None):
+        """
+        Gera os serviços do demonstrativo à medida que as páginas são lidas.
+        Os primeiros serviços ficam disponíveis antes da última página ser processada.
+        Com mais de um processo, os intervalos de páginas são lidos em paralelo (no máximo dois por
+        processo em andamento, para a memória não crescer) e devolvidos na ordem das páginas.
         """
-        # --- 1. Validação do caminho do PDF ---
         if not os.path.exists(caminho_pdf):
             raise FileNotFoundError(f"Arquivo PDF não encontrado em: {caminho_pdf}")
 
-        # --- 2. Extração de texto do PDF ---
-        texto_completo_pdf = ""
+        motor = TarifasBuonny.motor_texto(motor)
         try:
-            with pdfplumber.open(caminho_pdf) as pdf:
-                for page in pdf.pages:
-                    texto_pagina = page.extract_text(x_tolerance=2, y_tolerance=2) # Tolera pequenos desvios de alinhamento
-                    if texto_pagina:
-                        texto_completo_pdf += texto_pagina + "\n"
+            total_paginas = TarifasBuonny.contar_paginas(caminho_pdf, motor)
         except Exception as e:
-            raise Exception(f"Erro ao ler o arquivo PDF: {e}")
+            TarifasBuonny._erro_leitura(e)
 
-        # --- 3. Lógica de extração de dados (parsing do texto) ---
-        servicos_extraidos = []
-        linha_servico_pattern = re.compile(r'^(\d{2}\/\d{2}\/\d{4})\s+(.+?)\s+(R\$\s*[\d,.]+)$')
-        # Placa de veículo (padrão Mercosul e anterior)
-        placa_pattern = re.compile(r'^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$')
+        processos = TarifasBuonny.processos_paginas(total_paginas, processos)
+        if processos <= 1:
+            yield from TarifasBuonny._servicos_paginas(caminho_pdf, motor)
+            return
 
-        for linha in texto_completo_pdf.splitlines():
-            match = linha_servico_pattern.match(linha.strip())
-            if not match:
-                continue
+        passo = TarifasBuonny.PAGINAS_POR_TAREFA
+        pendentes = deque()
+        executor = ProcessPoolExecutor(max_workers=processos)
+        concluido = False
+        try:
+            for inicio in range(0, total_paginas, passo):
+                if len(pendentes) >= processos * 2:
+                    yield from TarifasBuonny._aguardar_intervalo(pendentes.popleft())
+                pendentes.append(executor.submit(TarifasBuonny._servicos_intervalo, caminho_pdf, motor,
+                                                 inicio, min(inicio + passo, total_paginas)))
+            while pendentes:
+                yield from TarifasBuonny._aguardar_intervalo(pendentes.popleft())
+            concluido = True
+        finally:
+            if concluido:
+                executor.shutdown()
+            else:
+                TarifasBuonny._encerrar_pool(executor)
 
-            data = match.group(1)
-            conteudo_meio = match.group(2).strip()
-            valor = match.group(3)
-
-            partes = conteudo_meio.split()
-
-            # --- NOVA LÓGICA DE PARSING (DA DIREITA PARA A ESQUERDA) ---
-            
-            # Inicializa as variáveis
-            nome, rg, cavalo, carreta, tipo = "N/A", "N/A", None, None, None
-
-            # O último item é quase sempre o "Tipo" (AGREGADO, CARRETEIRO, etc.)
-            if partes:
-                tipo = partes.pop() # Remove e armazena o tipo
-
-            # O novo último item pode ser a 'Carreta'. Se for uma placa, assume e remove.
-            if partes and placa_pattern.match(partes[-1]):
-                carreta = partes.pop()
-
-            # O novo último item pode ser o 'Cavalo'. Se for uma placa, assume e remove.
-            if partes and placa_pattern.match(partes[-1]):
-                cavalo = partes.pop()
-
-            # O novo último item deve ser o 'RG'. Assume e remove.
-            if partes:
-                rg = partes.pop()
-            
-            # Tudo o que sobrou na lista de 'partes' pertence ao nome.
-            nome = ' '.join(partes)
-
-            # Lógica de fallback: se não encontrou um cavalo, mas a carreta sim,
-            # significa que a única placa era do cavalo.
-            if not cavalo and carreta:
-                cavalo = carreta
-                carreta = None
-
-            servicos_extraidos.append({
-                "data": data,
-                "nome": nome.strip(),
-                "rg": rg.strip(),
-                "cavalo": cavalo,
-                "valor": valor
-            })
-
-        # --- 4. Geração do dicionário de retorno ---
+    @staticmethod
+    def ExtrairTarifasPDF(caminho_pdf, base_path):
+        """
+        Lê um arquivo PDF de demonstrativo de serviços, extrai os dados relevantes
+        e retorna um dicionário com os dados. (Versão com lógica de parsing aprimorada)
+        """
+        servicos_extraidos = list(TarifasBuonny.iterar_servicos(caminho_pdf))
+
+        # --- Geração do dicionário de retorno ---
         if not servicos_extraidos:
             raise ValueError("Nenhum dado de serviço foi encontrado no documento PDF.")
-            
+
         dados_finais = {
             "status": "sucesso",
             "mensagem": "Dados das tarifas extraídos com sucesso.",
             "servicos": servicos_extraidos
         }
-        
+
         return dados_finais
 
+    @staticmethod
+    def gravar_em_fluxo(caminho_pdf, output_path, formato="json", metricas=None):
+        """
+        Extrai e grava os serviços no arquivo de saída sem manter o demonstrativo inteiro em memória.
+          "json":  o mesmo objeto de ExtrairTarifasPDF ({"status", "mensagem", "servicos": [...]}),
+                   com os serviços escritos um a um dentro do array; o arquivo sai idêntico ao de
+                   Utils.write_json_output (indent=4).
+          "jsonl": um serviço por linha, seguido de uma linha final com status, mensagem e total.
+        metricas: função chamada depois do último serviço; o que ela devolver (se não for None) é gravado
+        em "_metrics" no fim do objeto ("json") ou na linha final ("jsonl"). Usado por Processador.gravar_em_fluxo.
+        A escrita é feita em um arquivo temporário ao lado da saída e só o substitui no final,
+        para que um erro no meio do PDF nunca deixe um JSON truncado. Retorna a quantidade de serviços.
+        """
+        formato = (formato or "json").lower()
+        if formato not in TarifasBuonny.FORMATOS_SAIDA:
+            raise ValueError(f"Formato de saída desconhecido: '{formato}'. Formatos suportados: {list(TarifasBuonny.FORMATOS_SAIDA)}")
+
+        caminho_parcial = output_path + ".parcial"
+        total = 0
+        try:
+            with open(caminho_parcial, "w", encoding="utf-8") as f_out:
+                if formato == "json":
+                    f_out.write('{\n    "status": "sucesso",\n'
+                                '    "mensagem": "Dados das tarifas extraídos com sucesso.",\n'
+                                '    "servicos": [')
+                for servico in TarifasBuonny.iterar_servicos(caminho_pdf):
+                    if formato == "json":
+                        f_out.write(",\n        " if total else "\n        ")
+                        f_out.write(TarifasBuonny._json_recuado(servico, 2))
+                    else:
+                        f_out.write(json.dumps(servico, ensure_ascii=False) + "\n")
+                    total += 1
+
+                if not total:
+                    raise ValueError("Nenhum dado de serviço foi encontrado no documento PDF.")
+
+                dados_metricas = metricas() if metricas else None
+                if formato == "json":
+                    f_out.write("\n    ]")
+                    if dados_metricas is not None:
+                        f_out.write(',\n    "_metrics": ' + TarifasBuonny._json_recuado(dados_metricas, 1))
+                    f_out.write("\n}")
+                else:
+                    final = {
+                        "status": "sucesso",
+                        "mensagem": "Dados das tarifas extraídos com sucesso.",
+                        "total": total
+                    }
+                    if dados_metricas is not None:
+                        final["_metrics"] = dados_metricas
+                    f_out.write(json.dumps(final, ensure_ascii=False) + "\n")
+
+            os.replace(caminho_parcial, output_path)
+        finally:
+            if os.path.exists(caminho_parcial):
+                os.remove(caminho_parcial)
+
+        return total
+
+    @staticmethod
+    def _json_recuado(valor, nivel):
+        """json.dumps com indent=4 de um valor aninhado em 'nivel' níveis, como o json.dump do objeto inteiro."""
+        return json.dumps(valor, indent=4, ensure_ascii=False).replace("\n", "\n" + "    " * nivel)
+
+    @staticmethod
+    def validar_motores(caminhos_pdf, motores=None):
+        """
+        Compara os serviços de cada motor de texto com os do pdfplumber (referência) nos PDFs informados.
+        Um motor só deve ser adotado em EXTRATOR_BUONNY_TEXTO se as linhas de "servicos" forem idênticas.
+        Retorna {pdf: {motor: {"tempo_s", "servicos", "identico", "primeira_divergencia"}}}.
+        """
+        motores = motores or TarifasBuonny.motores_disponiveis()
+        relatorio = {}
+        for caminho_pdf in caminhos_pdf:
+            resultados = {}
+            referencia = None
+            for motor in [TarifasBuonny.MOTOR_TEXTO_PADRAO] + [m for m in motores if m != TarifasBuonny.MOTOR_TEXTO_PADRAO]:
+                inicio = time.perf_counter()
+                servicos = list(TarifasBuonny.iterar_servicos(caminho_pdf, motor=motor, processos=1))
+                tempo = time.perf_counter() - inicio
+                if referencia is None:
+                    referencia = servicos
+
+                divergencia = next((i for i, (a, b) in enumerate(zip(referencia, servicos)) if a != b), None)
+                if divergencia is None and len(referencia) != len(servicos):
+                    divergencia = min(len(referencia), len(servicos))
+                resultados[motor] = {
+                    "tempo_s": round(tempo, 3),
+                    "servicos": len(servicos),
+                    "identico": divergencia is None,
+                    "primeira_divergencia": None if divergencia is None else {
+                        "indice": divergencia,
+                        "referencia": referencia[divergencia] if divergencia < len(referencia) else None,
+                        "motor": servicos[divergencia] if divergencia < len(servicos) else None
+                    }
+                }
+            relatorio[caminho_pdf] = resultados
+        return relatorio
@@ -0,0 +1,148 @@
+import re
+from datetime import date
+
+
+class TiposCampo:
+  """
+  Tipos de campo declarados nos modelos de coordenadas: {"coords": [...], "tipo": "cpf"}.
+  Cada tipo define o modo de segmentação do Tesseract (psm), os caracteres permitidos (whitelist)
+  e o validador aplicado ao texto lido. O campo pode sobrescrever cada item:
+      {"coords": [...], "tipo": "digitos", "psm": 8, "whitelist": "0123456789X"}
+      {"coords": [...], "validador": "regex", "padrao": "[A-Z]{3}[0-9][A-Z0-9][0-9]{2}"}
+
+  Campos sem tipo continuam com o OCR padrão (página inteira, sem restrição de caracteres).
+  Um texto válido é devolvido já normalizado (ex.: CPF "123.456.789-09", data "dd/mm/aaaa"; no nome, só os espaços);
+  um texto inválido é devolvido como foi lido e marcado em "_validacao_campos".
+  """
+
+  TIPOS = {
+      "texto": {},
+      "nome": {"psm": 7, "validador": "nome"},
+      "data": {"psm": 7, "whitelist": "0123456789/", "validador": "data"},
+      "cpf": {"psm": 7, "whitelist": "0123456789.-", "validador": "cpf"},
+      "cpf_cnpj": {"psm": 7, "whitelist": "0123456789./-", "validador": "cpf_cnpj"},
+      "digitos": {"psm": 7, "whitelist": "0123456789", "validador": "digitos"},
+  }
+
+  VALIDADORES = ("nome", "data", "cpf", "cpf_cnpj", "digitos", "regex")
+
+  # Modos de segmentação de página aceitos pelo Tesseract (--psm)
+  PSM_VALIDOS = range(0, 14)
+
+  DATA_PATTERN = re.compile(r"(\d{2})\s*[/.-]?\s*(\d{2})\s*[/.-]?\s*(\d{4})")
+
+  @staticmethod
+  def problemas(opcoes):
+      """Lista os problemas das opções de tipo de um campo (usado pelo RegistroModelos.compilar)."""
+      problemas = []
+      tipo = opcoes.get("tipo")
+      if tipo is not None and tipo not in TiposCampo.TIPOS:
+          problemas.append(f"tipo desconhecido {tipo!r} (use um de {list(TiposCampo.TIPOS)})")
+      psm = opcoes.get("psm")
+      if psm is not None and (not isinstance(psm, int) or psm not in TiposCampo.PSM_VALIDOS):
+          problemas.append(f"psm inválido {psm!r} (use um inteiro de 0 a 13)")
+      whitelist = opcoes.get("whitelist")
+      if whitelist is not None and (not isinstance(whitelist, str) or not whitelist or any(c.isspace() for c in whitelist)):
+          problemas.append(f"whitelist inválida {whitelist!r} (texto sem espaços)")
+      validador = opcoes.get("validador")
+      if validador is not None and validador not in TiposCampo.VALIDADORES:
+          problemas.append(f"validador desconhecido {validador!r} (use um de {list(TiposCampo.VALIDADORES)})")
+      if validador == "regex":
+          try:
+              re.compile(opcoes.get("padrao") or "")
+          except re.error as e:
+              problemas.append(f"padrao inválido {opcoes.get('padrao')!r}: {e}")
+          if not opcoes.get("padrao"):
+              problemas.append("validador 'regex' requer a opção \"padrao\"")
+      return problemas
+
+  @staticmethod
+  def configuracao(opcoes):
+      """
+      Junta os padrões do tipo com as opções do campo.
+      Retorna {"tipo", "psm", "whitelist", "validador", "padrao"} ou None se o campo não declara nada.
+      """
+      chaves = ("psm", "whitelist", "validador", "padrao")
+      if "tipo" not in opcoes and not any(chave in opcoes for chave in chaves):
+          return None
+      configuracao = {"tipo": opcoes.get("tipo", "texto")}
+      configuracao.update(TiposCampo.TIPOS[configuracao["tipo"]])
+      configuracao.update({chave: opcoes[chave] for chave in chaves if chave in opcoes})
+      if configuracao.get("padrao"):
+          configuracao["padrao"] = re.compile(configuracao["padrao"])
+      return configuracao
+
+  @staticmethod
+  def config_tesseract(configuracao):
+      """Parâmetro config do pytesseract para o campo ("" quando o campo não tem tipo)."""
+      if not configuracao:
+          return ""
+      partes = []
+      if configuracao.get("psm") is not None:
+          partes.append(f"--psm {configuracao['psm']}")
+      if configuracao.get("whitelist"):
+          partes.append(f"-c tessedit_char_whitelist={configuracao['whitelist']}")
+      return " ".join(partes)
+
+  # --- Validadores ---
+
+  @staticmethod
+  def digitos_verificadores_validos(digitos, pesos_primeiro, pesos_segundo):
+      for pesos, posicao in ((pesos_primeiro, -2), (pesos_segundo, -1)):
+          soma = sum(int(d) * p for d, p in zip(digitos, pesos))
+          resto = soma % 11
+          if int(digitos[posicao]) != (0 if resto < 2 else 11 - resto):
+              return False
+      return True
+
+  @staticmethod
+  def cpf_valido(digitos):
+      if len(digitos) != 11 or len(set(digitos)) == 1:
+          return False
+      return TiposCampo.digitos_verificadores_validos(digitos, range(10, 1, -1), range(11, 1, -1))
+
+  @staticmethod
+  def cnpj_valido(digitos):
+      if len(digitos) != 14 or len(set(digitos)) == 1:
+          return False
+      return TiposCampo.digitos_verificadores_validos(digitos, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2],
+                                                       [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+  @staticmethod
+  def validar(texto, configuracao):
+      """Retorna (texto normalizado, válido). Sem validador, o texto volta como está e é considerado válido."""
+      validador = (configuracao or {}).get("validador")
+      if not validador:
+          return texto, True
+
+      if validador in ("cpf", "cpf_cnpj"):
+          digitos = re.sub(r"\D", "", texto)
+          if TiposCampo.cpf_valido(digitos):
+              return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}", True
+          if validador == "cpf_cnpj" and TiposCampo.cnpj_valido(digitos):
+              return f"{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}", True
+          return texto, False
+
+      if validador == "data":
+          encontrado = TiposCampo.DATA_PATTERN.search(texto)
+          if encontrado:
+              dia, mes, ano = (int(parte) for parte in encontrado.groups())
+              try:
+                  date(ano, mes, dia)
+                  return f"{dia:02d}/{mes:02d}/{ano:04d}", True
+              except ValueError:
+                  pass
+          return texto, False
+
+      if validador == "digitos":
+          digitos = re.sub(r"\D", "", texto)
+          return (digitos, True) if digitos else (texto, False)
+
+      if validador == "nome":
+          # Só os espaços são normalizados; letras, pontuação e caixa ficam como foram lidas.
+          # A forma só com letras serve apenas para decidir se há um nome ali.
+          letras = re.sub(r"[^A-Za-zÀ-ÿ]", "", texto)
+          return (" ".join(texto.split()), True) if len(letras) >= 2 else (texto, False)
+
+      encontrado = configuracao["padrao"].search(texto)
+      return (encontrado.group(0), True) if encontrado else (texto, False)
@@ -1,26 +1,414 @@
-import difflib
-import cv2
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pytesseract
+from src.utils.configuracao import Configuracao
+from src.utils.cronometro import Cronometro
+from src.utils.limites import Limites
+from src.services.camada_texto.camada_texto import CamadaTexto
+from src.services.preprocessamento.preprocessamento import PaginaPreprocessada
+from src.services.tipos_campo.tipos_campo import TiposCampo
+from src.services.rasterizacao.rasterizacao import Rasterizador
 
 
 class UtilsServices:
 
+  # Cache dos arquivos JSON de coordenadas: caminho -> (mtime, conteúdo)
+  _cache_json = {}
+
+  @staticmethod
+  def carregar_json(caminho):
+    """
+    Lê um arquivo JSON de coordenadas mantendo-o em memória entre chamadas.
+    O arquivo só é relido se a data de modificação mudar.
+    """
+    mtime = os.path.getmtime(caminho)
+    em_cache = UtilsServices._cache_json.get(caminho)
+    if em_cache is not None and em_cache[0] == mtime:
+        return em_cache[1]
+
+    with open(caminho, encoding="utf-8") as f:
+        conteudo = json.load(f)
+    UtilsServices._cache_json[caminho] = (mtime, conteudo)
+    return conteudo
+
   @staticmethod
-  def contem_semelhante(texto, termo, limiar=0.8):
-    palavras = texto.upper().split()
-    for palavra in palavras:
-        if difflib.SequenceMatcher(None, palavra, termo.upper()).ratio() >= limiar:
-            return True
-    return False
-  
+  def transladar_regioes(regioes, deslocamento, dpi=Rasterizador.DPI_PADRAO):
+    """
+    Converte coordenadas da página inteira (pixels a 300 dpi) para coordenadas de uma imagem
+    renderizada no dpi informado e recortada em deslocamento=(x0, y0).
+    """
+    dx, dy = deslocamento
+    if dpi != Rasterizador.DPI_PADRAO:
+        regioes = {campo: Rasterizador.escalar(c, dpi) for campo, c in regioes.items()}
+    if dx == 0 and dy == 0:
+        return regioes
+    return {campo: [c[0] - dx, c[1] - dy, c[2] - dx, c[3] - dy] for campo, c in regioes.items()}
+
   @staticmethod
-  def ocr_regiao(imagem, coords):
-    """Executa OCR em uma região específica da imagem."""
-    x1, y1, x2, y2 = min(coords[0], coords[2]), min(coords[1], coords[3]), max(coords[0], coords[2]), max(coords[1], coords[3])
-    if x1 >= x2 or y1 >= y2:
+  def ocr_regiao(pagina, coords, backend=None, perfil=None, tipo=None):
+    """
+    Executa OCR em uma região específica da página (pelo backend informado ou pelo Tesseract).
+    pagina: PaginaPreprocessada ou imagem numpy; coords já normalizadas (x1, y1, x2, y2) pelo RegistroModelos.
+    tipo: configuração do campo (TiposCampo.configuracao) com psm e whitelist, ou None.
+    """
+    recorte = PaginaPreprocessada.garantir(pagina).recorte(coords, perfil)
+    if recorte is None:
         return ""
-    recorte = imagem[y1:y2, x1:x2]
-    gray = cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY)
-    _, binarizada = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    texto = pytesseract.image_to_string(binarizada, lang='por')
-    return texto.strip().replace('\n', ' ')
\ No newline at end of file
+    if backend is not None:
+        return backend.reconhecer(recorte, tipo=tipo)
+    texto = Limites.chamar("ocr", pytesseract.image_to_string, recorte, lang='por', config=TiposCampo.config_tesseract(tipo))
+    return texto.strip().replace('\n', ' ')
+
+  # --- Extração dos campos de um modelo ---
+  # "campo":    um OCR (processo do Tesseract) por campo, comportamento original.
+  # "lote":     os recortes de todos os campos vão ao backend em uma única chamada em lote.
+  # "pagina":   um único image_to_data sobre a união das regiões; as palavras são
+  #             atribuídas aos campos pela sobreposição das caixas (psm/whitelist dos campos não se aplicam).
+  # "comparar": executa "campo" e "pagina" e anexa "_comparacao_ocr" com tempos e divergências.
+  MODOS_OCR = ("campo", "lote", "pagina", "comparar")
+
+  @staticmethod
+  def extrair_campos(pagina, regioes, modo_ocr=None, backend=None, perfis=None, tipos=None):
+    """
+    Executa o OCR de todos os campos do modelo e retorna {campo: texto} na ordem do modelo.
+    O modo vem do argumento ou de EXTRATOR_MODO_OCR (padrão: "campo").
+    perfis: {campo: perfil de pré-processamento} declarados no modelo (os demais usam o padrão).
+    tipos: {campo: configuração de tipo} declarados no modelo (Modelo.tipos).
+    Sem backend, usa o pytesseract diretamente (comportamento original).
+    """
+    pagina = PaginaPreprocessada.garantir(pagina)
+    perfis = perfis or {}
+    modo_ocr = (modo_ocr or Configuracao.obter("MODO_OCR", "campo")).lower()
+    if modo_ocr not in UtilsServices.MODOS_OCR:
+        raise ValueError(f"Modo de OCR desconhecido: '{modo_ocr}'. Modos suportados: {list(UtilsServices.MODOS_OCR)}")
+
+    if modo_ocr == "campo":
+        return UtilsServices.ocr_por_campo(pagina, regioes, backend, perfis, tipos)
+    if modo_ocr == "lote":
+        return UtilsServices.ocr_lote(pagina, regioes, backend, perfis, tipos)
+    if modo_ocr == "pagina":
+        return UtilsServices.ocr_pagina(pagina, regioes, backend)
+
+    inicio = time.perf_counter()
+    dados_campo = UtilsServices.ocr_por_campo(pagina, regioes, backend, perfis, tipos)
+    tempo_campo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    dados_pagina = UtilsServices.ocr_pagina(pagina, regioes, backend)
+    tempo_pagina = time.perf_counter() - inicio
+
+    divergencias = {
+        campo: {"campo": dados_campo[campo], "pagina": dados_pagina.get(campo, "")}
+        for campo in dados_campo
+        if dados_campo[campo] != dados_pagina.get(campo, "")
+    }
+    dados_campo["_comparacao_ocr"] = {
+        "tempo_campo_s": round(tempo_campo, 3),
+        "tempo_pagina_s": round(tempo_pagina, 3),
+        "campos_iguais": len(dados_campo) - len(divergencias),
+        "divergencias": divergencias
+    }
+    return dados_campo
+
+  @staticmethod
+  def extrair_campos_documento(regioes, obter_imagem, palavras=None, modo_ocr=None, backend=None, perfis=None,
+                               tipos=None, renderizar_regiao=None, obter_campos_qrcode=None):
+    """
+    Extrai os campos do modelo priorizando a camada de texto do PDF (palavras de CamadaTexto.palavras_pagina).
+    Os campos ausentes ou inválidos na camada de texto são procurados no QR code, se o modelo declara um
+    (obter_campos_qrcode(pendentes) -> {campo: valor}, ver CodigoQR.leitor); só o que sobrar vai para o OCR.
+    obter_imagem() -> (pagina, deslocamento) só é chamada se algum campo precisar de OCR. As regiões estão em
+    coordenadas da página inteira.
+    Retorna os campos na ordem do modelo e "_origem_campos" com "texto", "qrcode" ou "ocr" para cada campo.
+    Campos com validador (tipos) saem normalizados e ganham uma entrada em "_validacao_campos" (True/False).
+    Modo em camadas: se a página veio abaixo de 300 dpi (EXTRATOR_DPI_INICIAL), os campos vazios ou inválidos
+    são renderizados de novo por renderizar_regiao(coords, dpi) -> (imagem, deslocamento) e relidos;
+    "_escalonamento_dpi" informa quais campos precisaram da segunda passada.
+    """
+    tipos = tipos or {}
+    dados_texto = {}
+    if palavras:
+        with Cronometro.etapa("camada_texto"):
+            for campo, coords in regioes.items():
+                texto = CamadaTexto.texto_regiao(palavras, coords)
+                if not CamadaTexto.texto_valido(texto):
+                    continue
+                # Texto da camada que não passa no validador do campo vai para o OCR
+                texto, valido = TiposCampo.validar(texto, tipos.get(campo))
+                if valido:
+                    dados_texto[campo] = texto
+
+    dados_qrcode = {}
+    pendentes = [campo for campo in regioes if campo not in dados_texto]
+    if obter_campos_qrcode is not None and pendentes:
+        for campo, texto in obter_campos_qrcode(pendentes).items():
+            if campo not in pendentes:
+                continue
+            texto, valido = TiposCampo.validar(texto, tipos.get(campo))
+            if valido:
+                dados_qrcode[campo] = texto
+
+    pendentes = {campo: coords for campo, coords in regioes.items() if campo not in dados_texto and campo not in dados_qrcode}
+    dados_ocr = {}
+    escalonamento = None
+    if pendentes:
+        pagina, deslocamento = obter_imagem()
+        pagina = PaginaPreprocessada.garantir(pagina)
+        regioes_imagem = UtilsServices.transladar_regioes(pendentes, deslocamento, pagina.dpi)
+        with Cronometro.etapa("ocr_campos"):
+            dados_ocr = UtilsServices.extrair_campos(pagina, regioes_imagem, modo_ocr=modo_ocr, backend=backend,
+                                                     perfis=perfis, tipos=tipos)
+
+        if renderizar_regiao is not None and pagina.dpi < Rasterizador.dpi_escalonamento():
+            escalonamento = {
+                "dpi_inicial": pagina.dpi,
+                "dpi_escalonamento": Rasterizador.dpi_escalonamento(),
+                "campos": UtilsServices.escalonar_campos(dados_ocr, pendentes, renderizar_regiao, backend, perfis, tipos)
+            }
+
+    dados_extraidos = {}
+    origem_campos = {}
+    validacao_campos = {}
+    for campo in regioes:
+        if campo in dados_texto:
+            dados_extraidos[campo] = dados_texto[campo]
+            origem_campos[campo] = "texto"
+        elif campo in dados_qrcode:
+            dados_extraidos[campo] = dados_qrcode[campo]
+            origem_campos[campo] = "qrcode"
+        else:
+            dados_extraidos[campo] = dados_ocr.get(campo, "")
+            origem_campos[campo] = "ocr"
+        if tipos.get(campo, {}).get("validador"):
+            dados_extraidos[campo], validacao_campos[campo] = TiposCampo.validar(dados_extraidos[campo], tipos[campo])
+
+    # Informações extras do OCR (ex.: "_comparacao_ocr")
+    for chave, valor in dados_ocr.items():
+        if chave not in dados_extraidos:
+            dados_extraidos[chave] = valor
+
+    dados_extraidos["_origem_campos"] = origem_campos
+    if validacao_campos:
+        dados_extraidos["_validacao_campos"] = validacao_campos
+    if escalonamento is not None:
+        dados_extraidos["_escalonamento_dpi"] = escalonamento
+    return dados_extraidos
+
+  @staticmethod
+  def escalonar_campos(dados_ocr, regioes, renderizar_regiao, backend=None, perfis=None, tipos=None):
+    """
+    Segunda passada do modo em camadas: renderiza de novo, em EXTRATOR_DPI_ESCALONAMENTO e recortado na caixa,
+    cada campo que voltou vazio ou reprovado no validador, e refaz o OCR só dele (dados_ocr é atualizado).
+    Retorna a lista dos campos escalonados.
+    """
+    perfis = perfis or {}
+    tipos = tipos or {}
+    dpi = Rasterizador.dpi_escalonamento()
+    escalonados = [campo for campo in regioes
+                   if not dados_ocr.get(campo) or not TiposCampo.validar(dados_ocr[campo], tipos.get(campo))[1]]
+
+    with Cronometro.etapa("escalonamento_dpi"):
+        for campo in escalonados:
+            imagem, deslocamento = renderizar_regiao(regioes[campo], dpi)
+            coords = UtilsServices.transladar_regioes({campo: regioes[campo]}, deslocamento, dpi)[campo]
+            texto = UtilsServices.ocr_regiao(PaginaPreprocessada(imagem, dpi=dpi), coords, backend,
+                                             perfis.get(campo), tipos.get(campo))
+            if texto:
+                dados_ocr[campo] = texto
+    return escalonados
+
+  @staticmethod
+  def threads_ocr():
+    """Threads para o OCR dos campos de um documento (EXTRATOR_THREADS_OCR; 0 = número de CPUs, padrão: 1)."""
+    threads = Configuracao.obter_int("THREADS_OCR", 1)
+    if threads <= 0:
+        threads = os.cpu_count() or 1
+    return threads
+
+  @staticmethod
+  def threads_paginas(total_paginas):
+    """Threads para as páginas de um PDF com vários documentos (EXTRATOR_THREADS_PAGINAS; 0 = automático, padrão)."""
+    threads = Configuracao.obter_int("THREADS_PAGINAS", 0)
+    if threads <= 0:
+        threads = os.cpu_count() or 1
+    return max(1, min(threads, total_paginas))
+
+  @staticmethod
+  def processar_paginas(total_paginas, processar_pagina, descricao, concorrente=True):
+    """
+    Processa cada página do PDF como um documento independente (pilha de CNHs/CRLVs escaneadas juntas).
+    processar_pagina(indice) retorna os dados da página ou lança ValueError quando ela não é do tipo esperado.
+
+    PDF de uma página: retorna o resultado da página, no mesmo formato de sempre.
+    Várias páginas: as páginas rodam em paralelo (rasterização e OCR; o PyMuPDF de cada thread roda em um
+    processo auxiliar, ver Rasterizador.paralela) e o retorno é
+      {"status", "mensagem", "total_paginas", "documentos": [{"pagina": 1, ...}], "paginas_ignoradas": [{"pagina", "mensagem"}]}
+    Se nenhuma página for reconhecida, lança ValueError com o motivo de cada uma.
+    """
+    if total_paginas <= 1:
+        return processar_pagina(0)
+
+    def executar(indice):
+        try:
+            return processar_pagina(indice), None
+        except ValueError as e:
+            return None, e
+
+    @Limites.propagar
+    def executar_em_thread(indice):
+        # Cada thread coleta as próprias etapas; a soma é feita na thread do documento.
+        # O prazo do documento (Limites) vale também para as páginas processadas em paralelo.
+        with Cronometro.coletar() as etapas, Rasterizador.paralela():
+            dados, erro = executar(indice)
+        return dados, erro, etapas
+
+    threads = UtilsServices.threads_paginas(total_paginas) if concorrente else 1
+    if threads <= 1:
+        resultados = [executar(indice) + ({},) for indice in range(total_paginas)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pagina") as pool:
+            resultados = list(pool.map(executar_em_thread, range(total_paginas)))
+
+    documentos, ignoradas = [], []
+    for indice, (dados, erro, etapas) in enumerate(resultados):
+        for nome, segundos in etapas.items():
+            Cronometro.adicionar(nome, segundos)
+        if erro is not None:
+            ignoradas.append({"pagina": indice + 1, "mensagem": str(erro)})
+        else:
+            documentos.append({"pagina": indice + 1, **dados})
+
+    if not documentos:
+        motivos = "; ".join(f"página {p['pagina']}: {p['mensagem']}" for p in ignoradas)
+        raise ValueError(f"Nenhuma página do PDF foi reconhecida como {descricao}. {motivos}")
+
+    return {
+        "status": "sucesso",
+        "mensagem": f"{len(documentos)} documento(s) {descricao} extraído(s) de {total_paginas} página(s).",
+        "total_paginas": total_paginas,
+        "documentos": documentos,
+        "paginas_ignoradas": ignoradas
+    }
+
+  @staticmethod
+  def ocr_por_campo(pagina, regioes, backend=None, perfis=None, tipos=None):
+    """
+    Um OCR por campo (uma chamada ao Tesseract por região).
+    Com EXTRATOR_THREADS_OCR > 1 os campos são reconhecidos em paralelo; o resultado mantém a ordem do modelo.
+    """
+    pagina = PaginaPreprocessada.garantir(pagina)
+    perfis = perfis or {}
+    tipos = tipos or {}
+    threads = min(UtilsServices.threads_ocr(), len(regioes))
+
+    @Limites.propagar
+    def reconhecer(item):
+        campo, coords = item
+        inicio = time.perf_counter()
+        texto = UtilsServices.ocr_regiao(pagina, coords, backend, perfis.get(campo), tipos.get(campo))
+        return texto, time.perf_counter() - inicio
+
+    # Backends que já paralelizam internamente (ex.: EasyOCR) seguem um campo por vez
+    if threads <= 1 or not getattr(backend, "concorrente", True):
+        resultados = [reconhecer(item) for item in regioes.items()]
+    else:
+        # Cada Tesseract usa uma única thread do OpenMP (OMP_THREAD_LIMIT, definido na partida por
+        # main.py, worker e lote); o paralelismo fica por conta do pool.
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ocr-campo") as pool:
+            # map devolve na ordem de entrada, independente de qual campo terminar primeiro
+            resultados = list(pool.map(reconhecer, regioes.items()))
+
+    dados_extraidos = {}
+    for campo, (texto, segundos) in zip(regioes, resultados):
+        dados_extraidos[campo] = texto
+        # Registrado aqui, na thread do documento, onde o Cronometro está coletando
+        Cronometro.adicionar(Cronometro.PREFIXO_CAMPO + campo, segundos)
+    return dados_extraidos
+
+  @staticmethod
+  def ocr_lote(pagina, regioes, backend, perfis=None, tipos=None):
+    """Pré-processa todos os recortes e os envia ao backend em uma única chamada reconhecer_lote."""
+    if backend is None:
+        raise ValueError("O modo de OCR 'lote' requer um backend de OCR.")
+    perfis = perfis or {}
+    tipos = tipos or {}
+    campos = list(regioes.keys())
+    recortes = [pagina.recorte(regioes[campo], perfis.get(campo)) for campo in campos]
+    indices_validos = [i for i, recorte in enumerate(recortes) if recorte is not None]
+
+    textos = backend.reconhecer_lote([recortes[i] for i in indices_validos],
+                                     tipos=[tipos.get(campos[i]) for i in indices_validos])
+
+    dados_extraidos = {campo: "" for campo in campos}
+    for indice, texto in zip(indices_validos, textos):
+        dados_extraidos[campos[indice]] = texto
+    return dados_extraidos
+
+  @staticmethod
+  def ocr_pagina(pagina, regioes, backend=None):
+    """
+    Um único OCR (image_to_data) sobre a união das regiões do modelo.
+    Cada palavra reconhecida vai para o campo cuja caixa cobre a maior parte dela.
+    """
+    dados_extraidos = {campo: "" for campo in regioes}
+    caixas = {campo: tuple(c) for campo, c in regioes.items() if c[0] < c[2] and c[1] < c[3]}
+    if not caixas:
+        return dados_extraidos
+
+    # --- União das regiões, limitada ao tamanho da imagem ---
+    altura, largura = pagina.shape[:2]
+    ux1 = max(0, min(c[0] for c in caixas.values()))
+    uy1 = max(0, min(c[1] for c in caixas.values()))
+    ux2 = min(largura, max(c[2] for c in caixas.values()))
+    uy2 = min(altura, max(c[3] for c in caixas.values()))
+    if ux1 >= ux2 or uy1 >= uy2:
+        return dados_extraidos
+
+    binarizada = pagina.recorte((ux1, uy1, ux2, uy2))
+    if backend is not None:
+        ocr = backend.reconhecer_com_caixas(binarizada)
+    else:
+        ocr = Limites.chamar("ocr", pytesseract.image_to_data, binarizada, lang='por', output_type=pytesseract.Output.DICT)
+
+    palavras_por_campo = UtilsServices.atribuir_palavras(ocr, caixas, deslocamento=(ux1, uy1))
+    for campo, palavras in palavras_por_campo.items():
+        dados_extraidos[campo] = " ".join(palavras)
+    return dados_extraidos
+
+  @staticmethod
+  def atribuir_palavras(ocr, caixas, deslocamento=(0, 0), cobertura_minima=0.5):
+    """
+    Distribui as palavras de um resultado do image_to_data entre as caixas dos campos.
+    Uma palavra pertence ao campo que cobre a maior fração da sua área (mínimo de cobertura_minima).
+    Retorna {campo: [palavras na ordem de leitura do Tesseract]}.
+    """
+    dx, dy = deslocamento
+    palavras_por_campo = {campo: [] for campo in caixas}
+
+    for i, texto in enumerate(ocr["text"]):
+        texto = (texto or "").strip()
+        if not texto:
+            continue
+
+        px1 = ocr["left"][i] + dx
+        py1 = ocr["top"][i] + dy
+        px2 = px1 + ocr["width"][i]
+        py2 = py1 + ocr["height"][i]
+        area_palavra = max(1, (px2 - px1) * (py2 - py1))
+
+        melhor_campo, melhor_cobertura = None, 0.0
+        for campo, (x1, y1, x2, y2) in caixas.items():
+            largura_inter = min(px2, x2) - max(px1, x1)
+            altura_inter = min(py2, y2) - max(py1, y1)
+            if largura_inter <= 0 or altura_inter <= 0:
+                continue
+            cobertura = (largura_inter * altura_inter) / area_palavra
+            if cobertura > melhor_cobertura:
+                melhor_campo, melhor_cobertura = campo, cobertura
+
+        if melhor_campo is not None and melhor_cobertura >= cobertura_minima:
+            palavras_por_campo[melhor_campo].append(texto)
+
+    return palavras_por_campo
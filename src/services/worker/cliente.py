@@ -0,0 +1,45 @@
+import json
+import os
+import socket
+from src.utils.limites import Limites
+
+
+class ClienteWorker:
+  """
+  Cliente leve do modo worker. Não importa nada do OCR, para que a execução
+  única (main.py TIPO caminho.pdf) possa repassar o documento a um worker já aquecido.
+  """
+
+  TIMEOUT_CONEXAO = 2
+
+  @staticmethod
+  def processar(doc_type, caminho_pdf, porta, host="127.0.0.1", timeout=None):
+      """
+      Envia um documento ao worker e retorna o dicionário de dados.
+      Sem timeout, a resposta é esperada por até EXTRATOR_TEMPO_DOCUMENTO segundos (0 = sem limite).
+      Lança OSError se o worker não estiver acessível e socket.timeout se ele não responder a tempo.
+      """
+      if timeout is None:
+          timeout = Limites.tempo_documento() or None
+      requisicao = {"id": os.getpid(), "doc_type": doc_type, "path": os.path.abspath(caminho_pdf)}
+
+      with socket.create_connection((host, porta), timeout=ClienteWorker.TIMEOUT_CONEXAO) as conexao:
+          conexao.settimeout(timeout)
+          conexao.sendall((json.dumps(requisicao, ensure_ascii=False) + "\n").encode("utf-8"))
+          with conexao.makefile("r", encoding="utf-8") as leitor:
+              linha = leitor.readline()
+
+      if not linha:
+          raise ConnectionError("O worker encerrou a conexão sem responder.")
+      return json.loads(linha)["dados"]
+
+  @staticmethod
+  def tentar_processar(doc_type, caminho_pdf, porta, host="127.0.0.1", timeout=None):
+      """
+      Tenta processar pelo worker; retorna None se ele não estiver no ar, não responder dentro do timeout
+      ou devolver uma resposta inválida, para que o chamador processe localmente.
+      """
+      try:
+          return ClienteWorker.processar(doc_type, caminho_pdf, porta, host=host, timeout=timeout)
+      except (OSError, socket.timeout, ValueError, KeyError):
+          return None
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from src.utils.utils import Utils
+from src.services.processador.processador import Processador
+from src.services.cache.cache import CacheResultados
+from src.services.modelos.modelos import RegistroModelos
+from src.utils.metricas import Metricas
+
+
+class Worker:
+  """
+  Modo worker: um processo de longa duração que atende várias requisições
+  sem pagar a inicialização (imports do OpenCV/Tesseract, modelos JSON) a cada documento.
+
+  Protocolo (uma linha JSON por requisição e por resposta):
+    requisição: {"id": 1, "doc_type": "CNH", "path": "C:\\docs\\cnh.pdf", "output_path": "opcional"}
+    resposta:   {"id": 1, "dados": {...}}          # mesmo conteúdo gravado por Utils.write_json_output
+                {"id": 1, "dados": {...}, "output_path": "..."}  # se output_path foi informado
+    requisição com "saida": "sqlite" grava o resultado no banco (EXTRATOR_SAIDA_BANCO) e responde
+                {"id": 1, "dados": {...}, "resultado_id": 42}
+    sem "doc_type" (ou com "AUTO") o tipo é detectado e volta em dados["_doc_type_detectado"]
+  Comandos: {"comando": "ping"}, {"comando": "estatisticas_cache"}, {"comando": "recarregar_modelos"}
+  e {"comando": "encerrar"}.
+  Com EXTRATOR_METRICAS_ARQUIVO (ou --metricas), os histogramas de latência acumulados são regravados
+  no arquivo a cada documento.
+  """
+
+  PORTA_PADRAO = 47650
+
+  _armazenamento = None
+  # No socket cada conexão tem a sua thread, mas os documentos (e a recarga dos modelos) passam um por vez:
+  # o paralelismo fica com as threads de páginas/campos, e o banco de resultados não é compartilhado entre threads
+  _trava_documentos = threading.Lock()
+
+  @staticmethod
+  def armazenamento():
+      """Banco de resultados aberto uma única vez por worker (os documentos são atendidos um por vez)."""
+      if Worker._armazenamento is None:
+          from src.services.armazenamento.armazenamento import ArmazenamentoResultados
+          Worker._armazenamento = ArmazenamentoResultados(tamanho_lote=1)
+      return Worker._armazenamento
+
+  @staticmethod
+  def atender_requisicao(requisicao, base_path):
+      """Processa uma requisição já decodificada e retorna o dicionário de resposta."""
+      id_requisicao = requisicao.get("id") if isinstance(requisicao, dict) else None
+
+      if not isinstance(requisicao, dict):
+          return {"id": id_requisicao, "dados": Processador.dados_erro(ValueError("Requisição inválida: esperado um objeto JSON."))}
+
+      comando = requisicao.get("comando")
+      if comando == "ping":
+          return {"id": id_requisicao, "status": "ok", "pid": os.getpid()}
+      if comando == "estatisticas_cache":
+          return {"id": id_requisicao, "status": "ok", "cache": CacheResultados.estatisticas()}
+      if comando == "recarregar_modelos":
+          with Worker._trava_documentos:
+              RegistroModelos.recarregar(base_path)
+          return {"id": id_requisicao, "status": "ok", "modelos": RegistroModelos.nomes(base_path),
+                  "erros": RegistroModelos.erros(base_path)}
+      if comando == "encerrar":
+          return {"id": id_requisicao, "status": "encerrando"}
+      if comando is not None:
+          return {"id": id_requisicao, "dados": Processador.dados_erro(ValueError(f"Comando desconhecido: '{comando}'"))}
+
+      with Worker._trava_documentos:
+          return Worker._atender_documento(requisicao, id_requisicao, base_path)
+
+  @staticmethod
+  def _atender_documento(requisicao, id_requisicao, base_path):
+      dados = Processador.processar_seguro(requisicao.get("doc_type"), requisicao.get("path"), base_path)
+      resposta = {"id": id_requisicao, "dados": dados}
+      # Sem "doc_type" (ou "AUTO") o tipo é detectado pelo Processador
+      doc_type = dados.get("_doc_type_detectado", requisicao.get("doc_type"))
+
+      saida_s = None
+      output_path = requisicao.get("output_path")
+      if output_path:
+          inicio = time.perf_counter()
+          Utils.write_json_output(dados, output_path)
+          saida_s = time.perf_counter() - inicio
+          resposta["output_path"] = output_path
+
+      if requisicao.get("saida") == "sqlite":
+          inicio = time.perf_counter()
+          Worker.armazenamento().adicionar(doc_type, requisicao.get("path"), dados)
+          resposta["resultado_id"] = Worker.armazenamento().ultimo_id
+          saida_s = (saida_s or 0.0) + time.perf_counter() - inicio
+
+      if Metricas.arquivo():
+          Metricas.registrar(doc_type, dados, saida_s)
+
+      return resposta
+
+  @staticmethod
+  def atender_linha(linha, base_path):
+      """Decodifica uma linha JSON, processa e retorna (resposta, deve_encerrar)."""
+      try:
+          requisicao = json.loads(linha)
+      except json.JSONDecodeError as e:
+          return {"id": None, "dados": Processador.dados_erro(ValueError(f"JSON inválido na requisição: {e}"))}, False
+
+      resposta = Worker.atender_requisicao(requisicao, base_path)
+      return resposta, resposta.get("status") == "encerrando"
+
+  @staticmethod
+  def codificar(resposta):
+      return json.dumps(resposta, ensure_ascii=False) + "\n"
+
+  @staticmethod
+  def servir_stdio(base_path, entrada=None, saida=None):
+      """Atende requisições JSON-lines lidas da entrada padrão até EOF ou comando 'encerrar'."""
+      entrada = entrada or sys.stdin
+      saida = saida or sys.stdout
+
+      # A saída padrão fica reservada ao protocolo; qualquer print das bibliotecas vai para o stderr
+      sys.stdout = sys.stderr if sys.stderr is not None else open(os.devnull, "w")
+
+      for linha in entrada:
+          if not linha.strip():
+              continue
+          resposta, encerrar = Worker.atender_linha(linha, base_path)
+          saida.write(Worker.codificar(resposta))
+          saida.flush()
+          if encerrar:
+              break
+
+  @staticmethod
+  def servir_socket(base_path, host="127.0.0.1", porta=PORTA_PADRAO):
+      """
+      Atende requisições JSON-lines em um socket TCP local.
+      Cada conexão é atendida em uma thread e pode enviar várias requisições: uma conexão parada não bloqueia
+      as demais e "ping" responde mesmo com um documento em andamento. Os documentos são processados um por vez.
+      """
+      class _Handler(socketserver.StreamRequestHandler):
+          def handle(self):
+              for linha_bytes in self.rfile:
+                  linha = linha_bytes.decode("utf-8")
+                  if not linha.strip():
+                      continue
+                  resposta, encerrar = Worker.atender_linha(linha, base_path)
+                  self.wfile.write(Worker.codificar(resposta).encode("utf-8"))
+                  self.wfile.flush()
+                  if encerrar:
+                      # shutdown() precisa rodar fora da thread do serve_forever
+                      threading.Thread(target=self.server.shutdown, daemon=True).start()
+                      break
+
+      class _Servidor(socketserver.ThreadingTCPServer):
+          allow_reuse_address = True
+          daemon_threads = True
+
+      with _Servidor((host, porta), _Handler) as servidor:
+          servidor.serve_forever()
+
+  @staticmethod
+  def main(argv):
+      """Ponto de entrada do modo worker (main.py --worker ...)."""
+      parser = argparse.ArgumentParser(prog="main.py --worker", description="Modo worker do extrator de dados de PDF.")
+      parser.add_argument("--porta", type=int, default=None,
+                          help=f"Atende em um socket TCP local nesta porta (ex.: {Worker.PORTA_PADRAO}). Sem esta opção, usa stdin/stdout.")
+      parser.add_argument("--host", default="127.0.0.1", help="Endereço do socket (padrão: 127.0.0.1).")
+      parser.add_argument("--metricas", help="Arquivo de métricas acumuladas (.prom para Prometheus, senão JSON).")
+      args = parser.parse_args(argv)
+
+      if args.metricas:
+          os.environ["EXTRATOR_METRICAS_ARQUIVO"] = args.metricas
+
+      # PyMuPDF em processo auxiliar com timeout: um PDF que trava o MuPDF vira erro e o worker segue atendendo
+      os.environ.setdefault("EXTRATOR_RASTERIZACAO_ISOLADA", "1")
+      # Tesseract com uma thread do OpenMP; os pools de páginas e campos fazem o paralelismo
+      os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+      # EXTRATOR_MEMORIA_MAXIMA_MB: um documento que estoura a memória vira erro e o worker segue atendendo
+      from src.utils.limites import Limites
+      Limites.aplicar_limite_memoria()
+
+      base_path = Utils.get_base_path()
+      if args.porta:
+          Worker.servir_socket(base_path, host=args.host, porta=args.porta)
+      else:
+          Worker.servir_stdio(base_path)
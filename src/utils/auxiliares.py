@@ -0,0 +1,91 @@
+import multiprocessing
+import sys
+import threading
+from src.utils.limites import Limites
+
+
+def _atender(conexao):
+    """Laço de um processo auxiliar: recebe (funcao, args), executa e devolve (ok, resultado ou exceção)."""
+    # A saída padrão herdada pode ser o protocolo do worker; prints das bibliotecas vão para o stderr
+    sys.stdout = sys.stderr
+    while True:
+        try:
+            funcao, args = conexao.recv()
+        except EOFError:
+            return
+        try:
+            resposta = (True, funcao(*args))
+        except Exception as e:
+            # Falta de memória do OpenCV/MuPDF chega ao processo principal como MemoryError (ver Limites)
+            resposta = (False, MemoryError(str(e)) if Limites.falta_memoria(e) else e)
+        try:
+            conexao.send(resposta)
+        except Exception as e:
+            # Resposta que não pode ser serializada (ex.: exceções do MuPDF)
+            erro = e if resposta[0] else resposta[1]
+            conexao.send((False, RuntimeError(f"{type(erro).__name__}: {erro}")))
+
+
+class ProcessosAuxiliares:
+  """
+  Processos auxiliares persistentes para as chamadas ao PyMuPDF, que rodam dentro do processo e não têm timeout.
+  Cada chamada vai para um auxiliar livre (criado sob demanda) e espera no máximo o timeout de Limites.
+  Se o tempo acabar, o auxiliar é encerrado (o MuPDF travado morre com ele) e a chamada vira LimiteExcedido;
+  a próxima chamada recebe um auxiliar novo.
+
+  Usados pelas threads de páginas (Rasterizador.paralela), que assim renderizam ao mesmo tempo, e por
+  todas as chamadas no worker e no lote (EXTRATOR_RASTERIZACAO_ISOLADA, ligado por eles). Na execução única,
+  o vigia do main.py já encerra o processo travado.
+  """
+
+  _livres = []
+  _trava = threading.Lock()
+  _contexto = multiprocessing.get_context("spawn")
+
+  @staticmethod
+  def _obter():
+      with ProcessosAuxiliares._trava:
+          while ProcessosAuxiliares._livres:
+              auxiliar = ProcessosAuxiliares._livres.pop()
+              if auxiliar[0].is_alive():
+                  return auxiliar
+              auxiliar[1].close()
+      conexao, conexao_filho = ProcessosAuxiliares._contexto.Pipe()
+      processo = ProcessosAuxiliares._contexto.Process(target=_atender, args=(conexao_filho,), daemon=True,
+                                                       name="extrator-auxiliar")
+      processo.start()
+      conexao_filho.close()
+      return processo, conexao
+
+  @staticmethod
+  def _descartar(auxiliar):
+      processo, conexao = auxiliar
+      processo.kill()
+      processo.join(5)
+      conexao.close()
+
+  @staticmethod
+  def chamar(tipo, funcao, *args):
+      """
+      Executa funcao(*args) em um processo auxiliar, com o timeout de Limites.timeout(tipo).
+      funcao e args precisam ser serializáveis (funções de módulo ou métodos estáticos).
+      """
+      timeout = Limites.timeout(tipo)
+      auxiliar = ProcessosAuxiliares._obter()
+      processo, conexao = auxiliar
+      try:
+          conexao.send((funcao, args))
+          if not conexao.poll(timeout):
+              ProcessosAuxiliares._descartar(auxiliar)
+              raise Limites.tempo_esgotado(tipo, timeout)
+          ok, resultado = conexao.recv()
+      except (EOFError, OSError):
+          ProcessosAuxiliares._descartar(auxiliar)
+          raise RuntimeError(f"O processo auxiliar foi encerrado inesperadamente (código {processo.exitcode}) "
+                             f"na etapa '{Limites.etapa_atual()}'.")
+
+      with ProcessosAuxiliares._trava:
+          ProcessosAuxiliares._livres.append(auxiliar)
+      if not ok:
+          raise resultado
+      return resultado
@@ -0,0 +1,38 @@
+import os
+
+
+class Configuracao:
+  """
+  Centraliza a leitura das opções do extrator.
+  Todas as opções são lidas de variáveis de ambiente com o prefixo EXTRATOR_,
+  para que a aplicação Delphi, o modo worker e o modo lote compartilhem a mesma configuração.
+  """
+
+  PREFIXO = "EXTRATOR_"
+
+  @staticmethod
+  def obter(nome, padrao=None):
+      """Retorna o valor bruto da opção ou o padrão, se não estiver definida."""
+      valor = os.environ.get(Configuracao.PREFIXO + nome)
+      if valor is None or valor.strip() == "":
+          return padrao
+      return valor.strip()
+
+  @staticmethod
+  def obter_int(nome, padrao=0):
+      """Retorna a opção convertida para inteiro."""
+      valor = Configuracao.obter(nome)
+      if valor is None:
+          return padrao
+      try:
+          return int(valor)
+      except ValueError:
+          raise ValueError(f"Valor inválido para {Configuracao.PREFIXO}{nome}: '{valor}' (esperado um número inteiro).")
+
+  @staticmethod
+  def obter_bool(nome, padrao=False):
+      """Retorna a opção interpretada como verdadeiro/falso (1, true, sim, s, on)."""
+      valor = Configuracao.obter(nome)
+      if valor is None:
+          return padrao
+      return valor.lower() in ("1", "true", "sim", "s", "on", "yes")
@@ -0,0 +1,57 @@
+import threading
+import time
+from contextlib import contextmanager
+from src.utils.limites import Limites
+
+
+class Cronometro:
+  """
+  Tempo gasto em cada etapa do processamento de um documento (rasterização, OCR do cabeçalho, OCR dos campos...).
+  As etapas só são medidas dentro de um Cronometro.coletar(); fora dele, etapa() não faz nada.
+  A coleta é por thread: no OCR paralelo dos campos, o tempo de cada campo é somado pela thread do documento.
+
+      with Cronometro.coletar() as etapas:
+          Processador.processar(...)
+      # etapas -> {"rasterizacao": 0.41, "ocr_campos": 1.92, ...} (segundos)
+  """
+
+  # Prefixo das etapas por campo, ex.: "ocr_campo.nome" (OCR campo a campo)
+  PREFIXO_CAMPO = "ocr_campo."
+
+  _local = threading.local()
+
+  @staticmethod
+  @contextmanager
+  def coletar():
+      anteriores = getattr(Cronometro._local, "etapas", None)
+      etapas = {}
+      Cronometro._local.etapas = etapas
+      try:
+          yield etapas
+      finally:
+          Cronometro._local.etapas = anteriores
+          # Coletas aninhadas (ex.: benchmark com EXTRATOR_METRICAS=1) também somam na coleta externa
+          if anteriores is not None:
+              for nome, segundos in etapas.items():
+                  anteriores[nome] = anteriores.get(nome, 0.0) + segundos
+
+  @staticmethod
+  @contextmanager
+  def etapa(nome):
+      # A etapa em andamento é registrada mesmo sem coleta: os limites (Limites) informam onde o documento parou
+      with Limites.etapa(nome):
+          if getattr(Cronometro._local, "etapas", None) is None:
+              yield
+              return
+          inicio = time.perf_counter()
+          try:
+              yield
+          finally:
+              Cronometro.adicionar(nome, time.perf_counter() - inicio)
+
+  @staticmethod
+  def adicionar(nome, segundos):
+      """Soma segundos à etapa (etapas repetidas no mesmo documento se acumulam)."""
+      etapas = getattr(Cronometro._local, "etapas", None)
+      if etapas is not None:
+          etapas[nome] = etapas.get(nome, 0.0) + segundos
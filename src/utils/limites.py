@@ -0,0 +1,267 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from src.utils.configuracao import Configuracao
+
+
+class LimiteExcedido(RuntimeError):
+  """
+  Documento interrompido por um dos limites de Limites. Vira um resultado {"status": "erro"} com a etapa
+  em que o limite estourou e qual limite foi ("tempo_documento", "tempo_ocr", "paginas", "memoria", ...).
+  Não herda de ValueError: em PDFs com várias páginas, a página não é simplesmente ignorada.
+  """
+
+  def __init__(self, etapa, limite, mensagem):
+      super().__init__(mensagem)
+      self.etapa = etapa
+      self.limite = limite
+
+  def __reduce__(self):
+      # Atravessa processos (pool do lote, ProcessosAuxiliares) com a etapa e o limite
+      return LimiteExcedido, (self.etapa, self.limite, str(self))
+
+
+class Limites:
+  """
+  Orçamento de recursos de cada documento, para que um PDF corrompido ou gigante não trave a execução única
+  (a aplicação Delphi esperaria para sempre), um processo do lote ou o worker.
+
+  Configuração (variáveis de ambiente, 0 = sem limite):
+    EXTRATOR_TEMPO_DOCUMENTO=0            segundos para o documento inteiro
+    EXTRATOR_TEMPO_OCR=60                 segundos por chamada ao Tesseract
+    EXTRATOR_TEMPO_RASTERIZACAO=120       segundos por chamada ao Poppler (pdftoppm/pdfinfo)
+    EXTRATOR_MAX_PAGINAS=0                páginas de CNH/CRLV, verificado antes de rasterizar
+    EXTRATOR_MAX_MEGAPIXELS=200           área de uma renderização, verificada antes de rasterizar
+    EXTRATOR_MEMORIA_MAXIMA_MB=0          memória do processo (worker, processo do lote ou execução única)
+
+  Tesseract e Poppler recebem timeout = menor valor entre o limite da chamada e o que resta do documento,
+  e o subprocesso travado é encerrado pelo próprio pytesseract/pdf2image. O PyMuPDF roda no próprio processo:
+  no worker e no lote ele vai para ProcessosAuxiliares, que encerram o auxiliar travado; na execução única,
+  o vigia do main.py encerra o processo. O prazo do documento e o limite de memória também são conferidos
+  no início de cada etapa do Cronometro. A etapa em andamento é registrada por thread; as threads de páginas
+  e de campos herdam o prazo com propagar().
+  """
+
+  _local = threading.local()
+  # Última etapa iniciada por qualquer thread (informada pelo vigia, que roda em outra thread)
+  _ultima_etapa = None
+
+  # Folga do vigia da execução única além de EXTRATOR_TEMPO_DOCUMENTO (segundos)
+  FOLGA_VIGIA = 5
+
+  # --- Configuração ---
+
+  @staticmethod
+  def tempo_documento():
+      return Configuracao.obter_int("TEMPO_DOCUMENTO", 0)
+
+  @staticmethod
+  def tempo_chamada(tipo):
+      """Limite de uma chamada externa: tipo "ocr" (Tesseract) ou "rasterizacao" (Poppler)."""
+      padroes = {"ocr": 60, "rasterizacao": 120}
+      return Configuracao.obter_int("TEMPO_" + tipo.upper(), padroes[tipo])
+
+  @staticmethod
+  def max_paginas():
+      return Configuracao.obter_int("MAX_PAGINAS", 0)
+
+  @staticmethod
+  def max_megapixels():
+      return Configuracao.obter_int("MAX_MEGAPIXELS", 200)
+
+  @staticmethod
+  def memoria_maxima_mb():
+      return Configuracao.obter_int("MEMORIA_MAXIMA_MB", 0)
+
+  # --- Prazo do documento e etapa em andamento ---
+
+  @staticmethod
+  @contextmanager
+  def documento():
+      """
+      Abre o orçamento de um documento. Falta de memória dentro dele (falta_memoria) vira LimiteExcedido da etapa em andamento.
+      Documentos aninhados (ex.: tipo automático) mantêm o prazo do externo.
+      """
+      anterior = getattr(Limites._local, "prazo", None)
+      if anterior is None and Limites.tempo_documento() > 0:
+          Limites._local.prazo = time.monotonic() + Limites.tempo_documento()
+      try:
+          yield
+      except Exception as e:
+          if not Limites.falta_memoria(e):
+              raise
+          etapa = Limites.etapa_atual()
+          raise LimiteExcedido(etapa, "memoria", f"Memória insuficiente na etapa '{etapa}'.") from e
+      finally:
+          Limites._local.prazo = anterior
+
+  @staticmethod
+  def prazo():
+      return getattr(Limites._local, "prazo", None)
+
+  @staticmethod
+  def etapa_atual():
+      return getattr(Limites._local, "etapa", None) or "inicio"
+
+  @staticmethod
+  @contextmanager
+  def etapa(nome):
+      """Registra a etapa em andamento (usado pelo Cronometro.etapa) e confere prazo e memória na entrada."""
+      anterior = getattr(Limites._local, "etapa", None)
+      Limites._local.etapa = nome
+      Limites._ultima_etapa = nome
+      try:
+          Limites.verificar()
+          yield
+      except Exception as e:
+          if not Limites.falta_memoria(e):
+              raise
+          raise LimiteExcedido(nome, "memoria", f"Memória insuficiente na etapa '{nome}'.") from e
+      finally:
+          Limites._local.etapa = anterior
+
+  @staticmethod
+  def falta_memoria(erro):
+      """
+      Indica se a exceção é uma alocação recusada: MemoryError (Python/numpy), cv2.error -4 (StsNoMem)
+      ou falha de malloc do MuPDF, que é como o OpenCV e o PyMuPDF reagem ao EXTRATOR_MEMORIA_MAXIMA_MB.
+      """
+      if isinstance(erro, MemoryError):
+          return True
+      if type(erro).__module__.startswith("cv2") and getattr(erro, "code", None) == -4:
+          return True
+      return type(erro).__name__.startswith("FzError") and "malloc" in str(erro)
+
+  @staticmethod
+  def propagar(funcao):
+      """Envolve uma função executada em outra thread para que ela herde o prazo e a etapa de quem a criou."""
+      prazo, etapa = Limites.prazo(), getattr(Limites._local, "etapa", None)
+
+      def executar(*args, **kwargs):
+          anteriores = (getattr(Limites._local, "prazo", None), getattr(Limites._local, "etapa", None))
+          Limites._local.prazo, Limites._local.etapa = prazo, etapa
+          try:
+              return funcao(*args, **kwargs)
+          finally:
+              Limites._local.prazo, Limites._local.etapa = anteriores
+      return executar
+
+  @staticmethod
+  def verificar():
+      """Lança LimiteExcedido se o prazo do documento acabou ou o processo passou do limite de memória."""
+      prazo = Limites.prazo()
+      if prazo is not None and time.monotonic() >= prazo:
+          etapa = Limites.etapa_atual()
+          raise LimiteExcedido(etapa, "tempo_documento",
+                               f"Tempo limite do documento ({Limites.tempo_documento()} s) esgotado na etapa '{etapa}'.")
+
+      limite_mb = Limites.memoria_maxima_mb()
+      if limite_mb > 0:
+          memoria = Limites.memoria_atual_mb()
+          if memoria is not None and memoria > limite_mb:
+              etapa = Limites.etapa_atual()
+              raise LimiteExcedido(etapa, "memoria",
+                                   f"Memória do processo ({memoria:.0f} MB) acima do limite de {limite_mb} MB na etapa '{etapa}'.")
+
+  @staticmethod
+  def vigiar(ao_estourar):
+      """
+      Vigia da execução única: chamadas dentro do próprio processo (ex.: PyMuPDF) não têm timeout, então, se o
+      documento passar de EXTRATOR_TEMPO_DOCUMENTO + FOLGA_VIGIA, chama ao_estourar(etapa) em outra thread
+      (que grava o erro e encerra o processo). Retorna o timer (cancel() ao terminar) ou None sem limite.
+      """
+      if Limites.tempo_documento() <= 0:
+          return None
+      vigia = threading.Timer(Limites.tempo_documento() + Limites.FOLGA_VIGIA,
+                              lambda: ao_estourar(Limites._ultima_etapa or "inicio"))
+      vigia.daemon = True
+      vigia.start()
+      return vigia
+
+  # --- Chamadas externas (Tesseract, Poppler) ---
+
+  @staticmethod
+  def timeout(tipo):
+      """Timeout (s) da próxima chamada externa, ou None sem limite. Lança LimiteExcedido se o prazo já acabou."""
+      Limites.verificar()
+      limites = [valor for valor in (Limites.tempo_chamada(tipo),) if valor > 0]
+      prazo = Limites.prazo()
+      if prazo is not None:
+          limites.append(max(0.1, prazo - time.monotonic()))
+      return min(limites) if limites else None
+
+  @staticmethod
+  def chamar(tipo, funcao, *args, **kwargs):
+      """
+      Executa pytesseract/pdf2image com timeout. O subprocesso que passar do tempo é encerrado
+      pela biblioteca e a chamada vira LimiteExcedido com a etapa em andamento.
+      """
+      timeout = Limites.timeout(tipo)
+      if timeout is not None:
+          kwargs["timeout"] = timeout
+      try:
+          return funcao(*args, **kwargs)
+      except Exception as e:
+          # pytesseract: RuntimeError("Tesseract process timeout"); pdf2image: PDFPopplerTimeoutError
+          if timeout is None or not ("timeout" in str(e).lower() or type(e).__name__ == "PDFPopplerTimeoutError"):
+              raise
+          raise Limites.tempo_esgotado(tipo, timeout) from e
+
+  @staticmethod
+  def tempo_esgotado(tipo, timeout):
+      """LimiteExcedido de uma chamada externa que passou do timeout (do documento, se o prazo dele acabou)."""
+      etapa = Limites.etapa_atual()
+      prazo = Limites.prazo()
+      limite = "tempo_documento" if prazo is not None and time.monotonic() >= prazo else f"tempo_{tipo}"
+      return LimiteExcedido(etapa, limite, f"Tempo limite ({timeout:.1f} s) esgotado na etapa '{etapa}' ({tipo}).")
+
+  # --- Limites de tamanho ---
+
+  @staticmethod
+  def verificar_paginas(total_paginas):
+      maximo = Limites.max_paginas()
+      if maximo > 0 and total_paginas > maximo:
+          raise LimiteExcedido("contagem_paginas", "paginas",
+                               f"O PDF possui {total_paginas} páginas; o limite é {maximo} (EXTRATOR_MAX_PAGINAS).")
+
+  @staticmethod
+  def verificar_pixels(largura, altura):
+      """Confere a área da imagem que vai ser renderizada, antes de alocar a memória."""
+      maximo = Limites.max_megapixels()
+      megapixels = largura * altura / 1_000_000
+      if maximo > 0 and megapixels > maximo:
+          raise LimiteExcedido("rasterizacao", "pixels",
+                               f"A renderização teria {megapixels:.0f} megapixels; o limite é {maximo} (EXTRATOR_MAX_MEGAPIXELS).")
+
+  # --- Memória do processo ---
+
+  @staticmethod
+  def memoria_atual_mb():
+      """Memória residente atual do processo (None se a plataforma não informar)."""
+      try:
+          with open("/proc/self/statm") as f:
+              return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+      except (OSError, ValueError, AttributeError):
+          pass
+      from src.utils.metricas import Metricas
+      return Metricas.memoria_atual_mb()
+
+  @staticmethod
+  def aplicar_limite_memoria():
+      """
+      Limita o espaço de endereçamento do processo (POSIX) em EXTRATOR_MEMORIA_MAXIMA_MB: uma alocação gigante
+      falha (MemoryError no numpy, cv2.error -4 no OpenCV, malloc do MuPDF) e vira LimiteExcedido em vez de
+      derrubar a máquina (ver falta_memoria). No Windows vale só a conferência por etapa.
+      """
+      limite_mb = Limites.memoria_maxima_mb()
+      if limite_mb <= 0 or sys.platform == "win32":
+          return
+      try:
+          import resource
+          limite = limite_mb * 1024 * 1024
+          _, maximo = resource.getrlimit(resource.RLIMIT_AS)
+          resource.setrlimit(resource.RLIMIT_AS, (limite if maximo == resource.RLIM_INFINITY else min(limite, maximo), maximo))
+      except (ImportError, ValueError, OSError):
+          pass
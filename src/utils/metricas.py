@@ -0,0 +1,224 @@
+import json
+import os
+import sys
+import threading
+import time
+from src.utils.configuracao import Configuracao
+from src.utils.cronometro import Cronometro
+
+
+class Metricas:
+  """
+  Instrumentação do processamento em produção.
+
+  Por documento (EXTRATOR_METRICAS=1): bloco "_metrics" no resultado, com o tempo de cada etapa
+  medida pelo Cronometro, o tempo de cada campo no OCR campo a campo, CPU e memória de pico do processo:
+      {"total_s", "cpu_s", "memoria_pico_mb", "cache", "etapas_s": {...}, "campos_s": {...}}
+  "memoria_pico_mb" é o pico do processo desde que ele começou, não do documento: no worker e no lote
+  é o maior valor entre todos os documentos já processados por aquele processo.
+
+  Acumulado (modos worker e lote, EXTRATOR_METRICAS_ARQUIVO): histogramas de latência por tipo de documento,
+  por etapa e por campo, e a contagem de campos escalonados no modo em camadas, regravados no arquivo
+  a cada documento. Extensão .prom grava no formato texto do Prometheus; qualquer outra grava JSON.
+  """
+
+  # Limites superiores (segundos) dos baldes dos histogramas
+  LIMITES_S = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+  _histogramas = {}
+  _documentos = {}
+  # Modo em camadas (EXTRATOR_DPI_INICIAL): doc_type -> [campos lidos por OCR, campos escalonados]
+  _escalonamento = {}
+  _trava = threading.Lock()
+
+  @staticmethod
+  def habilitadas():
+      return Configuracao.obter_bool("METRICAS", False) or bool(Metricas.arquivo())
+
+  @staticmethod
+  def arquivo():
+      return Configuracao.obter("METRICAS_ARQUIVO")
+
+  @staticmethod
+  def memoria_pico_mb():
+      """
+      Pico de memória residente do processo desde o início (ru_maxrss / PeakWorkingSetSize), em MB.
+      O valor nunca diminui entre documentos. None se a plataforma não informar.
+      """
+      try:
+          import resource
+          pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+          # ru_maxrss vem em KB no Linux e em bytes no macOS
+          return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+      except ImportError:
+          pass
+      contadores = Metricas._contadores_windows()
+      return round(contadores.PeakWorkingSetSize / (1024 * 1024), 1) if contadores else None
+
+  @staticmethod
+  def memoria_atual_mb():
+      """Memória residente atual do processo no Windows (None nas demais plataformas; ver Limites)."""
+      contadores = Metricas._contadores_windows()
+      return round(contadores.WorkingSetSize / (1024 * 1024), 1) if contadores else None
+
+  @staticmethod
+  def _contadores_windows():
+      """PROCESS_MEMORY_COUNTERS do processo atual, ou None fora do Windows."""
+      try:
+          import ctypes
+          from ctypes import wintypes
+
+          class _Contadores(ctypes.Structure):
+              _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                          ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                          ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                          ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                          ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+          contadores = _Contadores()
+          contadores.cb = ctypes.sizeof(_Contadores)
+          processo = ctypes.windll.kernel32.GetCurrentProcess()
+          if ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+              return contadores
+      except (AttributeError, OSError):
+          pass
+      return None
+
+  @staticmethod
+  def montar(etapas, total_s, cpu_s, cache):
+      """Monta o bloco "_metrics" a partir das etapas coletadas pelo Cronometro."""
+      etapas_s, campos_s = {}, {}
+      for nome, segundos in etapas.items():
+          if nome.startswith(Cronometro.PREFIXO_CAMPO):
+              campos_s[nome[len(Cronometro.PREFIXO_CAMPO):]] = round(segundos, 4)
+          else:
+              etapas_s[nome] = round(segundos, 4)
+      return {
+          "total_s": round(total_s, 4),
+          "cpu_s": round(cpu_s, 4),
+          "memoria_pico_mb": Metricas.memoria_pico_mb(),
+          "cache": cache,
+          "etapas_s": etapas_s,
+          "campos_s": campos_s
+      }
+
+  # --- Acumulado (worker e lote) ---
+
+  @staticmethod
+  def _observar(nome, rotulos, segundos):
+      chave = (nome, tuple(sorted(rotulos.items())))
+      histograma = Metricas._histogramas.get(chave)
+      if histograma is None:
+          histograma = {"baldes": [0] * (len(Metricas.LIMITES_S) + 1), "soma": 0.0, "total": 0}
+          Metricas._histogramas[chave] = histograma
+      indice = next((i for i, limite in enumerate(Metricas.LIMITES_S) if segundos <= limite), len(Metricas.LIMITES_S))
+      histograma["baldes"][indice] += 1
+      histograma["soma"] += segundos
+      histograma["total"] += 1
+
+  @staticmethod
+  def registrar(doc_type, dados, saida_s=None):
+      """
+      Acumula as métricas de um documento (a partir do "_metrics" do resultado) e regrava o arquivo.
+      saida_s: tempo de gravação do JSON de saída, medido por quem gravou.
+      """
+      metricas = dados.get("_metrics") if isinstance(dados, dict) else None
+      doc_type = (doc_type or "").upper()
+      status = dados.get("status", "erro") if isinstance(dados, dict) else "erro"
+
+      with Metricas._trava:
+          chave = (doc_type, status)
+          Metricas._documentos[chave] = Metricas._documentos.get(chave, 0) + 1
+          if metricas:
+              Metricas._observar("extrator_documento_segundos", {"doc_type": doc_type}, metricas["total_s"])
+              etapas = dict(metricas.get("etapas_s", {}))
+              if saida_s is not None:
+                  etapas["saida"] = saida_s
+              for etapa, segundos in etapas.items():
+                  Metricas._observar("extrator_etapa_segundos", {"doc_type": doc_type, "etapa": etapa}, segundos)
+              for campo, segundos in metricas.get("campos_s", {}).items():
+                  Metricas._observar("extrator_campo_segundos", {"doc_type": doc_type, "campo": campo}, segundos)
+          if isinstance(dados, dict):
+              for documento in dados.get("documentos") or [dados]:
+                  escalonamento = documento.get("_escalonamento_dpi")
+                  if escalonamento:
+                      contagem = Metricas._escalonamento.setdefault(doc_type, [0, 0])
+                      contagem[0] += sum(1 for origem in documento.get("_origem_campos", {}).values() if origem == "ocr")
+                      contagem[1] += len(escalonamento["campos"])
+          conteudo = Metricas.formatar(Metricas.arquivo() or "")
+
+      if Metricas.arquivo():
+          Metricas.gravar(conteudo)
+
+  @staticmethod
+  def formatar(caminho):
+      """Conteúdo do arquivo acumulado: Prometheus para .prom, JSON para as demais extensões."""
+      if caminho.lower().endswith(".prom"):
+          return Metricas._formatar_prometheus()
+
+      histogramas = {}
+      for (nome, rotulos), h in sorted(Metricas._histogramas.items()):
+          histogramas.setdefault(nome, []).append({
+              "rotulos": dict(rotulos),
+              "baldes": {str(limite): contagem for limite, contagem in zip(list(Metricas.LIMITES_S) + ["+Inf"], h["baldes"])},
+              "soma_s": round(h["soma"], 4),
+              "total": h["total"]
+          })
+      return json.dumps({
+          "atualizado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+          "pid": os.getpid(),
+          "documentos": [{"doc_type": d, "status": s, "total": n} for (d, s), n in sorted(Metricas._documentos.items())],
+          "escalonamento_dpi": [{"doc_type": d, "campos_ocr": ocr, "campos_escalonados": escalonados}
+                                for d, (ocr, escalonados) in sorted(Metricas._escalonamento.items())],
+          "histogramas": histogramas
+      }, ensure_ascii=False, indent=4)
+
+  @staticmethod
+  def _formatar_prometheus():
+      def rotulos_texto(rotulos):
+          return ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in rotulos)
+
+      linhas = ["# HELP extrator_documentos_total Documentos processados por tipo e status.",
+                "# TYPE extrator_documentos_total counter"]
+      for (doc_type, status), total in sorted(Metricas._documentos.items()):
+          linhas.append(f'extrator_documentos_total{{doc_type="{doc_type}",status="{status}"}} {total}')
+
+      if Metricas._escalonamento:
+          linhas.append("# HELP extrator_campos_escalonados_total Campos relidos em alta resolução no modo em camadas.")
+          linhas.append("# TYPE extrator_campos_escalonados_total counter")
+          for doc_type, (_ocr, escalonados) in sorted(Metricas._escalonamento.items()):
+              linhas.append(f'extrator_campos_escalonados_total{{doc_type="{doc_type}"}} {escalonados}')
+          linhas.append("# HELP extrator_campos_ocr_total Campos lidos por OCR no modo em camadas.")
+          linhas.append("# TYPE extrator_campos_ocr_total counter")
+          for doc_type, (ocr, _escalonados) in sorted(Metricas._escalonamento.items()):
+              linhas.append(f'extrator_campos_ocr_total{{doc_type="{doc_type}"}} {ocr}')
+
+      descricoes = {
+          "extrator_documento_segundos": "Latência total por documento.",
+          "extrator_etapa_segundos": "Latência de cada etapa do processamento.",
+          "extrator_campo_segundos": "Latência do OCR de cada campo.",
+      }
+      for nome, descricao in descricoes.items():
+          series = sorted((r, h) for (n, r), h in Metricas._histogramas.items() if n == nome)
+          if not series:
+              continue
+          linhas.append(f"# HELP {nome} {descricao}")
+          linhas.append(f"# TYPE {nome} histogram")
+          for rotulos, h in series:
+              base = rotulos_texto(rotulos)
+              acumulado = 0
+              for limite, contagem in zip(list(Metricas.LIMITES_S) + ["+Inf"], h["baldes"]):
+                  acumulado += contagem
+                  linhas.append(f'{nome}_bucket{{{base},le="{limite}"}} {acumulado}')
+              linhas.append(f"{nome}_sum{{{base}}} {round(h['soma'], 6)}")
+              linhas.append(f"{nome}_count{{{base}}} {h['total']}")
+      return "\n".join(linhas) + "\n"
+
+  @staticmethod
+  def gravar(conteudo):
+      """Regrava o arquivo acumulado de forma atômica (leitores nunca veem um arquivo pela metade)."""
+      caminho = Metricas.arquivo()
+      temporario = f"{caminho}.{os.getpid()}.tmp"
+      with open(temporario, "w", encoding="utf-8") as f:
+          f.write(conteudo)
+      os.replace(temporario, caminho)
@@ -0,0 +1,59 @@
+import builtins
+import importlib.util
+import sys
+import time
+
+
+class TempoImportacao:
+  """
+  Relatório do tempo de importação dos módulos, no estilo do "python -X importtime",
+  mas embutido na aplicação (funciona também no executável do PyInstaller, onde -X não está disponível).
+  Mede os imports feitos por uma função; módulos já carregados não entram no relatório.
+  """
+
+  @staticmethod
+  def medir(funcao):
+      """
+      Executa funcao() medindo cada import novo.
+      Retorna (registros, total_s); registros: [(modulo, proprio_s, acumulado_s, nivel)] na ordem de término.
+      """
+      registros = []
+      pilha = []  # [modulo, inicio, tempo dos imports filhos]
+      importar_original = builtins.__import__
+
+      def importar(name, globals=None, locals=None, fromlist=(), level=0):
+          nome = name
+          if level:
+              pacote = (globals or {}).get("__package__") or ""
+              try:
+                  nome = importlib.util.resolve_name("." * level + name, pacote)
+              except (ImportError, ValueError):
+                  nome = name
+          if nome in sys.modules:
+              return importar_original(name, globals, locals, fromlist, level)
+
+          pilha.append([nome, time.perf_counter(), 0.0])
+          try:
+              return importar_original(name, globals, locals, fromlist, level)
+          finally:
+              modulo, inicio, filhos = pilha.pop()
+              acumulado = time.perf_counter() - inicio
+              if pilha:
+                  pilha[-1][2] += acumulado
+              registros.append((modulo, acumulado - filhos, acumulado, len(pilha)))
+
+      inicio = time.perf_counter()
+      builtins.__import__ = importar
+      try:
+          funcao()
+      finally:
+          builtins.__import__ = importar_original
+      return registros, time.perf_counter() - inicio
+
+  @staticmethod
+  def formatar(registros, limite=25):
+      """Tabela com os módulos mais caros (tempo acumulado), em microssegundos como no -X importtime."""
+      linhas = ["       próprio [us] |   acumulado [us] | módulo"]
+      for modulo, proprio, acumulado, nivel in sorted(registros, key=lambda r: r[2], reverse=True)[:limite]:
+          linhas.append(f"{int(proprio * 1e6):>19} | {int(acumulado * 1e6):>16} | {'  ' * nivel}{modulo}")
+      return "\n".join(linhas)
@@ -0,0 +1,92 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+from src.services.armazenamento.armazenamento import ArmazenamentoResultados
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CNH = {"status": "sucesso", "nome": "MARIA DA SILVA", "cpf": "529.982.247-25", "registro": "01234567890"}
+CRLV = {"status": "sucesso", "placa": "ABC-1D23", "cpf_cnpj_proprietario": "11.222.333/0001-81"}
+BUONNY = {"status": "sucesso", "mensagem": "Dados das tarifas extraídos com sucesso.",
+          "servicos": [{"data": "01/02/2024", "nome": "JOÃO", "rg": "123", "cavalo": "XYZ9A87", "valor": "R$ 10,00"}]}
+# PDF com várias CNHs: o CPF da segunda página só aparece em "documentos"
+CNH_PAGINAS = {"status": "sucesso", "documentos": [{"pagina": 1, "cpf": "111.444.777-35"},
+                                                   {"pagina": 2, "cpf": "529.982.247-25"}]}
+
+
+@pytest.fixture
+def banco(tmp_path):
+    caminho = str(tmp_path / "resultados.sqlite3")
+    with ArmazenamentoResultados(caminho, tamanho_lote=10) as armazenamento:
+        for doc_type, dados in (("cnh", CNH), ("CRLV", CRLV), ("TARIFAS_BUONNY", BUONNY), ("CNH", CNH_PAGINAS)):
+            armazenamento.adicionar(doc_type, None, dados)
+        # Nada é gravado antes de completar o lote ou de descarregar()
+        assert armazenamento.conexao.execute("SELECT COUNT(*) FROM resultados").fetchone()[0] == 0
+        assert armazenamento.descarregar() == [1, 2, 3, 4]
+    return caminho
+
+
+def exportar(banco, tmp_path, formato, *filtros):
+    saida = str(tmp_path / f"exportado.{formato}")
+    ArmazenamentoResultados.main(["--banco", banco, "--formato", formato, "--saida", saida, *filtros])
+    with open(saida, encoding="utf-8", newline="") as f:
+        if formato == "csv":
+            return [{**linha, "id": int(linha["id"]), "dados": json.loads(linha["dados"])} for linha in csv.DictReader(f)]
+        if formato == "json":
+            return json.load(f)
+        return [json.loads(linha) for linha in f]
+
+
+@pytest.mark.parametrize("formato", ["jsonl", "json", "csv"])
+def test_exportar_por_cpf(banco, tmp_path, formato):
+    registros = exportar(banco, tmp_path, formato, "--cpf", "52998224725")
+    assert [r["id"] for r in registros] == [1, 4]
+    assert registros[0]["doc_type"] == "CNH"
+    assert registros[0]["dados"] == CNH
+    assert registros[1]["dados"] == CNH_PAGINAS
+
+
+@pytest.mark.parametrize("formato", ["jsonl", "json", "csv"])
+def test_exportar_por_placa(banco, tmp_path, formato):
+    registros = exportar(banco, tmp_path, formato, "--placa", "abc1d23")
+    assert [(r["id"], r["doc_type"], r["dados"]) for r in registros] == [(2, "CRLV", CRLV)]
+
+
+def test_exportar_por_cavalo_dos_servicos(banco, tmp_path):
+    registros = exportar(banco, tmp_path, "jsonl", "--cavalo", "XYZ-9A87", "--tipo", "tarifas_buonny")
+    assert [r["dados"] for r in registros] == [BUONNY]
+
+
+def test_main_grava_no_sqlite_e_imprime_a_referencia(tmp_path):
+    pytest.importorskip("fitz")
+    from src.services.benchmark.gerador_sintetico import GeradorSintetico
+    from src.services.cache.cache import CacheResultados
+    from src.services.tarifas_buonny.tar_buonny import TarifasBuonny
+
+    pdf = str(tmp_path / "buonny.pdf")
+    GeradorSintetico(BASE_PATH).gerar_buonny(pdf, paginas=2, linhas_por_pagina=3)
+    banco = str(tmp_path / "saida.sqlite3")
+    ambiente = {**os.environ, "EXTRATOR_SAIDA": "sqlite", "EXTRATOR_SAIDA_BANCO": banco}
+
+    # Sucesso: a saída é "sqlite:<banco>#<id>" em vez do caminho do JSON
+    for id_esperado in (1, 2):
+        saida = subprocess.run([sys.executable, "main.py", "TARIFAS_BUONNY", pdf], cwd=BASE_PATH, env=ambiente,
+                               capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+        assert saida == f"sqlite:{banco}#{id_esperado}"
+
+    with ArmazenamentoResultados(banco) as armazenamento:
+        registro = next(armazenamento.consultar({"hash_pdf": CacheResultados.hash_arquivo(pdf)}))
+    assert registro["doc_type"] == "TARIFAS_BUONNY"
+    assert registro["dados"] == TarifasBuonny.ExtrairTarifasPDF(pdf, BASE_PATH)
+
+    # Erro: continua indo para o JSON temporário
+    saida = subprocess.run([sys.executable, "main.py", "TARIFAS_BUONNY", str(tmp_path / "inexistente.pdf")],
+                           cwd=BASE_PATH, env=ambiente, capture_output=True, text=True).stdout.strip().splitlines()[-1]
+    assert not saida.startswith("sqlite:")
+    with open(saida, encoding="utf-8") as f:
+        assert json.load(f)["status"] == "erro"
+    os.remove(saida)
@@ -0,0 +1,26 @@
+import os
+import pytest
+
+pytest.importorskip("fitz")
+
+from src.services.benchmark.benchmark import Benchmark
+from src.services.benchmark.gerador_sintetico import GeradorSintetico
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_documentos_com_erro_ficam_fora_da_vazao(tmp_path):
+    valido = str(tmp_path / "buonny.pdf")
+    gabarito = GeradorSintetico(BASE_PATH).gerar_buonny(valido, paginas=1, linhas_por_pagina=5)
+    corrompido = tmp_path / "corrompido.pdf"
+    corrompido.write_bytes(b"isto nao e um PDF")
+
+    conjunto = [("TARIFAS_BUONNY", valido, gabarito), ("TARIFAS_BUONNY", str(corrompido), gabarito)]
+    resultado = Benchmark.executar(conjunto, BASE_PATH, str(tmp_path))["TARIFAS_BUONNY"]
+
+    assert resultado["documentos"] == 2
+    assert resultado["sucessos"] == 1
+    assert resultado["erros"] == 1
+    # Tempos por etapa são médias só dos sucessos
+    assert resultado["etapas_s"]["total"] > 0
+    assert resultado["documentos_por_segundo"] == pytest.approx(1 / resultado["etapas_s"]["total"], rel=0.01)
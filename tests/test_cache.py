@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+
+from src.services.cache.cache import CacheResultados
+from src.services.modelos.modelos import RegistroModelos
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_impressoes_diferentes_convivem_no_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("EXTRATOR_CACHE_CAMINHO", str(tmp_path / "cache.sqlite3"))
+    pdf = tmp_path / "documento.pdf"
+    pdf.write_bytes(b"%PDF-1.4 conteudo")
+    base_path = str(tmp_path)
+
+    # Dois processos com opções diferentes (ex.: worker com EXTRATOR_MODO_OCR=pagina) sobre o mesmo arquivo
+    identificacoes = {}
+    for modo in ("campo", "pagina"):
+        monkeypatch.setenv("EXTRATOR_MODO_OCR", modo)
+        dados, identificacoes[modo] = CacheResultados.obter("CNH", str(pdf), base_path)
+        assert dados is None
+        CacheResultados.gravar("CNH", identificacoes[modo], {"status": "sucesso", "modo": modo})
+
+    for modo in ("campo", "pagina"):
+        monkeypatch.setenv("EXTRATOR_MODO_OCR", modo)
+        dados, _ = CacheResultados.obter("CNH", str(pdf), base_path)
+        assert dados == {"status": "sucesso", "modo": modo}
+    assert CacheResultados.estatisticas()["entradas"] == 2
+
+
+def copiar_modelos(tmp_path):
+    base_path = str(tmp_path / "base")
+    shutil.copytree(os.path.join(BASE_PATH, "data"), os.path.join(base_path, "data"))
+    return base_path
+
+
+def test_impressao_da_cnh_inclui_modelos_de_crlv(tmp_path):
+    # O classificador de layout da CNH compara a página também com as referências de coord_crlv
+    base_path = copiar_modelos(tmp_path)
+    RegistroModelos.recarregar(base_path)
+    antes = CacheResultados.impressao_modelos("CNH", base_path)
+
+    caminho = os.path.join(base_path, "data", "coord_crlv.json")
+    with open(caminho, encoding="utf-8") as f:
+        modelo = json.load(f)
+    modelo["_impressoes"] = [[0.5] * 8]
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(modelo, f)
+    RegistroModelos.recarregar(base_path)
+
+    assert CacheResultados.impressao_modelos("CNH", base_path) != antes
+
+
+def test_impressao_inclui_recorte_da_rasterizacao(monkeypatch, tmp_path):
+    base_path = copiar_modelos(tmp_path)
+    monkeypatch.delenv("EXTRATOR_RASTER_RECORTE", raising=False)
+    antes = CacheResultados.impressao_modelos("CRLV", base_path)
+    monkeypatch.setenv("EXTRATOR_RASTER_RECORTE", "0")
+    assert CacheResultados.impressao_modelos("CRLV", base_path) != antes
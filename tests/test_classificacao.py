@@ -0,0 +1,24 @@
+import os
+from src.services.classificacao.classificacao import ClassificadorPalavrasChave
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELOS_CNH = ["coord_cnh_antiga", "coord_cnh_digital", "coord_cnh_estadual", "coord_cnh_nacional"]
+
+
+def modelo(texto):
+    resultado = ClassificadorPalavrasChave.classificar(texto, BASE_PATH, MODELOS_CNH)
+    return resultado and resultado["modelo"]
+
+
+def test_termo_curto_nao_casa_dentro_de_palavra_acentuada():
+    # "LICENÇA" vira "LICENCA" sem acentos; o "NC" do meio da palavra não identifica a CNH Digital
+    assert modelo("REPÚBLICA FEDERATIVA DO BRASIL CNH Digital Licença para conduzir") == "coord_cnh_antiga"
+
+
+def test_termo_curto_como_palavra_inteira():
+    assert modelo("CNH DIGITAL NC 0123456789") == "coord_cnh_digital"
+    assert modelo("CNH Digital - NC: 0123456789") == "coord_cnh_digital"
+
+
+def test_normalizar_remove_acentos_e_pontuacao():
+    assert ClassificadorPalavrasChave.normalizar("Habilitação, Licença!") == "HABILITACAO LICENCA"
@@ -0,0 +1,100 @@
+import os
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from src.services.codigo_qr.codigo_qr import CodigoQR
+from src.services.modelos.modelos import RegistroModelos
+from src.services.rasterizacao.rasterizacao import Rasterizador
+from src.services.preprocessamento.preprocessamento import PaginaPreprocessada
+from src.services.utils.utils_services import UtilsServices
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Formato de URL de validação com os dados do veículo nos parâmetros (e na rota, depois do "#")
+PAYLOAD_URL = ("https://portalservicos.senatran.serpro.gov.br/#/veiculos/validar-crlve"
+               "?placa=ABC1D23&renavam=01234567890&chassi=9BWZZZ377VT004251&exercicio=2024")
+# Conteúdo assinado/opaco, sem nenhum campo legível
+PAYLOAD_OPACO = "eyJhbGciOiJSUzI1NiJ9.H4sIAAAAAAAAAKtWSs7PLShKLS5OTVGyUlAqLU4tUtJRSixKTc"
+
+
+def pagina_com_qrcode(payload, regiao):
+    """Página A4 a 300 dpi em branco com o QR code desenhado dentro da região do modelo."""
+    pagina = np.full((3508, 2480), 255, dtype=np.uint8)
+    codigo = cv2.QRCodeEncoder.create().encode(payload)
+    codigo = cv2.resize(codigo, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+    x, y = regiao[0] + 20, regiao[1] + 20
+    pagina[y:y + codigo.shape[0], x:x + codigo.shape[1]] = codigo
+    return PaginaPreprocessada(pagina)
+
+
+class ContadorImagem:
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        return self.pagina, (0, 0)
+
+
+class BackendFalso:
+    nome = "falso"
+    concorrente = True
+
+    def __init__(self):
+        self.campos = 0
+
+    def reconhecer(self, imagem, tipo=None):
+        self.campos += 1
+        return "OCR"
+
+
+def test_interpretar_url_de_validacao():
+    valores = CodigoQR.interpretar(PAYLOAD_URL)
+    assert valores["placa"] == "ABC1D23"
+    assert valores["renavam"] == "01234567890"
+
+
+def test_campos_do_qrcode_dispensam_o_ocr(monkeypatch):
+    # O QR code é lido da página já renderizada para o OCR, sem outra renderização
+    monkeypatch.setattr(Rasterizador, "renderizar", staticmethod(lambda *a, **k: pytest.fail("renderização extra")))
+    modelo = RegistroModelos.obter("coord_crlv", BASE_PATH)
+    imagem = ContadorImagem(pagina_com_qrcode(PAYLOAD_URL, modelo.metadados["_qrcode"]["regiao"]))
+    backend = BackendFalso()
+
+    dados = UtilsServices.extrair_campos_documento(modelo.regioes, imagem, modo_ocr="campo", backend=backend,
+                                                   tipos=modelo.tipos, obter_campos_qrcode=CodigoQR.leitor(modelo, imagem))
+
+    assert dados["placa"] == "ABC1D23"
+    assert dados["renavan"] == "01234567890"
+    assert dados["chassi"] == "9BWZZZ377VT004251"
+    assert {campo for campo, origem in dados["_origem_campos"].items() if origem == "qrcode"} == \
+        {"placa", "renavan", "chassi", "exercicio"}
+    assert backend.campos == len(modelo.regioes) - 4
+
+
+def test_conteudo_opaco_cai_no_ocr():
+    modelo = RegistroModelos.obter("coord_crlv", BASE_PATH)
+    imagem = ContadorImagem(pagina_com_qrcode(PAYLOAD_OPACO, modelo.metadados["_qrcode"]["regiao"]))
+    backend = BackendFalso()
+
+    dados = UtilsServices.extrair_campos_documento(modelo.regioes, imagem, modo_ocr="campo", backend=backend,
+                                                   obter_campos_qrcode=CodigoQR.leitor(modelo, imagem))
+
+    assert set(dados["_origem_campos"].values()) == {"ocr"}
+    assert backend.campos == len(modelo.regioes)
+
+
+def test_sem_campo_pendente_no_mapeamento_nao_decodifica():
+    modelo = RegistroModelos.obter("coord_crlv", BASE_PATH)
+    imagem = ContadorImagem(None)
+    ler = CodigoQR.leitor(modelo, imagem)
+    assert ler(["nome_proprietario", "cor"]) == {}
+    assert imagem.chamadas == 0
+
+
+def test_desligado_por_configuracao(monkeypatch):
+    monkeypatch.setenv("EXTRATOR_QRCODE", "0")
+    assert CodigoQR.leitor(RegistroModelos.obter("coord_crlv", BASE_PATH), None) is None
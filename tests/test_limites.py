@@ -0,0 +1,74 @@
+import subprocess
+import sys
+import textwrap
+import time
+import pytest
+from src.utils.limites import Limites, LimiteExcedido
+from src.utils.auxiliares import ProcessosAuxiliares
+
+
+def test_auxiliar_travado_vira_limite_excedido(monkeypatch):
+    monkeypatch.setenv("EXTRATOR_TEMPO_RASTERIZACAO", "2")
+    inicio = time.monotonic()
+    with pytest.raises(LimiteExcedido) as erro:
+        with Limites.etapa("rasterizacao"):
+            ProcessosAuxiliares.chamar("rasterizacao", time.sleep, 60)
+    assert time.monotonic() - inicio < 20
+    assert erro.value.etapa == "rasterizacao"
+    assert erro.value.limite == "tempo_rasterizacao"
+    # O auxiliar travado foi encerrado; a próxima chamada recebe um novo
+    assert ProcessosAuxiliares.chamar("rasterizacao", abs, -3) == 3
+
+
+def test_auxiliar_devolve_excecao_da_chamada():
+    with pytest.raises(ValueError):
+        ProcessosAuxiliares.chamar("rasterizacao", int, "x")
+
+
+def test_limite_excedido_atravessa_processos():
+    import pickle
+    erro = pickle.loads(pickle.dumps(LimiteExcedido("ocr_campos", "tempo_ocr", "mensagem")))
+    assert (erro.etapa, erro.limite, str(erro)) == ("ocr_campos", "tempo_ocr", "mensagem")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="RLIMIT_AS só existe em POSIX")
+@pytest.mark.parametrize("alocacao", ["numpy", "opencv", "pymupdf", "pymupdf_isolado"])
+def test_limite_de_memoria_vira_limite_excedido(alocacao):
+    """Com EXTRATOR_MEMORIA_MAXIMA_MB, alocações gigantes viram LimiteExcedido (e o processo segue vivo)."""
+    pytest.importorskip("cv2")
+    pytest.importorskip("fitz")
+    codigo = textwrap.dedent(f"""
+        import os, sys
+        import numpy as np, cv2, fitz
+        from src.utils.limites import Limites, LimiteExcedido
+        from src.services.rasterizacao.rasterizacao import Rasterizador
+
+        with open("/proc/self/status") as f:
+            vm = next(int(l.split()[1]) for l in f if l.startswith("VmSize")) // 1024
+        os.environ["EXTRATOR_MEMORIA_MAXIMA_MB"] = str(vm + 300)
+        os.environ["EXTRATOR_MAX_MEGAPIXELS"] = "0"
+        Limites.aplicar_limite_memoria()
+
+        alocacao = "{alocacao}"
+        caminho = os.path.join(sys.argv[1], "grande.pdf")
+        documento = fitz.open()
+        documento.new_page(width=4800, height=4800).insert_text((72, 72), "x")
+        documento.save(caminho)
+        try:
+            with Limites.documento(), Limites.etapa("rasterizacao"):
+                if alocacao == "numpy":
+                    np.ones((40000, 40000), dtype=np.uint8)
+                elif alocacao == "opencv":
+                    cv2.resize(np.zeros((8000, 8000), dtype=np.uint8), None, fx=4, fy=4)
+                else:
+                    if alocacao == "pymupdf_isolado":
+                        os.environ["EXTRATOR_RASTERIZACAO_ISOLADA"] = "1"
+                    Rasterizador.renderizar(caminho, ".", dpi=300, motor="pymupdf")
+        except LimiteExcedido as e:
+            print(e.limite, e.etapa)
+    """)
+    import tempfile
+    with tempfile.TemporaryDirectory() as pasta:
+        resultado = subprocess.run([sys.executable, "-c", codigo, pasta], capture_output=True, text=True, timeout=120)
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.strip().splitlines()[-1] == "memoria rasterizacao"
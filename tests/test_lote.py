@@ -0,0 +1,33 @@
+import os
+import pytest
+
+from src.services.lote.lote import Lote
+
+
+def escrever(caminho, texto):
+    caminho.write_text(texto, encoding="utf-8")
+    return str(caminho)
+
+
+def test_manifesto_jsonl_valido(tmp_path):
+    manifesto = escrever(tmp_path / "lote.jsonl",
+                         '{"doc_type": "cnh", "path": "a.pdf"}\n\n{"doc_type": "CRLV", "path": "sub/b.pdf"}\n')
+    assert list(Lote.listar_documentos(manifesto)) == [
+        ("CNH", os.path.join(str(tmp_path), "a.pdf")),
+        ("CRLV", os.path.join(str(tmp_path), "sub/b.pdf")),
+    ]
+
+
+@pytest.mark.parametrize("linha", ['{"doc_type": "CNH"', '{"doc_type": "CNH"}', '{"doc_type": "CNH", "path": " "}', '["CNH", "a.pdf"]'])
+def test_manifesto_jsonl_invalido_falha_antes_do_primeiro_item(tmp_path, linha):
+    manifesto = escrever(tmp_path / "lote.jsonl", '{"doc_type": "CNH", "path": "a.pdf"}\n' + linha + "\n")
+    documentos = Lote.listar_documentos(manifesto)
+    # Nenhum item é entregue ao pool: o erro aparece já no primeiro documento pedido
+    with pytest.raises(ValueError, match="linha 2"):
+        next(documentos)
+
+
+def test_manifesto_csv_sem_path(tmp_path):
+    manifesto = escrever(tmp_path / "lote.csv", "doc_type,path\nCNH,a.pdf\nCRLV,\n")
+    with pytest.raises(ValueError, match="linha 3: path vazio"):
+        list(Lote.listar_documentos(manifesto))
@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+import pytest
+from src.services.modelos.modelos import RegistroModelos
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_perfil_desconhecido_e_rejeitado():
+    with pytest.raises(ValueError, match="perfil desconhecido"):
+        RegistroModelos.compilar("coord_teste", "coord_teste.json", {"nome": {"coords": [0, 0, 10, 10], "perfil": "xyz"}})
+
+
+def test_validacao_dos_modelos_nao_carrega_opencv():
+    codigo = ("import sys; from src.services.modelos.modelos import RegistroModelos; "
+              "assert not RegistroModelos.erros(sys.argv[1]); print('cv2' in sys.modules)")
+    saida = subprocess.run([sys.executable, "-c", codigo, BASE_PATH], cwd=BASE_PATH, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == "False"
@@ -0,0 +1,17 @@
+import os
+from src.services.ocr.ocr import BackendsOCR
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_padrao_do_arquivo_e_tesseract(monkeypatch):
+    monkeypatch.delenv("EXTRATOR_OCR_BACKEND", raising=False)
+    assert BackendsOCR.para_documento("CNH", BASE_PATH).nome == "tesseract"
+
+
+def test_variavel_de_ambiente_escolhe_easyocr_para_cnh_e_crlv(monkeypatch):
+    # Equivale ao --ocr-backend easyocr do lote: o arquivo distribuído não fixa backend por tipo
+    monkeypatch.setenv("EXTRATOR_OCR_BACKEND", "easyocr")
+    assert BackendsOCR.para_documento("CNH", BASE_PATH).nome == "easyocr"
+    assert BackendsOCR.para_documento("CNH", BASE_PATH, modelo="coord_cnh_digital").nome == "easyocr"
+    assert BackendsOCR.para_documento("CRLV", BASE_PATH, modelo="coord_crlv").nome == "easyocr"
@@ -0,0 +1,58 @@
+import json
+import os
+import pytest
+
+pytest.importorskip("fitz")
+
+from src.services.benchmark.gerador_sintetico import GeradorSintetico
+from src.services.processador.processador import Processador
+from src.utils.limites import Limites, LimiteExcedido
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def demonstrativo(tmp_path):
+    caminho = str(tmp_path / "buonny.pdf")
+    servicos = GeradorSintetico(BASE_PATH).gerar_buonny(caminho, paginas=3, linhas_por_pagina=5)
+    return caminho, servicos
+
+
+@pytest.mark.parametrize("formato", ["json", "jsonl"])
+def test_buonny_em_fluxo_traz_metricas(monkeypatch, tmp_path, demonstrativo, formato):
+    monkeypatch.setenv("EXTRATOR_METRICAS", "1")
+    caminho, servicos = demonstrativo
+    saida = str(tmp_path / "saida.json")
+
+    assert Processador.gravar_em_fluxo(caminho, saida, formato) == len(servicos)
+
+    with open(saida, encoding="utf-8") as f:
+        if formato == "json":
+            dados = json.load(f)
+            assert len(dados["servicos"]) == len(servicos)
+        else:
+            dados = [json.loads(linha) for linha in f][-1]
+            assert dados["total"] == len(servicos)
+    assert dados["status"] == "sucesso"
+    assert {"leitura_texto", "interpretacao"} <= set(dados["_metrics"]["etapas_s"])
+    assert dados["_metrics"]["cache"] is False
+
+
+def test_buonny_em_fluxo_sem_metricas(monkeypatch, tmp_path, demonstrativo):
+    monkeypatch.delenv("EXTRATOR_METRICAS", raising=False)
+    monkeypatch.delenv("EXTRATOR_METRICAS_ARQUIVO", raising=False)
+    saida = str(tmp_path / "saida.json")
+    Processador.gravar_em_fluxo(demonstrativo[0], saida)
+    with open(saida, encoding="utf-8") as f:
+        assert "_metrics" not in json.load(f)
+
+
+def test_buonny_em_fluxo_respeita_prazo_do_documento(monkeypatch, tmp_path, demonstrativo):
+    # Orçamento aberto por Limites.documento() já esgotado na primeira página
+    monkeypatch.setattr(Limites, "tempo_documento", staticmethod(lambda: 1e-9))
+    saida = str(tmp_path / "saida.json")
+    with pytest.raises(LimiteExcedido) as erro:
+        Processador.gravar_em_fluxo(demonstrativo[0], saida)
+    assert erro.value.etapa == "leitura_texto"
+    assert erro.value.limite == "tempo_documento"
+    assert not os.path.exists(saida)
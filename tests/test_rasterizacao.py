@@ -0,0 +1,15 @@
+import os
+from src.services.rasterizacao.rasterizacao import Rasterizador
+from src.services.utils.utils_services import UtilsServices
+
+
+def test_threads_de_paginas_usam_processos_auxiliares(monkeypatch):
+    monkeypatch.setenv("EXTRATOR_THREADS_PAGINAS", "2")
+    monkeypatch.delenv("EXTRATOR_RASTERIZACAO_ISOLADA", raising=False)
+
+    # Cada página consulta em que processo rodaria a chamada ao PyMuPDF
+    dados = UtilsServices.processar_paginas(2, lambda pagina: {"pid": Rasterizador.chamar_pymupdf(os.getpid)}, "teste")
+
+    assert all(documento["pid"] != os.getpid() for documento in dados["documentos"])
+    # Fora das threads de páginas a chamada continua no próprio processo
+    assert Rasterizador.chamar_pymupdf(os.getpid) == os.getpid()
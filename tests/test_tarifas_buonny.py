@@ -0,0 +1,100 @@
+import json
+import os
+import time
+import pytest
+
+pytest.importorskip("fitz")
+
+from src.services.benchmark.gerador_sintetico import GeradorSintetico
+from src.services.tarifas_buonny.tar_buonny import TarifasBuonny
+from src.utils.cronometro import Cronometro
+from src.utils.limites import Limites, LimiteExcedido
+from src.utils.utils import Utils
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _intervalo_travado(caminho_pdf, motor, inicio, fim):
+    time.sleep(60)
+    return [], {}
+
+
+@pytest.fixture
+def demonstrativo_longo(tmp_path):
+    # Mais páginas que PAGINAS_POR_TAREFA, para o caminho paralelo
+    caminho = str(tmp_path / "buonny.pdf")
+    paginas = TarifasBuonny.PAGINAS_POR_TAREFA + 4
+    servicos = GeradorSintetico(BASE_PATH).gerar_buonny(caminho, paginas=paginas, linhas_por_pagina=2)
+    return caminho, servicos
+
+
+def test_paralelo_soma_etapas_dos_processos(demonstrativo_longo):
+    caminho, servicos = demonstrativo_longo
+    with Cronometro.coletar() as etapas:
+        lidos = list(TarifasBuonny.iterar_servicos(caminho, "pymupdf", processos=2))
+    assert len(lidos) == len(servicos)
+    assert etapas["leitura_texto"] > 0
+    assert etapas["interpretacao"] > 0
+
+
+def test_paralelo_respeita_prazo_do_documento(monkeypatch, demonstrativo_longo):
+    monkeypatch.setattr(TarifasBuonny, "_servicos_intervalo", staticmethod(_intervalo_travado))
+    monkeypatch.setattr(Limites, "tempo_documento", staticmethod(lambda: 1))
+    inicio = time.monotonic()
+    with pytest.raises(LimiteExcedido) as erro:
+        with Limites.documento():
+            list(TarifasBuonny.iterar_servicos(demonstrativo_longo[0], "pymupdf", processos=2))
+    assert erro.value.etapa == "leitura_texto"
+    assert erro.value.limite == "tempo_documento"
+    # Os processos travados são encerrados, sem esperar o intervalo terminar
+    assert time.monotonic() - inicio < 30
+
+
+def test_erro_de_leitura_preserva_a_causa(tmp_path):
+    caminho = tmp_path / "corrompido.pdf"
+    caminho.write_bytes(b"isto nao e um pdf")
+    with pytest.raises(Exception, match="Erro ao ler o arquivo PDF") as erro:
+        list(TarifasBuonny.iterar_servicos(str(caminho), "pymupdf"))
+    assert erro.value.__cause__ is not None
+
+
+def test_falta_de_memoria_nao_e_reembrulhada(monkeypatch, demonstrativo_longo):
+    def sem_memoria(*args):
+        raise MemoryError()
+        yield
+
+    monkeypatch.setattr(TarifasBuonny, "_textos_pymupdf", staticmethod(sem_memoria))
+    with pytest.raises(LimiteExcedido) as erro:
+        list(TarifasBuonny.iterar_servicos(demonstrativo_longo[0], "pymupdf", processos=1))
+    assert erro.value.etapa == "leitura_texto"
+    assert erro.value.limite == "memoria"
+
+
+@pytest.mark.parametrize("metricas", [None, {"etapas_s": {"leitura_texto": 0.5}, "cache": False}])
+def test_json_em_fluxo_igual_ao_write_json_output(tmp_path, metricas):
+    caminho = str(tmp_path / "buonny.pdf")
+    GeradorSintetico(BASE_PATH).gerar_buonny(caminho, paginas=3, linhas_por_pagina=5)
+    esperado = TarifasBuonny.ExtrairTarifasPDF(caminho, BASE_PATH)
+    if metricas is not None:
+        esperado["_metrics"] = metricas
+    Utils.write_json_output(esperado, str(tmp_path / "esperado.json"))
+
+    TarifasBuonny.gravar_em_fluxo(caminho, str(tmp_path / "fluxo.json"), "json",
+                                  metricas=(lambda: metricas) if metricas else None)
+
+    assert (tmp_path / "fluxo.json").read_bytes() == (tmp_path / "esperado.json").read_bytes()
+
+
+def test_jsonl_em_fluxo_valido_por_linha(tmp_path):
+    caminho = str(tmp_path / "buonny.pdf")
+    GeradorSintetico(BASE_PATH).gerar_buonny(caminho, paginas=3, linhas_por_pagina=5)
+    esperado = TarifasBuonny.ExtrairTarifasPDF(caminho, BASE_PATH)["servicos"]
+    saida = tmp_path / "fluxo.jsonl"
+
+    assert TarifasBuonny.gravar_em_fluxo(caminho, str(saida), "jsonl") == len(esperado)
+
+    linhas = saida.read_text(encoding="utf-8").splitlines()
+    registros = [json.loads(linha) for linha in linhas]
+    assert registros[:-1] == esperado
+    assert registros[-1] == {"status": "sucesso", "mensagem": "Dados das tarifas extraídos com sucesso.",
+                             "total": len(esperado)}
@@ -0,0 +1,68 @@
+import re
+import pytest
+
+from src.services.tipos_campo.tipos_campo import TiposCampo
+
+
+def configuracao(**opcoes):
+    return TiposCampo.configuracao(opcoes)
+
+
+@pytest.mark.parametrize("digitos", ["52998224725", "11144477735"])
+def test_cpf_valido(digitos):
+    assert TiposCampo.cpf_valido(digitos)
+
+
+@pytest.mark.parametrize("digitos", ["52998224724", "11111111111", "1114447773", "111444777350"])
+def test_cpf_invalido(digitos):
+    assert not TiposCampo.cpf_valido(digitos)
+
+
+def test_cnpj():
+    assert TiposCampo.cnpj_valido("11222333000181")
+    assert not TiposCampo.cnpj_valido("11222333000180")
+    assert not TiposCampo.cnpj_valido("00000000000000")
+
+
+def test_validador_cpf_normaliza_a_pontuacao():
+    assert TiposCampo.validar("529 982.247 25", configuracao(tipo="cpf")) == ("529.982.247-25", True)
+    assert TiposCampo.validar("529.982.247-24", configuracao(tipo="cpf")) == ("529.982.247-24", False)
+    assert TiposCampo.validar("11222333000181", configuracao(tipo="cpf_cnpj")) == ("11.222.333/0001-81", True)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("01/02/2020", ("01/02/2020", True)),
+    ("01.02 .2020", ("01/02/2020", True)),
+    ("31/02/2020", ("31/02/2020", False)),
+    ("sem data", ("sem data", False)),
+])
+def test_validador_data(texto, esperado):
+    assert TiposCampo.validar(texto, configuracao(tipo="data")) == esperado
+
+
+def test_validador_digitos():
+    assert TiposCampo.validar("12 345-6", configuracao(tipo="digitos")) == ("123456", True)
+    assert TiposCampo.validar("ABC", configuracao(tipo="digitos")) == ("ABC", False)
+
+
+def test_validador_regex():
+    placa = configuracao(validador="regex", padrao="[A-Z]{3}[0-9][A-Z0-9][0-9]{2}")
+    assert isinstance(placa["padrao"], re.Pattern)
+    assert TiposCampo.validar("PLACA: ABC1D23", placa) == ("ABC1D23", True)
+    assert TiposCampo.validar("AB1234", placa) == ("AB1234", False)
+
+
+def test_validador_nome_preserva_o_texto_lido():
+    # Só os espaços são normalizados: caixa, acentos, apóstrofo e pontuação ficam como foram lidos
+    assert TiposCampo.validar("  Maria  D'Ávila\tSant'Ana Jr. ", configuracao(tipo="nome")) == ("Maria D'Ávila Sant'Ana Jr.", True)
+    assert TiposCampo.validar("1 2", configuracao(tipo="nome")) == ("1 2", False)
+
+
+@pytest.mark.parametrize("tipo", ["nome", "data", "cpf", "cpf_cnpj", "digitos"])
+def test_texto_vazio_e_invalido(tipo):
+    assert TiposCampo.validar("", configuracao(tipo=tipo)) == ("", False)
+
+
+def test_campo_sem_validador_volta_como_esta():
+    assert TiposCampo.validar("", None) == ("", True)
+    assert TiposCampo.validar(" qualquer ", configuracao(tipo="texto")) == (" qualquer ", True)
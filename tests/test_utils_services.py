@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pytesseract")
+
+from src.services.utils.utils_services import UtilsServices
+
+
+def ocr(*palavras):
+    """Resultado sintético do image_to_data: (texto, left, top, width, height) por palavra."""
+    colunas = ("text", "left", "top", "width", "height")
+    return {coluna: [palavra[i] for palavra in palavras] for i, coluna in enumerate(colunas)}
+
+
+CAIXAS = {"nome": (0, 0, 100, 20), "cpf": (100, 0, 200, 20), "vazio": (0, 50, 200, 70)}
+
+
+def test_palavras_dentro_das_caixas():
+    resultado = UtilsServices.atribuir_palavras(ocr(("MARIA", 5, 2, 40, 15), ("SILVA", 50, 2, 40, 15),
+                                                    ("123", 110, 2, 30, 15)), CAIXAS)
+    assert resultado == {"nome": ["MARIA", "SILVA"], "cpf": ["123"], "vazio": []}
+
+
+def test_palavra_entre_duas_caixas_fica_com_a_maior_cobertura():
+    # 30 px em "nome" e 10 px em "cpf"
+    resultado = UtilsServices.atribuir_palavras(ocr(("SOUZA", 70, 2, 40, 15)), CAIXAS)
+    assert resultado["nome"] == ["SOUZA"]
+    assert resultado["cpf"] == []
+
+
+def test_cobertura_minima():
+    # Só 25% da palavra dentro de "vazio": abaixo do mínimo padrão de 50%
+    palavra = ocr(("X", 10, 65, 20, 20))
+    assert UtilsServices.atribuir_palavras(palavra, CAIXAS)["vazio"] == []
+    assert UtilsServices.atribuir_palavras(palavra, CAIXAS, cobertura_minima=0.25)["vazio"] == ["X"]
+
+
+def test_caixa_vazia_e_textos_em_branco():
+    resultado = UtilsServices.atribuir_palavras(ocr(("", 5, 55, 40, 10), ("  ", 5, 55, 40, 10), (None, 5, 55, 40, 10)), CAIXAS)
+    assert resultado == {"nome": [], "cpf": [], "vazio": []}
+
+
+def test_deslocamento_do_recorte():
+    # Coordenadas relativas ao recorte da união das regiões, que começa em (100, 0)
+    resultado = UtilsServices.atribuir_palavras(ocr(("123", 10, 2, 30, 15)), CAIXAS, deslocamento=(100, 0))
+    assert resultado["cpf"] == ["123"]
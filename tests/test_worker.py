@@ -0,0 +1,61 @@
+import json
+import os
+import socket
+import threading
+import time
+import pytest
+
+pytest.importorskip("cv2")
+
+from src.services.worker.cliente import ClienteWorker
+from src.services.worker.worker import Worker
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def enviar(porta, requisicao):
+    with socket.create_connection(("127.0.0.1", porta), timeout=5) as conexao:
+        conexao.sendall((json.dumps(requisicao) + "\n").encode("utf-8"))
+        with conexao.makefile("r", encoding="utf-8") as leitor:
+            return json.loads(leitor.readline())
+
+
+@pytest.fixture
+def worker():
+    porta = porta_livre()
+    servidor = threading.Thread(target=Worker.servir_socket, args=(BASE_PATH,), kwargs={"porta": porta}, daemon=True)
+    servidor.start()
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    yield porta
+    enviar(porta, {"comando": "encerrar"})
+    servidor.join(5)
+
+
+def test_conexao_parada_nao_bloqueia_as_demais(worker):
+    # Um cliente que conecta e não envia nada não pode prender o worker
+    with socket.create_connection(("127.0.0.1", worker), timeout=5):
+        assert enviar(worker, {"id": 7, "comando": "ping"})["status"] == "ok"
+
+
+def test_cliente_sem_resposta_processa_localmente(monkeypatch):
+    # Worker que aceita a conexão e nunca responde
+    with socket.socket() as servidor:
+        servidor.bind(("127.0.0.1", 0))
+        servidor.listen()
+        porta = servidor.getsockname()[1]
+        monkeypatch.setenv("EXTRATOR_TEMPO_DOCUMENTO", "1")
+
+        inicio = time.monotonic()
+        assert ClienteWorker.tentar_processar("CNH", "documento.pdf", porta) is None
+        assert time.monotonic() - inicio < 5